@@ -1,16 +1,156 @@
 """Глобальные настройки и константы приложения."""
 
+import os
 from pathlib import Path
 
 # === Пути ===
 BASE_DIR = Path(__file__).parent
 DIR_RESULTS = BASE_DIR / "results"
-DIR_HTML_CACHE = BASE_DIR / "cards_html"
+DIR_HTML_CACHE = Path(os.environ.get("MTG_CACHE_DIR", BASE_DIR / "cards_html"))  # MTG_CACHE_DIR — отдельный кэш для нагрузочных тестов
+DIR_JOBS = BASE_DIR / "jobs"  # журналы заданий для продолжения прерванных запусков
+CARD_STORE_PATH = BASE_DIR / "cards.db"  # общее хранилище распарсенных карт (SQLite)
+TASK_QUEUE_PATH = BASE_DIR / "queue.db"  # очередь задач распределённого режима (SQLite)
+CACHE_INDEX_FILENAME = "index.jsonl"  # манифест кэша: URL, размер, хэш, ETag, Last-Modified
+CACHE_LOCK_FILENAME = ".lock"  # межпроцессная блокировка кэша (очистка vs чтение/запись)
+CACHE_SHARD_CHARS = 2  # длина hex-префикса хэша slug для поддиректорий кэша (2 = 256 шардов)
+CACHE_READ_WORKERS = 8  # потоков чтения кэша
+CACHE_CHUNK_SIZE = 256  # файлов в пачке при потоковом чтении кэша
+CACHE_PREFETCH_CHUNKS = 4  # пачек, читаемых заранее (ограничивает память)
+CACHE_WRITE_QUEUE_SIZE = 256  # страниц в очереди фоновой записи (при заполнении загрузка ждёт)
+CACHE_WRITE_BATCH = 32  # страниц за один проход потока записи
 
 # === Scryfall API ===
-SCRYFALL_RANDOM_URL = "https://scryfall.com/random?l=ru"
+SCRYFALL_BASE_URL = os.environ.get("MTG_SCRYFALL_URL", "https://scryfall.com").rstrip("/")  # MTG_SCRYFALL_URL — адрес replay-сервера
+SCRYFALL_RANDOM_URL = f"{SCRYFALL_BASE_URL}/random?l=ru"
+SCRYFALL_CARD_URL = SCRYFALL_BASE_URL + "/card/{set}/{number}/ru"  # карта по set и номеру
 REQUEST_TIMEOUT = 10
 REQUEST_DELAY = 0.1  # секунды между запросами
+REQUEST_WORKERS = 8  # параллельных запросов (загрузка по списку, обновление кэша)
+REQUEST_RETRIES = 2  # повторов запроса после 429/5xx/таймаута (при адаптивной конкурентности)
+REQUEST_BACKOFF_BASE = 0.5  # пауза перед первым повтором, секунды; дальше удваивается (со случайным разбросом)
+REQUEST_BACKOFF_MAX = 30.0  # потолок паузы перед повтором (Retry-After сервера соблюдается всегда)
+
+# === Адаптивная конкурентность (AIMD) ===
+ADAPTIVE_CONCURRENCY = True  # подбирать число параллельных запросов по ответам сервера вместо REQUEST_DELAY
+CONCURRENCY_INITIAL = 2  # стартовое окно параллельных запросов
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 16
+CONCURRENCY_BACKOFF = 0.5  # множитель окна при 429/503/таймауте
+CONCURRENCY_DECISIONS_KEPT = 1000  # последних изменений окна в метриках запуска
+LATENCY_TOLERANCE = 2.0  # окно растёт, пока медиана задержки не выше лучшей × этот коэффициент
+MAX_RPS = float(os.environ.get("MTG_MAX_RPS", 10))  # жёсткий потолок запросов в секунду независимо от окна (Scryfall просит ≤ 10)
+METRICS_FILENAME_TEMPLATE = "{stem} metrics.json"  # метрики запуска рядом с отчётом
+
+# === Replay-сервер (нагрузочное тестирование без сети) ===
+REPLAY_HOST = "127.0.0.1"
+REPLAY_PORT = 8080
+REPLAY_LATENCY = "lognormal:80:0.5"  # распределение задержки ответа, мс (см. services/replay_server.py)
+REPLAY_PAGE_SIZE = 60_000  # размер синтетической страницы, байт (≈ реальная страница Scryfall)
+
+# === Сервис оценки ===
+SCORING_HOST = "127.0.0.1"
+SCORING_PORT = 8090
+SCORING_BATCH_MAX = 256  # максимум карт в пакете оценки
+SCORING_BATCH_WAIT_MS = 1  # сколько ждать добора пакета из конкурентных запросов
+SCORING_LATENCY_WINDOW = 10_000  # последних запросов на эндпоинт для перцентилей
+
+# === Анализ колод ===
+DECK_FILE_PATTERNS = ("*.txt", "*.dec", "*.dek")  # файлы деклистов в директории
+DECK_CURVE_MAX = 7  # последний столбец кривой маны — "7+"
+DECK_SECTIONS = {  # заголовки разделов деклиста -> раздел
+    "deck": "main", "main": "main", "maindeck": "main", "колода": "main",
+    "commander": "main", "командир": "main", "companion": "sideboard",
+    "sideboard": "sideboard", "сайдборд": "sideboard", "maybeboard": "sideboard",
+}
+DECKS_FILENAME_TEMPLATE = "MTG decks {date} {count} decks.xlsx"
+DECK_COLUMNS = {
+    "deck": "Колода",
+    "cards": "Карт",
+    "sideboard": "Сайдборд",
+    "resolved": "Найдено",
+    "total_mana_points": "Стоимость маны",
+    "total_power": "Итоговая мощь",
+    "avg_balance": "Средний баланс",
+    "avg_mana_value": "Средняя мана-стоимость",
+    "unresolved": "Не найдены",
+}
+
+# === Распределённый режим ===
+GLOBAL_RPS = 10  # общий лимит запросов в секунду для всех воркеров
+RANDOM_TASK_SIZE = 50  # случайных карт в одной задаче воркера
+TASK_LEASE_SECONDS = 600  # аренда задачи; после истечения её заберёт другой воркер
+TASK_MAX_ATTEMPTS = 3  # попыток на задачу до статуса failed
+
+# === Сравнение наборов правил ===
+COMPARISON_BASELINE = "config"  # имя базового набора (правила из config.py)
+COMPARISON_TOP_MOVERS = 20  # карт с наибольшим изменением баланса в сводке на каждый набор
+COMPARISON_FILENAME_TEMPLATE = "MTG compare {date} {count} cards.xlsx"
+
+# === Наблюдение за кэшем ===
+WATCH_DEBOUNCE_MS = 500  # тишина в манифесте, после которой накопленные страницы обрабатываются пакетом
+WATCH_MAX_DELAY = 5.0  # максимум ожидания пакета при непрерывном потоке новых страниц, секунд
+WATCH_BATCH_MAX = 1000  # страниц в пакете, при достижении обрабатывается сразу
+WATCH_POLL_INTERVAL = 1.0  # период опроса манифеста без inotify, секунд
+WATCH_FILENAME = "MTG watch.csv"  # накопительный результат режима наблюдения
+
+# === Калибровка весов правил ===
+RULE_HITS_PATH = BASE_DIR / "rule_hits.npz"  # матрица срабатываний правил карта × правило
+CALIBRATION_RIDGE = 1.0  # регуляризация: удерживает веса редких правил около исходных
+CALIBRATION_ITERATIONS = 200  # максимум итераций решателя
+CALIBRATED_RULES_FILENAME = "rules calibrated.json"  # набор правил с подобранными весами
+
+# === Поиск по корпусу ===
+SEARCH_INDEX_PATH = BASE_DIR / "search_index.npz"  # триграммный индекс карт хранилища
+SEARCH_LIMIT = 20  # карт в выводе поиска
+
+# === Набор данных (инкрементальный вывод) ===
+OUTPUT_FORMAT = os.environ.get("MTG_OUTPUT", "excel")  # excel — новая книга на запуск, dataset — дозапись в набор данных
+DATASET_DIR = DIR_RESULTS / "dataset"  # партиции date=<дата>/set=<сет>/
+DATASET_FORMAT = "parquet"  # parquet (нужен pyarrow) или csv
+DATASET_MANIFEST_FILENAME = "manifest.json"  # партиции, файлы, запуски
+DATASET_INDEX_FILENAME = "cards.jsonl"  # URL -> отпечаток и файл актуальной строки
+DATASET_COMPACT_MIN_FILES = 4  # сжимать партиции, где файлов не меньше
+
+# === Агрегаты корпуса ===
+AGGREGATES_PATH = DIR_RESULTS / "aggregates.json"  # состояние аккумуляторов (обновляется инкрементально)
+AGGREGATES_COMPRESSION = 100  # сжатие t-digest: больше — точнее перцентили и больше центроидов
+AGGREGATES_EXACT_VALUES = 512  # пока различных значений не больше — перцентили точные
+AGGREGATES_PERCENTILES = (10, 50, 90)  # перцентили баланса в сводках
+AGGREGATES_TOP_RULES = 20  # сколько самых частых правил показывать
+AGGREGATES_FILENAME_TEMPLATE = "MTG aggregates {date} {count} cards.xlsx"
+# Тип карты -> слова строки типа (до «—»), английские и русские
+CARD_TYPE_WORDS = {
+    "Creature": ("creature", "существо"),
+    "Artifact": ("artifact", "артефакт"),
+    "Enchantment": ("enchantment", "чары"),
+    "Planeswalker": ("planeswalker", "мироходец"),
+    "Instant": ("instant", "мгновенное"),
+    "Sorcery": ("sorcery", "волшебство"),
+    "Land": ("land", "земля"),
+    "Battle": ("battle", "битва"),
+}
+
+# === Бюджет памяти ===
+MAX_MEMORY = os.environ.get("MTG_MAX_MEMORY", "")  # предел RSS запуска: "512M", "2G"; пусто — без ограничения
+MEMORY_SPILL_THRESHOLD = 0.8  # доля бюджета, после которой разобранные карты сбрасываются на диск
+MEMORY_READ_SHARE = 0.25  # доля свободного бюджета под пачки чтения кэша
+MEMORY_CHECK_EVERY = 256  # карт между замерами RSS
+SPILL_DIR = os.environ.get("MTG_SPILL_DIR") or None  # временные чанки (None — системный tmp)
+
+# === Сопоставление правил ===
+RULES_MATCHER = os.environ.get("MTG_RULES_MATCHER", "linear")  # linear — правила без возвратов (нелинейные — через re с предупреждением); regex — модуль re как есть
+RULES_CARD_TIME_BUDGET_MS = 50  # предел времени разбора текста одной карты; оставшиеся правила пропускаются (0 — без предела)
+RULES_PARITY_SAMPLES = 5000  # синтетических текстов на проверку совпадения linear и re (rules-check)
+
+# === Снапшот карт ===
+SNAPSHOT_PATH = BASE_DIR / "cards.arrow"  # распарсенные карты и оценки (Arrow IPC, нужен pyarrow)
+
+# === Профилирование ===
+PROFILE = os.environ.get("MTG_PROFILE", "")  # MTG_PROFILE=cprofile,tracemalloc,sampling (или all) — профилировать и интерактивный запуск
+PROFILE_SAMPLE_INTERVAL_MS = 5  # период сэмплирования стеков
+PROFILE_TOP_ALLOCATIONS = 25  # строк кода с наибольшим ростом памяти на этап
+PROFILE_MEMORY_SNAPSHOT_SECONDS = 1.0  # не чаще одного снимка памяти в секунду на этап
+PROFILE_FILENAME_TEMPLATE = "{stem} profile{suffix}"  # артефакты профилирования рядом с отчётом
 
 # === CSS-селекторы для парсинга ===
 SELECTORS = {
@@ -18,6 +158,7 @@ SELECTORS = {
     "MANA_COST": "span.card-text-mana-cost",
     "ORACLE_TEXT": "div.card-text-oracle",
     "CARD_STATS": "div.card-text-stats",
+    "TYPE_LINE": "p.card-text-type-line",
 }
 
 # === Формулы расчёта баллов ===
@@ -571,6 +712,15 @@ ABILITY_CALCULATION = {
 EXCEL_DATE_FORMAT = "%d-%m-%y-%H-%M-%S"
 EXCEL_FILENAME_TEMPLATE = "MTG {date} {count} cards.xlsx"
 
+CHECKPOINT_EVERY = 1000  # контрольный экспорт каждые N распарсенных карт
+CHECKPOINT_FILENAME_TEMPLATE = "MTG job {job_id} checkpoint.xlsx"
+
+# Большие отчёты (нужен xlsxwriter): шарды со значениями формул и лист-индекс
+EXCEL_SHARD_ROWS = 50000  # карт в шарде; отчёты больше шардируются (0 — не шардировать)
+EXCEL_SHARD_MODE = "files"  # files — файлы-шарды, пишутся параллельно процессами; sheets — листы одной книги
+EXCEL_SHARD_WORKERS = os.cpu_count() or 1  # процессов записи файлов-шардов
+EXCEL_SHARD_FILENAME_TEMPLATE = "{stem} part {number:03d}{suffix}"
+
 EXCEL_COLUMNS = {
     "NAME": "Название",
     "MANA_COST": "Мана-кост",
@@ -1,11 +1,34 @@
 """Фасад для запуска полного пайплайна анализа."""
 
-from typing import List, Optional, Tuple
+import json
+import random
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from tqdm import tqdm
+from config import (
+    CHECKPOINT_EVERY,
+    CHECKPOINT_FILENAME_TEMPLATE,
+    METRICS_FILENAME_TEMPLATE,
+    PROFILE,
+    OUTPUT_FORMAT,
+    MAX_MEMORY,
+    CACHE_CHUNK_SIZE,
+)
 from models.card import Card
+from models.rules import get_default_rules, get_offline_rules
 from parsers.html_extractor import HTMLCardParser
-from services.downloader import CardDownloader
+from services.downloader import CardDownloader, load_targets
 from services.excel_exporter import ExcelExporter
+from services.journal import JobJournal
+from services.aggregates import CorpusAggregates
+from services.card_store import CardStore
+from services.dataset import CardDataset
+from services.sampling import CardSampler
+from services.snapshot import CardSnapshot
+from services.spill import CardSpill
+from utils.memory import MemoryBudget, parse_size
+from utils.profiling import PipelineProfiler, parse_modes
 
 
 class MTGCardAnalyzer:
@@ -15,13 +38,27 @@ class MTGCardAnalyzer:
     Поддерживает два режима:
     - Онлайн: загрузка с Scryfall
     - Офлайн: загрузка из локального кэша
+    
+    Attributes:
+        profile: Режимы профилирования запусков (см. PipelineProfiler),
+            например "cprofile,sampling"; пустая строка — без профилирования.
+        output: Итоговый вывод: "excel" — новая книга на запуск,
+            "dataset" — дозапись новых и изменённых карт в CardDataset.
+        budget: Бюджет памяти (max_memory, например "2G"): под бюджетом
+            пачки чтения кэша подбираются по замеренному RSS, а разобранные
+            карты сбрасываются на диск (CardSpill) и сливаются при экспорте.
     """
     
-    def __init__(self):
+    def __init__(self, profile: str = PROFILE, output: str = OUTPUT_FORMAT, max_memory: str = MAX_MEMORY):
         self.downloader = CardDownloader()
         self.parser = HTMLCardParser()
         self.exporter = ExcelExporter()
-        self.cards: List[Card] = []
+        self.cards: Union[List[Card], CardSpill] = []
+        self.journal: Optional[JobJournal] = None
+        self.profile = parse_modes(profile)
+        self.output = output
+        self.budget = MemoryBudget(parse_size(max_memory))
+        self.profiler = PipelineProfiler()
     
     def _print_report(self) -> None:
         """Выводит краткий отчёт в консоль."""
@@ -35,20 +72,130 @@ class MTGCardAnalyzer:
             print(f"{i:2d}. {name} | {mana} | {pt}")
         
         print("-" * 70)
+        if not self.cards:
+            return
+        
+        # Сводки запуска (те же аккумуляторы, что и у команды aggregates)
+        with self.profiler.stage("score"):
+            aggregates = CorpusAggregates()
+            aggregates.update(self.cards)
+            tables = aggregates.tables()
+        for title in ("Цвет", "Мана-стоимость", "Тип"):
+            print(f"\n📈 {title}:")
+            print(tables[title].to_string(index=False))
+    
+    def _start_profiler(self) -> None:
+        """Новый профиль на запуск."""
+        self.profiler.close()  # профиль прошлого запуска, завершившегося без отчёта
+        self.profiler = PipelineProfiler(self.profile)
+    
+    def _new_cards(self) -> Union[List[Card], CardSpill]:
+        """Пустой список карт запуска; под бюджетом памяти — со сбросом на диск."""
+        if isinstance(self.cards, CardSpill):
+            self.cards.close()  # чанки прошлого запуска
+        if not self.budget.enabled:
+            return []
+        if self.budget.over():
+            print(f"⚠️ RSS уже {self.budget.rss() / 2 ** 20:.0f} МБ — больше бюджета "
+                  f"{self.budget.limit / 2 ** 20:.0f} МБ; карты будут сбрасываться на диск минимальными пачками")
+        return CardSpill(self.budget)
+    
+    def _start_job(self, journal: JobJournal) -> None:
+        """Делает задание текущим и восстанавливает уже распарсенные карты."""
+        self._start_profiler()
+        self.journal = journal
+        self.cards = self._new_cards()
+        if self.budget.enabled:
+            for card in journal.detach_cards():
+                self.cards.append(card)
+        else:
+            self.cards = list(journal.cards.values())
+        if self.cards:
+            print(f"⏯️ Задание {journal.job_id}: восстановлено {len(self.cards)} карт")
+    
+    def _parse_one(self, html: bytes, url: str) -> Card:
+        """Парсит страницу, фиксирует карту в журнале и делает контрольные экспорты."""
+        with self.profiler.stage("parse"):
+            card = self.parser.parse(html, url)
+        self.cards.append(card)
+        
+        if self.journal:
+            self.journal.record_card(card)
+            if len(self.cards) % CHECKPOINT_EVERY == 0:
+                self._checkpoint()
+        return card
+    
+    def _checkpoint(self) -> None:
+        """Сохраняет промежуточный экспорт задания."""
+        with self.profiler.stage("cache_io"):
+            self.downloader.flush()  # контрольная точка не должна ссылаться на незаписанные страницы
+        filename = CHECKPOINT_FILENAME_TEMPLATE.format(job_id=self.journal.job_id)
+        with self.profiler.stage("export"):
+            path = self._export_excel(self.exporter.output_dir / filename)
+        if path:
+            self.journal.record_checkpoint(path)
+    
+    def _on_fetched(self, html: bytes, url: str) -> None:
+        """Потоковая обработка только что загруженной карты."""
+        self.journal.record_fetched(url)
+        self._parse_one(html, url)
     
-    def run_online(self, count: int) -> List[Card]:
+    def run_online(self, count: int, journal: Optional[JobJournal] = None) -> List[Card]:
         """
         Запускает анализ с загрузкой из интернета.
         
         Args:
             count: Количество карт для загрузки.
+            journal: Журнал продолжаемого задания (None = новое задание).
+            
+        Returns:
+            Список проанализированных объектов Card.
+        """
+        self._start_job(journal or JobJournal.create("online", count=count))
+        
+        # Загруженные до сбоя, но не распарсенные страницы берём из кэша
+        for url in self.journal.fetched:
+            if url not in self.journal.cards:
+                with self.profiler.stage("cache_io"):
+                    html = self.downloader.read_cached(url)
+                if html is not None:
+                    self._parse_one(html, url)
+        
+        remaining = count - len(self.journal.fetched)
+        print(f"🚀 Онлайн-анализ {count} карт запущен (осталось загрузить: {max(remaining, 0)})...\n")
+        
+        if remaining > 0:
+            with self.profiler.stage("fetch"):
+                self.downloader.fetch_batch(remaining, on_result=self._on_fetched)
+        
+        if not self.cards:
+            print("⚠️ Не загружено ни одной карты.")
+            return []
+        
+        self._finish()
+        return self.cards
+    
+    def run_targets(self, path: Path, journal: Optional[JobJournal] = None) -> List[Card]:
+        """
+        Запускает анализ конкретных карт из файла целей.
+        
+        Args:
+            path: Файл со списком URL карт или пар (set, номер).
+            journal: Журнал продолжаемого задания (None = новое задание).
             
         Returns:
             Список проанализированных объектов Card.
         """
-        print(f"🚀 Онлайн-анализ {count} карт запущен...\n")
+        targets = load_targets(path)
+        if not targets:
+            print("⚠️ Список целей пуст.")
+            return []
+        
+        self._start_job(journal or JobJournal.create("targets", path=str(path.resolve())))
+        print(f"🚀 Анализ {len(targets)} карт по списку запущен...\n")
         
-        raw_data = self.downloader.fetch_batch(count)
+        with self.profiler.stage("fetch"):
+            raw_data = self.downloader.fetch_targets(targets)
         if not raw_data:
             print("⚠️ Не загружено ни одной карты.")
             return []
@@ -56,52 +203,272 @@ class MTGCardAnalyzer:
         self._process_data(raw_data)
         return self.cards
     
-    def run_offline(self, limit: Optional[int] = None) -> List[Card]:
+    def run_offline(self, limit: Optional[int] = None, journal: Optional[JobJournal] = None) -> List[Card]:
         """
         Запускает анализ с загрузкой из локального кэша.
         
         Args:
             limit: Максимальное количество карт (None = все).
+            journal: Журнал продолжаемого задания (None = новое задание).
             
         Returns:
             Список проанализированных объектов Card.
         """
-        cache_count = self.downloader.get_cache_count()
+        files = self.downloader.list_cache()
         
-        if cache_count == 0:
+        if not files:
             print("⚠️ Кэш пуст — сначала запустите онлайн-режим.")
             return []
         
-        print(f"🚀 Офлайн-анализ кэша ({cache_count} файлов)...\n")
+        self._start_job(journal or JobJournal.create("offline", limit=limit))
+        print(f"🚀 Офлайн-анализ кэша ({len(files)} файлов)...\n")
         
-        raw_data = self.downloader.load_from_cache(limit)
-        if not raw_data:
-            print("⚠️ Не удалось загрузить данные из кэша.")
+        if limit:
+            files = files[:limit]
+        # Уже распарсенные в этом задании страницы даже не читаем
+        files = [(path, url) for path, url in files if url not in self.journal.cards]
+        
+        # Файлы читаются пачками параллельно с парсингом
+        self._size_read_batches(files)
+        chunks = self.downloader.iter_cache(files)
+        pages = self.profiler.iterate("cache_io", chain.from_iterable(chunks))
+        self._process_data(pages, total=len(files))
+        return self.cards
+    
+    def run_sample(
+        self,
+        count: int,
+        by: Optional[str] = None,
+        seed: Optional[int] = None,
+        journal: Optional[JobJournal] = None
+    ) -> List[Card]:
+        """
+        Запускает анализ случайной выборки из локального кэша (без сети).
+        
+        Args:
+            count: Размер выборки.
+            by: Стратификация: "set", "color", "cost" (см. CardSampler) или None.
+            seed: Зерно выборки (None = случайное, сохраняется в журнале).
+            journal: Журнал продолжаемого задания (None = новое задание).
+            
+        Returns:
+            Список проанализированных объектов Card.
+        """
+        if self.downloader.get_cache_count() == 0:
+            print("⚠️ Кэш пуст — сначала запустите онлайн-режим.")
             return []
         
-        self._process_data(raw_data)
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        store = CardStore() if by in ("color", "cost") else None
+        files = CardSampler(self.downloader, store).sample(count, by, seed)
+        if not files:
+            print("❌ Выборка пуста: в кэше нет страниц для этой стратификации.")
+            return []
+        
+        self._start_job(journal or JobJournal.create("sample", count=count, by=by, seed=seed))
+        print(f"🎲 Выборка {len(files)} карт из кэша ({by or 'равномерно'}, seed={seed})...\n")
+        
+        files = [(path, url) for path, url in files if url not in self.journal.cards]
+        self._size_read_batches(files)
+        chunks = self.downloader.iter_cache(files)
+        pages = self.profiler.iterate("cache_io", chain.from_iterable(chunks))
+        self._process_data(pages, total=len(files))
         return self.cards
     
-    def _process_data(self, raw_data: List[Tuple[str, str]]) -> None:
+    def run_snapshot(self, path: Path) -> List[Card]:
+        """
+        Запускает анализ карт из снапшота (без чтения и парсинга HTML).
+        
+        Args:
+            path: Файл снапшота (см. services/snapshot.py).
+            
+        Returns:
+            Список объектов Card.
+        """
+        self._start_profiler()
+        with self.profiler.stage("cache_io"):
+            snapshot = CardSnapshot(path)
+            self.cards = snapshot.cards()
+        print(f"🗂️ Снапшот {path.name}: {len(self.cards)} карт от {snapshot.metadata.get('created_at', '?')}")
+        if not snapshot.is_current():
+            print("ℹ️ Снапшот оценён другими правилами — в отчёте оценки по текущим правилам")
+        
+        if not self.cards:
+            print("⚠️ Снапшот пуст.")
+            return []
+        self._finish()
+        return self.cards
+    
+    def resume(self, job_id: Optional[str] = None) -> List[Card]:
+        """
+        Продолжает прерванное задание с последней контрольной точки.
+        
+        Уже загруженные страницы не перекачиваются, уже распарсенные
+        карты восстанавливаются из журнала без повторного парсинга.
+        
+        Args:
+            job_id: ID задания (None = последнее незавершённое).
+            
+        Returns:
+            Список проанализированных объектов Card.
+        """
+        journal = JobJournal.find(job_id)
+        if journal is None:
+            print("⚠️ Нет незавершённых заданий для продолжения.")
+            return []
+        if journal.finished:
+            print(f"✅ Задание {journal.job_id} уже завершено.")
+            return []
+        
+        print(f"⏯️ Продолжение задания {journal.job_id} ({journal.mode})")
+        if journal.mode == "online":
+            return self.run_online(journal.params["count"], journal)
+        if journal.mode == "targets":
+            return self.run_targets(Path(journal.params["path"]), journal)
+        if journal.mode == "sample":
+            params = journal.params
+            return self.run_sample(params["count"], params.get("by"), params["seed"], journal)
+        return self.run_offline(journal.params.get("limit"), journal)
+    
+    def _process_data(
+        self,
+        raw_data: Iterable[Tuple[bytes, str]],
+        total: Optional[int] = None
+    ) -> None:
         """
         Обрабатывает сырые данные: парсинг и экспорт.
         
+        Карты, уже распарсенные в текущем задании, пропускаются.
+        
         Args:
-            raw_data: Список кортежей (html_content, url).
+            raw_data: Кортежи (html_bytes, url): список или поток.
+            total: Число элементов для прогресс-бара, если raw_data — поток.
         """
         # Парсинг
         print("\n🔍 Парсинг данных...")
-        self.cards = []
-        for html, url in tqdm(raw_data, desc="🔍 Парсинг", unit="карта", colour="cyan", ncols=80):
-            card = self.parser.parse(html, url)
-            self.cards.append(card)
+        done = self.journal.cards if self.journal else {}
+        if not self.journal:
+            self.cards = self._new_cards()
+        for html, url in tqdm(raw_data, total=total, desc="🔍 Парсинг", unit="карта", colour="cyan", ncols=80):
+            if url not in done:
+                self._parse_one(html, url)
+        
+        self._finish()
+    
+    def _save_metrics(self, report: Path, writes: Dict) -> None:
+        """Сохраняет метрики запуска (запись кэша, решения контроллера) рядом с отчётом."""
+        controller = self.downloader.concurrency
+        metrics = {"cache_writes": writes}
+        if controller and controller.decisions:
+            metrics["concurrency"] = controller.stats()
+            metrics["concurrency_decisions"] = list(controller.decisions)
+            stats = metrics["concurrency"]
+            print(f"⚡ Конкурентность: окно {stats['limit']} (пик {stats['peak_in_flight']}), "
+                  f"{stats['rps']} запр/с, 429/503: {stats['throttled']}, ошибок: {stats['errors']}")
+        
+        path = report.with_name(METRICS_FILENAME_TEMPLATE.format(stem=report.stem))
+        path.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding='utf-8')
+    
+    def _finish(self) -> None:
+        """Отчёт, финальный экспорт и закрытие задания."""
+        with self.profiler.stage("cache_io"):
+            self.downloader.flush()
+        writes = self.downloader.writer.stats()
+        if writes["written"]:
+            print(f"💾 Запись кэша: {writes['written']} файлов, задержка "
+                  f"{writes['write_latency_avg_ms']} мс в среднем / {writes['write_latency_max_ms']} мс макс., "
+                  f"очередь до {writes['queue_depth_max']}")
         
         # Отчёт
         self._print_report()
         
+        # Оценка (результаты кэшируются правилами и переиспользуются при экспорте;
+        # набор данных сохраняет оценки и считает их без предела времени);
+        # карты, сброшенные на диск, оценены при сбросе
+        if not isinstance(self.cards, CardSpill):
+            rules = get_offline_rules() if self.output == "dataset" else get_default_rules()
+            with self.profiler.stage("score"):
+                rules.score_many(card.to_dict() for card in self.cards)
+        
         # Экспорт
-        print("\n💾 Экспорт в Excel...")
-        self.exporter.export(self.cards)
+        print("\n💾 Экспорт в набор данных..." if self.output == "dataset" else "\n💾 Экспорт в Excel...")
+        with self.profiler.stage("export"):
+            path = self._export_dataset() if self.output == "dataset" else self._export_excel()
+        if path:
+            self._save_metrics(path, writes)
+        rules = get_default_rules()
+        if rules.timeouts:
+            print(f"⏱️ Разбор {rules.timeouts} карт прерван по пределу {rules.time_budget * 1000:g} мс "
+                  f"(оставшиеся правила не учтены): {'; '.join(rules.slow_cards[:3])}")
+            rules.timeouts, rules.slow_cards = 0, []
+        if self.budget.enabled:
+            spilled = self.cards.spilled if isinstance(self.cards, CardSpill) else 0
+            peak = f"{self.budget.peak / 2 ** 20:.0f} МБ" if self.budget.peak else "неизвестен (нет /proc, resource и psutil)"
+            print(f"🧠 Память: пик RSS {peak} из {self.budget.limit / 2 ** 20:.0f} МБ; "
+                  f"на диск сброшено {spilled} карт ({len(getattr(self.cards, 'chunks', []))} чанков)")
+        if self.profiler.enabled:
+            artifacts = self.profiler.save(path or self.exporter.output_dir / "MTG.xlsx")
+            stages = ", ".join(f"{name} {timing['seconds']:.2f} с" for name, timing in self.profiler.timings.items())
+            print(f"⏱️ Этапы: {stages}")
+            print(f"🔬 Профиль: {', '.join(artifact.name for artifact in artifacts)}")
+        
+        if self.journal:
+            self.journal.finish(path)
+            checkpoint = self.journal.checkpoint_path
+            if path and checkpoint and checkpoint.exists():
+                checkpoint.unlink()
+            self.journal.close()
+            self.journal = None
+    
+    def _export_dataset(self) -> Path:
+        """
+        Дописывает карты запуска в набор данных.
+        
+        Returns:
+            Path: Условный путь отчёта запуска в DIR_RESULTS — рядом с ним
+            сохраняются метрики и профиль.
+        """
+        dataset = CardDataset()
+        if isinstance(self.cards, CardSpill):
+            # Под бюджетом памяти — по чанку за раз
+            stats = {}
+            for batch in self.cards.batches():
+                result = dataset.append(batch)
+                stats = {key: stats.get(key, 0) + value for key, value in result.items() if key != "run"}
+                stats["run"] = result["run"]
+        else:
+            stats = dataset.append(self.cards)
+        print(f"🗃️ Набор данных: новых {stats['new']}, изменённых {stats['changed']}, "
+              f"без изменений {stats['unchanged']}; записано файлов {stats['files']}, "
+              f"{stats['bytes'] / 1024:.1f} КБ")
+        return self.exporter.output_dir / f"MTG dataset run {stats['run']}"
+    
+    def _export_excel(self, filepath: Optional[Path] = None) -> Optional[Path]:
+        """Excel-отчёт по картам запуска; сброшенные на диск карты пишутся потоково."""
+        if isinstance(self.cards, CardSpill):
+            return self.exporter.export_stream(self.cards.rows(), len(self.cards), filepath)
+        return self.exporter.export(self.cards, filepath)
+    
+    def _size_read_batches(self, files: List[Tuple[Path, str]]) -> None:
+        """Под бюджетом памяти подбирает размер пачки чтения кэша по свободному RSS."""
+        if not self.budget.enabled or not files:
+            return
+        sizes = [path.stat().st_size for path, _ in files[:100] if path.exists()] or [0]
+        reader = self.downloader.reader
+        # В памяти — prefetch пачек в чтении и одна в парсинге
+        reader.chunk_size = self.budget.batch_size(sum(sizes) / len(sizes), reader.prefetch + 1, CACHE_CHUNK_SIZE)
+    
+    def refresh_cache(self) -> Dict[str, int]:
+        """Перепроверяет закэшированные страницы и сообщает об изменениях."""
+        if self.downloader.get_cache_count() == 0:
+            print("⚠️ Кэш пуст — нечего обновлять.")
+            return {}
+        
+        stats = self.downloader.refresh_cache()
+        print(f"🔄 Изменилось страниц: {stats['changed']}, без изменений: {stats['unchanged']}, "
+              f"ошибок: {stats['failed']}, без URL: {stats['skipped']}")
+        return stats
     
     def clear_cache(self) -> int:
         """Очищает кэш HTML-файлов."""
@@ -1,8 +1,67 @@
 #!/usr/bin/env python3
 """Точка входа в приложение MTG Card Analyzer."""
 
+import argparse
+import json
+import re
 import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from config import (
+    DIR_HTML_CACHE,
+    CARD_STORE_PATH,
+    TASK_QUEUE_PATH,
+    GLOBAL_RPS,
+    REPLAY_HOST,
+    REPLAY_PORT,
+    REPLAY_LATENCY,
+    REPLAY_PAGE_SIZE,
+    SCORING_HOST,
+    SCORING_PORT,
+    DIR_RESULTS,
+    RULE_HITS_PATH,
+    CALIBRATION_RIDGE,
+    CALIBRATED_RULES_FILENAME,
+    WATCH_FILENAME,
+    COMPARISON_BASELINE,
+    COMPARISON_TOP_MOVERS,
+    PROFILE,
+    SEARCH_INDEX_PATH,
+    SEARCH_LIMIT,
+    SNAPSHOT_PATH,
+    OUTPUT_FORMAT,
+    DATASET_DIR,
+    DATASET_COMPACT_MIN_FILES,
+    AGGREGATES_PATH,
+    AGGREGATES_TOP_RULES,
+    MAX_MEMORY,
+    RULES_PARITY_SAMPLES,
+)
 from core.analyzer import MTGCardAnalyzer
+from models.card import Card
+from models.matching import parity_mismatches, probe_texts
+from models.rules import ACTIVATION_PATTERNS, RuleSet, get_default_rules, get_offline_rules
+from parsers.html_extractor import HTMLCardParser
+from services.aggregates import refresh_aggregates
+from services.calibration import RuleHitMatrix, calibrate, save_bundle
+from services.card_store import CardStore
+from services.comparison import RuleSetComparison
+from services.dataset import CardDataset
+from services.decks import CardNameIndex, DeckAnalyzer, load_decklists
+from services.distributed import Coordinator, Worker
+from services.downloader import CardDownloader
+from services.excel_exporter import ExcelExporter
+from services.rate_limit import SharedRateLimiter
+from services.replay_server import ReplayCorpus, ReplayServer
+from services.sampling import SAMPLE_STRATA
+from services.scoring_server import ScoringServer
+from services.snapshot import CardSnapshot, rules_fingerprint, write_snapshot
+from services.task_queue import TaskQueue
+from services.text_index import INDEX_FIELDS, TrigramIndex
+from services.watcher import CacheWatcher
+from utils.memory import parse_size
+from utils.profiling import parse_modes
 
 
 def show_menu() -> str:
@@ -14,6 +73,10 @@ def show_menu() -> str:
     print("2. 📂 Офлайн — загрузка из кэша")
     print("3. 🗑️ Очистить кэш")
     print("4. 📊 Показать статус кэша")
+    print("5. 🔄 Обновить кэш (условные запросы)")
+    print("6. 🎯 Загрузка по списку (URL или set/номер)")
+    print("7. ⏯️ Продолжить прерванный запуск")
+    print("8. 🎲 Случайная выборка из кэша")
     print("0. ❌ Выход")
     print("=" * 50)
     return input("Выберите режим: ").strip()
@@ -62,6 +125,34 @@ def main():
             count = analyzer.downloader.get_cache_count()
             print(f"📊 В кэше: {count} карт")
         
+        elif choice == "5":
+            # Обновление кэша
+            analyzer.refresh_cache()
+        
+        elif choice == "6":
+            # Загрузка по списку целей
+            path = Path(input("📄 Файл со списком карт: ").strip())
+            if path.is_file():
+                analyzer.run_targets(path)
+            else:
+                print(f"❌ Файл не найден: {path}")
+        
+        elif choice == "7":
+            # Продолжение прерванного задания
+            job_id = input("🆔 ID задания (Enter = последнее): ").strip()
+            analyzer.resume(job_id or None)
+        
+        elif choice == "8":
+            # Офлайн-выборка
+            count = get_card_count()
+            if count > 0:
+                by = input("📐 Стратификация: set / color / cost (Enter = равномерно): ").strip() or None
+                if by and by not in SAMPLE_STRATA:
+                    print(f"❌ Неизвестная стратификация: {by}")
+                else:
+                    seed_input = input("🌱 Зерно (Enter = случайное): ").strip()
+                    analyzer.run_sample(count, by, int(seed_input) if seed_input.isdigit() else None)
+        
         elif choice == "0":
             print("\n👋 До свидания!")
             break
@@ -78,5 +169,511 @@ def main():
     print("\n✨ Готово! Проверьте папку 'results' для отчёта.")
 
 
+def _add_shared_paths(parser: argparse.ArgumentParser) -> None:
+    """Пути к общим файлам распределённого режима (общий диск всех узлов)."""
+    parser.add_argument("--queue", type=Path, default=TASK_QUEUE_PATH, help="очередь задач (SQLite)")
+    parser.add_argument("--store", type=Path, default=CARD_STORE_PATH, help="хранилище карт (SQLite)")
+    parser.add_argument("--cache", type=Path, default=DIR_HTML_CACHE, help="директория HTML-кэша")
+
+
+def run_distributed(args: argparse.Namespace) -> None:
+    """Команды распределённого режима: enqueue, worker, status, merge."""
+    queue = TaskQueue(args.queue)
+    store = CardStore(args.store)
+    coordinator = Coordinator(queue, store)
+    
+    if args.command == "enqueue":
+        if args.random:
+            added = coordinator.submit_random(args.job, args.random)
+        elif args.targets:
+            added = coordinator.submit_targets(args.job, args.targets)
+        else:
+            added = coordinator.submit_parse_cache(args.job, CardDownloader(args.cache))
+        print(f"📥 Задание {args.job}: добавлено задач: {added}")
+    
+    elif args.command == "worker":
+        # Пауза между запросами не нужна: частоту ограничивает общий лимит
+        limiter = SharedRateLimiter(args.queue, args.rps)
+        downloader = CardDownloader(args.cache, delay=0, rate_limiter=limiter)
+        Worker(queue, store, downloader).run(args.job, wait=args.wait)
+    
+    elif args.command == "status":
+        stats = coordinator.status(args.job)
+        print(f"📊 Задачи: в очереди {stats['pending']}, в работе {stats['leased']}, "
+              f"готово {stats['done']}, с ошибкой {stats['failed']}; карт: {stats['cards']}")
+    
+    elif args.command == "merge":
+        coordinator.merge(args.job, ExcelExporter())
+
+
+def run_replay_server(args: argparse.Namespace) -> None:
+    """Запускает локальный заменитель Scryfall до Ctrl+C."""
+    if args.synthetic:
+        corpus = ReplayCorpus.synthetic(args.synthetic, args.page_size)
+    else:
+        corpus = ReplayCorpus.from_cache(CardDownloader(args.cache, adaptive=False))
+    server = ReplayServer(
+        corpus,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        max_concurrent=args.max_concurrent,
+        retry_after=args.retry_after,
+        bandwidth=args.bandwidth
+    )
+    url = server.start(args.host, args.port)
+    print(f"🧪 Replay-сервер: {url} ({len(corpus)} страниц)")
+    print(f"   Запуск клиента: MTG_SCRYFALL_URL={url} MTG_CACHE_DIR=<отдельный кэш> python main.py")
+    try:
+        while True:
+            time.sleep(10)
+            stats = server.stats()
+            print(f"📈 {stats['rps']} запр/с, страниц {stats['pages']}, 429: {stats['throttled']}, "
+                  f"{stats['bytes'] / 1e6:.1f} МБ, пик одновременных {stats['peak_in_flight']}")
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"\n🛑 Сервер остановлен: {server.stats()}")
+
+
+def run_scoring_server(args: argparse.Namespace) -> None:
+    """Запускает сервис оценки до Ctrl+C."""
+    server = ScoringServer()
+    url = server.start(args.host, args.port)
+    print(f"⚖️ Сервис оценки: {url} (POST /score, /parse, /batch; GET /stats)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"\n🛑 Сервис остановлен: {json.dumps(server.stats(), ensure_ascii=False)}")
+
+
+def run_decks(args: argparse.Namespace) -> None:
+    """Анализ деклистов по картам общего хранилища."""
+    index = CardNameIndex()
+    index.add_many(CardStore(args.store).iter_cards(args.job))
+    if not len(index):
+        print("⚠️ Хранилище карт пусто. Заполните его, например: "
+              "python main.py enqueue --job corpus --parse-cache && python main.py worker")
+        return
+    print(f"📇 Индекс: {len(index)} карт")
+    
+    decks = DeckAnalyzer(index).analyze_many(load_decklists(args.path))
+    unresolved = sum(len(deck["unresolved"]) for deck in decks)
+    print(f"🃏 Колод: {len(decks)}, ненайденных названий: {unresolved}")
+    ExcelExporter().export_decks(decks)
+
+
+def _add_corpus_source(parser: argparse.ArgumentParser) -> None:
+    """Источник корпуса карт: кэш (по умолчанию), хранилище или снапшот."""
+    parser.add_argument("--limit", type=int, help="сколько страниц кэша взять (по умолчанию — все)")
+    parser.add_argument("--job", nargs="?", const="",
+                        help="брать карты из хранилища (с именем — только этого задания)")
+    parser.add_argument("--snapshot", type=Path, help="брать карты из снапшота (см. snapshot)")
+    _add_shared_paths(parser)
+
+
+def _load_corpus(args: argparse.Namespace) -> List[Card]:
+    """Карты из источника _add_corpus_source."""
+    if args.snapshot:
+        return CardSnapshot(args.snapshot).cards()
+    if args.job is not None:
+        return list(CardStore(args.store).iter_cards(args.job or None))
+    downloader = CardDownloader(args.cache, adaptive=False)
+    parser = HTMLCardParser()
+    files = downloader.list_cache(args.limit)
+    return [parser.parse(html, url) for chunk in downloader.iter_cache(files) for html, url in chunk]
+
+
+def run_snapshot(args: argparse.Namespace) -> None:
+    """Снапшот распарсенных и оценённых карт для мгновенного офлайн-старта."""
+    cards = _load_corpus(args)
+    if not cards:
+        print("⚠️ Нет карт для снапшота.")
+        return
+    started = time.perf_counter()
+    count = write_snapshot(cards, args.output)
+    print(f"🗂️ Снапшот: {count} карт → {args.output} ({time.perf_counter() - started:.2f} с)")
+
+
+def run_compare(args: argparse.Namespace) -> None:
+    """Оценка корпуса правилами config.py и наборами из JSON за один проход."""
+    rule_sets = {COMPARISON_BASELINE: get_offline_rules()}
+    for path in args.bundles:
+        rule_sets[path.stem] = RuleSet.load(path)
+    
+    cards = _load_corpus(args)
+    if not cards:
+        print("⚠️ Нет карт для сравнения.")
+        return
+    
+    started = time.perf_counter()
+    comparison = RuleSetComparison(rule_sets)
+    scores = comparison.score(cards)
+    summary, movers = comparison.movers(cards, scores, args.top)
+    print(f"⚖️ {len(cards)} карт × {len(rule_sets)} наборов правил за {time.perf_counter() - started:.2f} с")
+    for row in summary:
+        print(f"   {row['Набор']}: средний баланс {row['Средний баланс']}, "
+              f"изменилось карт {row['Изменилось карт']}, средняя Δ {row['Средняя Δ']}")
+    for row in movers[:10]:
+        print(f"   {row['Набор']}: {row['Название']} {row['Δ']:+}")
+    ExcelExporter().export_comparison(comparison.rows(cards, scores), summary, movers)
+
+
+def run_rules_check(args: argparse.Namespace) -> None:
+    """Совпадение линейного сопоставления с re и время разбора карт обоими способами."""
+    rules = get_default_rules()
+    patterns = [name for kind, name in rules.rule_names if kind in ("trigger", "effect", "drawback")]
+    patterns += [pattern for pattern, _ in ACTIVATION_PATTERNS]
+    texts = [card.text for card in _load_corpus(args) if card.text]
+    
+    mismatches = parity_mismatches(patterns, probe_texts(patterns, args.samples) + texts)
+    print(f"🧪 Паттернов: {len(patterns)}, нелинейных: {len(rules.nonlinear)}, "
+          f"текстов: {args.samples} синтетических + {len(texts)} карт")
+    for pattern, (text, expected, actual) in mismatches.items():
+        print(f"   ❌ {pattern!r}: re {expected}, linear {actual} на {text[:60]!r}")
+    if not mismatches:
+        print("✅ linear и re совпадают на всех текстах")
+    
+    for matcher in ("regex", "linear"):
+        checked = RuleSet(matcher=matcher, time_budget_ms=0)
+        timings = []
+        for text in texts:
+            started = time.perf_counter()
+            checked.rule_hits(text)
+            timings.append(time.perf_counter() - started)
+        if timings:
+            timings.sort()
+            p99 = timings[min(len(timings) - 1, int(0.99 * len(timings)))]
+            print(f"⏱️ {matcher}: p99 {p99 * 1000:.3f} мс, максимум {timings[-1] * 1000:.3f} мс на карту")
+
+
+def _search_source(args: argparse.Namespace) -> Dict[str, Any]:
+    """Источник карт поиска и отпечаток правил: индекс с другим источником устарел."""
+    source: Dict[str, Any] = {"rules": rules_fingerprint(get_default_rules())}
+    if args.snapshot:
+        stat = args.snapshot.stat()
+        source.update(snapshot=str(args.snapshot.resolve()), mtime=stat.st_mtime, size=stat.st_size)
+    else:
+        store = CardStore(args.store)
+        # Запись и перезапись карты дают новый rowid, удаление меняет число строк
+        source.update(store=str(args.store.resolve()), job=args.job,
+                      rows=store.count(args.job), last_rowid=store.last_rowid(args.job))
+    return source
+
+
+def run_search(args: argparse.Namespace) -> None:
+    """Карты, которые задел бы паттерн правила, и их текущие оценки."""
+    source = _search_source(args)
+    index = TrigramIndex.load(args.index) if args.index.exists() and not args.rebuild else None
+    if index is not None and index.source != source:
+        print("ℹ️ Индекс построен по другому источнику карт или правилам — строится заново")
+        index = None
+    if index is None:
+        cards = CardSnapshot(args.snapshot).cards() if args.snapshot else CardStore(args.store).iter_cards(args.job)
+        index = TrigramIndex.build(cards, source)
+        if not len(index):
+            print("⚠️ Хранилище карт пусто. Заполните его, например: "
+                  "python main.py enqueue --job corpus --parse-cache && python main.py worker")
+            return
+        index.save(args.index)
+    
+    try:
+        result = index.search(args.pattern, args.field, args.keyword, args.limit)
+    except re.error as e:
+        print(f"❌ Некорректное выражение: {e}")
+        return
+    print(f"🔎 Совпадений: {result['matches']} из {len(index)} карт "
+          f"(проверено кандидатов: {result['candidates']}, {result['ms']} мс)")
+    for card in result["cards"]:
+        line = f"   {card['name'][:30].ljust(30)} | {card['mana_cost'][:12].ljust(12)} | баланс {card['balance']}"
+        if args.weight is not None:
+            # Эффект засчитывается один раз; сумма способностей не меньше 0
+            ability = max(0, card["ability_points"] + args.weight)
+            line += f" → {card['balance'] - card['ability_points'] + ability:g}"
+        print(line)
+    if result["matches"] > len(result["cards"]):
+        print(f"   … ещё {result['matches'] - len(result['cards'])}")
+
+
+def run_watch(args: argparse.Namespace) -> None:
+    """Инкрементальная обработка новых страниц кэша до Ctrl+C."""
+    output = args.output or DIR_RESULTS / WATCH_FILENAME
+    watcher = CacheWatcher(CardDownloader(args.cache, adaptive=False), output, poll=args.poll)
+    stats = watcher.run(backlog=not args.new_only)
+    print(f"\n🛑 Наблюдение остановлено: карт {stats['cards']}, пакетов {stats['batches']}, "
+          f"пропущено {stats['skipped']} → {output}")
+
+
+def run_dataset(args: argparse.Namespace) -> None:
+    """Состояние и обслуживание инкрементального набора данных."""
+    dataset = CardDataset(args.root)
+    if args.action == "compact":
+        stats = dataset.compact(args.min_files)
+        print(f"🧹 Сжато партиций: {stats['partitions']}, файлов {stats['files_before']} → "
+              f"{stats['files_after']}, удалено устаревших строк: {stats['rows_dropped']}")
+    status = dataset.status()
+    print(f"🗃️ Набор данных {args.root} ({status['format']}): карт {status['cards']}, "
+          f"партиций {status['partitions']}, файлов {status['files']}, {status['bytes'] / 2 ** 20:.1f} МБ")
+    if args.action == "status":
+        for partition in dataset.partitions(args.date, args.set):
+            entries = dataset.manifest["partitions"][partition]
+            print(f"   {partition}: файлов {len(entries)}, строк {sum(entry['rows'] for entry in entries)}")
+        if status["last_run"]:
+            run = status["last_run"]
+            print(f"   Последний запуск {run['run']}: новых {run['new']}, изменённых {run['changed']}, "
+                  f"без изменений {run['unchanged']}")
+
+
+def run_aggregates(args: argparse.Namespace) -> None:
+    """Сводки корпуса хранилища: дополняются только новыми картами."""
+    started = time.perf_counter()
+    aggregates, added = refresh_aggregates(
+        CardStore(args.store), args.state, args.job, workers=args.workers, rebuild=args.rebuild
+    )
+    print(f"📈 Агрегаты: карт {aggregates.cards} (новых {added}, {time.perf_counter() - started:.2f} с)")
+    if not aggregates.cards:
+        return
+    tables = aggregates.tables(top=args.top)
+    for title, df in tables.items():
+        print(f"\n📊 {title}:")
+        print(df.to_string(index=False))
+    if args.excel:
+        ExcelExporter().export_aggregates(tables, aggregates.cards)
+
+
+def run_calibration(args: argparse.Namespace) -> None:
+    """Подбор весов правил по матрице срабатываний эталонного корпуса."""
+    rules = get_offline_rules()
+    matrix = None
+    if args.matrix.exists() and not args.rebuild:
+        matrix = RuleHitMatrix.load(args.matrix)
+        if not matrix.matches(rules):
+            print("♻️ Правила изменились — матрица срабатываний будет построена заново")
+            matrix = None
+    if matrix is None:
+        matrix = RuleHitMatrix.build(CardStore(args.store).iter_cards(args.job), rules)
+        if not matrix.shape[0]:
+            print("⚠️ Хранилище карт пусто. Заполните его, например: "
+                  "python main.py enqueue --job corpus --parse-cache && python main.py worker")
+            return
+        matrix.save(args.matrix)
+    cards, rule_count = matrix.shape
+    print(f"🧮 Матрица: {cards} карт × {rule_count} правил, {len(matrix.data)} срабатываний "
+          f"({int((matrix.rule_counts() > 0).sum())} правил встречаются в корпусе)")
+
+    started = time.perf_counter()
+    before = matrix.balance(rules.weights)
+    elapsed = time.perf_counter() - started
+    print(f"⏱️ Пересчёт баланса всех карт для одного набора весов: {elapsed * 1000:.2f} мс")
+
+    weights = calibrate(matrix, rules.weights, ridge=args.ridge).round(args.digits)
+    after = matrix.balance(weights)
+
+    def summary(balance) -> str:
+        return (f"средний {balance.mean():+.2f}, средний |баланс| {abs(balance).mean():.2f}, "
+                f"RMS {(balance ** 2).mean() ** 0.5:.2f}")
+
+    print(f"📉 До:    {summary(before)}")
+    print(f"📈 После: {summary(after)}")
+
+    changes = sorted(
+        ((weights[i] - old, name) for i, (old, name) in enumerate(zip(rules.weights, rules.rule_names))
+         if weights[i] != old),
+        key=lambda change: -abs(change[0])
+    )
+    print(f"🔧 Изменено весов: {len(changes)}")
+    for delta, (kind, name) in changes[:args.top]:
+        print(f"   {kind}:{name} {delta:+g}")
+
+    output = args.output or DIR_RESULTS / CALIBRATED_RULES_FILENAME
+    output.parent.mkdir(parents=True, exist_ok=True)
+    save_bundle(rules, weights, output, args.digits)
+    print(f"💾 Набор правил сохранён: {output}")
+
+
+def run_cli(argv: List[str]) -> None:
+    """Неинтерактивный запуск отдельных команд (для длинных и фоновых задач)."""
+    parser = argparse.ArgumentParser(prog="main.py", description="MTG Card Analyzer")
+    parser.add_argument("--profile", default=PROFILE, metavar="MODES",
+                        help="профилировать запуск: cprofile,tracemalloc,sampling или all "
+                             "(артефакты — рядом с отчётом)")
+    parser.add_argument("--output-format", choices=("excel", "dataset"), default=OUTPUT_FORMAT,
+                        help="итоговый вывод: новая книга Excel или дозапись в набор данных")
+    parser.add_argument("--max-memory", default=MAX_MEMORY, metavar="SIZE",
+                        help="бюджет памяти запуска (например, 2G): карты сверх него сбрасываются на диск")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    online = commands.add_parser("online", help="загрузить и проанализировать N случайных карт")
+    online.add_argument("count", type=int, help="количество карт")
+    
+    offline = commands.add_parser("offline", help="проанализировать кэш")
+    offline.add_argument("--limit", type=int, help="сколько карт из кэша (по умолчанию — все)")
+    offline.add_argument("--snapshot", type=Path, help="взять карты из снапшота вместо HTML-кэша")
+    
+    targets = commands.add_parser("targets", help="загрузить и проанализировать карты по списку")
+    targets.add_argument("path", type=Path, help="файл со списком карт (URL или set/номер)")
+    
+    resume = commands.add_parser("resume", help="продолжить прерванный запуск")
+    resume.add_argument("job_id", nargs="?", help="ID задания (по умолчанию — последнее незавершённое)")
+    
+    enqueue = commands.add_parser("enqueue", help="поставить задачи в общую очередь")
+    enqueue.add_argument("--job", required=True, help="имя задания")
+    source = enqueue.add_mutually_exclusive_group(required=True)
+    source.add_argument("--random", type=int, metavar="N", help="N случайных карт")
+    source.add_argument("--targets", type=Path, metavar="FILE", help="файл со списком карт")
+    source.add_argument("--parse-cache", action="store_true", help="распарсить весь общий кэш")
+    _add_shared_paths(enqueue)
+    
+    worker = commands.add_parser("worker", help="выполнять задачи из общей очереди")
+    worker.add_argument("--job", help="брать задачи только этого задания")
+    worker.add_argument("--rps", type=float, default=GLOBAL_RPS, help="общий лимит запросов в секунду")
+    worker.add_argument("--wait", action="store_true", help="ждать новых задач на пустой очереди")
+    _add_shared_paths(worker)
+    
+    status = commands.add_parser("status", help="статус общей очереди")
+    status.add_argument("--job", help="имя задания")
+    _add_shared_paths(status)
+    
+    merge = commands.add_parser("merge", help="собрать отчёт задания из общего хранилища")
+    merge.add_argument("--job", required=True, help="имя задания")
+    _add_shared_paths(merge)
+    
+    replay = commands.add_parser("replay-server", help="локальный заменитель Scryfall для нагрузочных тестов")
+    replay.add_argument("--cache", type=Path, default=DIR_HTML_CACHE, help="кэш, страницы которого отдавать")
+    replay.add_argument("--synthetic", type=int, metavar="N", help="вместо кэша — N синтетических страниц")
+    replay.add_argument("--page-size", type=int, default=REPLAY_PAGE_SIZE, help="размер синтетической страницы, байт")
+    replay.add_argument("--host", default=REPLAY_HOST)
+    replay.add_argument("--port", type=int, default=REPLAY_PORT)
+    replay.add_argument("--latency", default=REPLAY_LATENCY,
+                        help="задержка, мс: fixed:50 | uniform:20:80 | exp:50 | lognormal:80:0.5")
+    replay.add_argument("--throttle-rate", type=float, default=0.0, help="доля случайных ответов 429")
+    replay.add_argument("--max-concurrent", type=int, default=0, help="одновременных запросов до ответа 429")
+    replay.add_argument("--retry-after", type=int, help="Retry-After в ответах 429, секунд")
+    replay.add_argument("--bandwidth", type=float, help="полоса сервера, байт/с")
+    
+    sample = commands.add_parser("sample", help="анализ случайной выборки из кэша (без сети)")
+    sample.add_argument("count", type=int, help="размер выборки")
+    sample.add_argument("--by", choices=SAMPLE_STRATA, help="стратификация (по умолчанию — равномерно)")
+    sample.add_argument("--seed", type=int, help="зерно для воспроизводимой выборки")
+    
+    serve = commands.add_parser("serve", help="резидентный сервис оценки карт (HTTP)")
+    serve.add_argument("--host", default=SCORING_HOST)
+    serve.add_argument("--port", type=int, default=SCORING_PORT)
+    
+    decks = commands.add_parser("decks", help="анализ деклистов по хранилищу карт")
+    decks.add_argument("path", type=Path, help="файл деклиста или директория с деклистами")
+    decks.add_argument("--job", help="брать карты только этого задания (по умолчанию — все)")
+    _add_shared_paths(decks)
+    
+    compare = commands.add_parser("compare", help="сравнить наборы правил на одном корпусе")
+    compare.add_argument("bundles", type=Path, nargs="+", help="наборы правил (JSON, см. calibrate)")
+    compare.add_argument("--top", type=int, default=COMPARISON_TOP_MOVERS, help="крупнейших изменений на набор")
+    _add_corpus_source(compare)
+    
+    snapshot = commands.add_parser("snapshot", help="снапшот карт и оценок (Arrow) для мгновенного старта")
+    snapshot.add_argument("--output", type=Path, default=SNAPSHOT_PATH, help="файл снапшота")
+    _add_corpus_source(snapshot)
+    
+    search = commands.add_parser("search", help="какие карты задевает паттерн (триграммный индекс)")
+    search.add_argument("pattern", help="регулярное выражение, как в config.py (без учёта регистра)")
+    search.add_argument("--keyword", action="store_true", help="искать подстроку, а не выражение")
+    search.add_argument("--field", choices=INDEX_FIELDS, default="text", help="поле карты")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT, help="сколько карт показать")
+    search.add_argument("--weight", type=float, help="показать баланс, если добавить эффект с этим весом")
+    search.add_argument("--job", help="индексировать карты только этого задания (по умолчанию — все)")
+    search.add_argument("--snapshot", type=Path, help="индексировать карты снапшота вместо хранилища")
+    search.add_argument("--index", type=Path, default=SEARCH_INDEX_PATH, help="файл индекса")
+    search.add_argument("--rebuild", action="store_true", help="построить индекс заново")
+    _add_shared_paths(search)
+    
+    rules_check = commands.add_parser("rules-check", help="проверить линейное сопоставление правил против re")
+    rules_check.add_argument("--samples", type=int, default=RULES_PARITY_SAMPLES, help="синтетических текстов")
+    _add_corpus_source(rules_check)
+    
+    watch = commands.add_parser("watch", help="следить за кэшем и обрабатывать новые страницы")
+    watch.add_argument("--cache", type=Path, default=DIR_HTML_CACHE, help="директория HTML-кэша")
+    watch.add_argument("--output", type=Path, help=f"накопительный CSV (по умолчанию results/{WATCH_FILENAME})")
+    watch.add_argument("--poll", action="store_true", help="опрашивать манифест вместо inotify")
+    watch.add_argument("--new-only", action="store_true", help="не обрабатывать страницы, уже лежащие в кэше")
+    
+    dataset = commands.add_parser("dataset", help="инкрементальный набор данных: состояние и сжатие")
+    dataset.add_argument("action", choices=("status", "compact"))
+    dataset.add_argument("--root", type=Path, default=DATASET_DIR, help="корень набора данных")
+    dataset.add_argument("--date", action="append", help="показать только партиции этой даты (YYYY-MM-DD)")
+    dataset.add_argument("--set", action="append", help="показать только партиции этого сета")
+    dataset.add_argument("--min-files", type=int, default=DATASET_COMPACT_MIN_FILES,
+                         help="сжимать партиции, где файлов не меньше")
+    
+    aggregates = commands.add_parser("aggregates", help="сводки корпуса по цвету, стоимости, типу и правилам")
+    aggregates.add_argument("--job", help="только карты этого задания (по умолчанию — все)")
+    aggregates.add_argument("--state", type=Path, default=AGGREGATES_PATH, help="файл состояния агрегатов")
+    aggregates.add_argument("--rebuild", action="store_true", help="собрать заново по всему хранилищу")
+    aggregates.add_argument("--workers", type=int, default=1, help="процессов для разбора новых карт")
+    aggregates.add_argument("--top", type=int, default=AGGREGATES_TOP_RULES, help="сколько правил показать")
+    aggregates.add_argument("--excel", action="store_true", help="сохранить сводки в Excel")
+    _add_shared_paths(aggregates)
+    
+    calibration = commands.add_parser("calibrate", help="подобрать веса правил под нулевой баланс корпуса")
+    calibration.add_argument("--job", help="эталонный корпус — карты этого задания (по умолчанию — все)")
+    calibration.add_argument("--matrix", type=Path, default=RULE_HITS_PATH, help="файл матрицы срабатываний")
+    calibration.add_argument("--rebuild", action="store_true", help="построить матрицу заново")
+    calibration.add_argument("--ridge", type=float, default=CALIBRATION_RIDGE, help="сила регуляризации")
+    calibration.add_argument("--digits", type=int, default=0, help="знаков после запятой в весах (0 — целые)")
+    calibration.add_argument("--top", type=int, default=15, help="сколько крупнейших изменений показать")
+    calibration.add_argument("--output", type=Path, help="куда сохранить набор правил (JSON)")
+    _add_shared_paths(calibration)
+    
+    args = parser.parse_args(argv)
+    try:
+        parse_modes(args.profile)
+        parse_size(args.max_memory)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    def analyzer() -> MTGCardAnalyzer:
+        return MTGCardAnalyzer(args.profile, args.output_format, args.max_memory)
+    
+    if args.command == "online":
+        analyzer().run_online(args.count)
+    elif args.command == "offline":
+        if args.snapshot:
+            analyzer().run_snapshot(args.snapshot)
+        else:
+            analyzer().run_offline(args.limit)
+    elif args.command == "targets":
+        analyzer().run_targets(args.path)
+    elif args.command == "resume":
+        analyzer().resume(args.job_id)
+    elif args.command == "sample":
+        analyzer().run_sample(args.count, args.by, args.seed)
+    elif args.command == "replay-server":
+        run_replay_server(args)
+    elif args.command == "serve":
+        run_scoring_server(args)
+    elif args.command == "decks":
+        run_decks(args)
+    elif args.command == "snapshot":
+        run_snapshot(args)
+    elif args.command == "compare":
+        run_compare(args)
+    elif args.command == "search":
+        run_search(args)
+    elif args.command == "rules-check":
+        run_rules_check(args)
+    elif args.command == "watch":
+        run_watch(args)
+    elif args.command == "dataset":
+        run_dataset(args)
+    elif args.command == "aggregates":
+        run_aggregates(args)
+    elif args.command == "calibrate":
+        run_calibration(args)
+    else:
+        run_distributed(args)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""Сопоставление правил оценки с текстом карты за линейное время."""
+
+import random
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Квантификатор после атома; "{" без чисел — обычный символ, как в re
+_QUANTIFIER = re.compile(r'[*+?]|\{(?:\d+(?:,\d*)?|,\d+)\}')
+_UNBOUNDED = ('*', '+')
+
+Atom = Tuple[str, str]  # (атом regex, квантификатор или "")
+
+
+def _tokens(pattern: str) -> Iterator[Atom]:
+    """
+    Атомы паттерна с квантификаторами.
+
+    Raises:
+        ValueError: Конструкция вне линейного подмножества
+            (группы, альтернативы, якоря, обратные ссылки, ленивые и
+            сверхжадные квантификаторы).
+    """
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            atom = pattern[i:i + 2]
+            if len(atom) < 2 or atom[1].isdigit() or atom[1] in 'AbBZ':
+                raise ValueError(f"неподдерживаемая конструкция {atom!r}")
+        elif char == '[':
+            end = i + 1
+            if pattern[end:end + 1] == '^':
+                end += 1
+            if pattern[end:end + 1] == ']':
+                end += 1
+            while end < len(pattern) and pattern[end] != ']':
+                end += 2 if pattern[end] == '\\' else 1
+            if end >= len(pattern):
+                raise ValueError("незакрытый класс символов")
+            atom = pattern[i:end + 1]
+        elif char in '()|^$' or _QUANTIFIER.match(pattern, i):
+            raise ValueError(f"неподдерживаемая конструкция {char!r}")
+        else:
+            atom = char
+        i += len(atom)
+        quantifier = _QUANTIFIER.match(pattern, i)
+        quantifier = quantifier.group() if quantifier else ""
+        i += len(quantifier)
+        if quantifier and pattern[i:i + 1] in ('?', '+'):
+            raise ValueError("ленивые и сверхжадные квантификаторы не поддерживаются")
+        yield atom, quantifier
+
+
+def _unbounded(quantifier: str) -> bool:
+    return quantifier in _UNBOUNDED or quantifier.endswith(',}')
+
+
+def _optional(quantifier: str) -> bool:
+    return quantifier in ('*', '?') or quantifier.startswith(('{0,', '{0}', '{,'))
+
+
+def _literal(atom: str) -> Optional[str]:
+    """Символ атома или None, если атом — класс символов."""
+    if atom == '.' or atom.startswith('['):
+        return None
+    if atom.startswith('\\'):
+        return None if atom[1].isalpha() else atom[1]
+    return atom
+
+
+class LinearPattern:
+    """
+    Правило вида S1.*S2.*…Sn, проверяемое без возвратов.
+
+    Сегменты Si — последовательности символов и классов (\\d, [WUBRGC])
+    с квантификаторами, но без ".*". Совпадение ищется на каждой строке
+    текста (как и у re, "." не захватывает перевод строки): сегменты
+    находятся по очереди, каждый — после конца предыдущего, с самым
+    ранним концом. Сегменты из одних символов ищутся str.find, остальные —
+    короткими regex без вложенных повторов, поэтому время проверки
+    линейно по длине текста.
+
+    Число совпадений (как len(re.findall)) для правила с ".*" — число
+    строк с совпадением: жадный ".*" доходит до последнего вхождения
+    сегмента в строке. Правило без ".*" считается одним regex-сегментом.
+
+    Attributes:
+        pattern: Исходный паттерн.
+        segments: Сегменты: строка (ищется как есть) или regex.
+        required: Строковые сегменты (проверка до разбора по строкам).
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        parts: List[List[Atom]] = [[]]
+        wildcards = 0
+        for atom, quantifier in _tokens(pattern):
+            if atom == '.' and _unbounded(quantifier):
+                if quantifier == '+':
+                    parts[-1].append(('.', ''))  # .+ — один символ и .*
+                parts.append([])
+                wildcards += 1
+            else:
+                parts[-1].append((atom, quantifier))
+
+        # Сегменты, совпадающие с пустой строкой, после ".*" ничего не проверяют
+        parts = [part for part in parts if part and not all(_optional(q) for _, q in part)]
+        if not parts:
+            raise ValueError("паттерн совпадает с пустой строкой")
+        self.per_line = wildcards > 0
+        if self.per_line:
+            self.segments = [self._segment(part, lazy=True) for part in parts]
+        else:
+            self.segments = [self._segment(parts[0], lazy=False)]
+        # Быстрый отказ: строковые сегменты должны встречаться в тексте хотя бы раз
+        self.required = [segment for segment in self.segments if isinstance(segment, str)]
+        self._first = self.required[0] if self.required else ""
+
+    @staticmethod
+    def _segment(atoms: List[Atom], lazy: bool) -> Union[str, re.Pattern]:
+        """
+        Строка, если сегмент — одни символы, иначе regex.
+
+        Ленивые квантификаторы дают самый ранний конец совпадения; ведущий
+        неограниченный повтор не начинается внутри серии своих символов,
+        иначе поиск по длинной серии цифр стал бы квадратичным.
+        """
+        if all(not quantifier and _literal(atom) is not None for atom, quantifier in atoms):
+            return "".join(_literal(atom) for atom, _ in atoms).lower()
+        regex = "".join(atom + quantifier + ('?' if lazy and quantifier else '') for atom, quantifier in atoms)
+        first, quantifier = atoms[0]
+        if _unbounded(quantifier):
+            regex = f"(?<!{first}){regex}"
+        return re.compile(regex, re.IGNORECASE)
+
+    def _line_match(self, line: str) -> bool:
+        position = 0
+        for segment in self.segments:
+            if isinstance(segment, str):
+                found = line.find(segment, position)
+                if found < 0:
+                    return False
+                position = found + len(segment)
+            else:
+                # Срез: ограничитель повтора не должен видеть конец прошлого сегмента
+                match = segment.search(line[position:])
+                if not match:
+                    return False
+                position += match.end()
+        return True
+
+    def _lines(self, text: str) -> List[str]:
+        """Строки текста, на которых возможно совпадение."""
+        for segment in self.required:
+            if segment not in text:
+                return []
+        return text.split('\n') if '\n' in text else [text]
+
+    def search(self, text: str) -> bool:
+        """Есть ли совпадение (текст в нижнем регистре)."""
+        if not self.per_line:
+            segment = self.segments[0]
+            return segment in text if isinstance(segment, str) else segment.search(text) is not None
+        if self._first not in text:
+            return False
+        return any(self._line_match(line) for line in self._lines(text))
+
+    def count(self, text: str) -> int:
+        """Число непересекающихся совпадений (как len(re.findall))."""
+        if not self.per_line:
+            segment = self.segments[0]
+            return text.count(segment) if isinstance(segment, str) else len(segment.findall(text))
+        if self._first not in text:
+            return 0
+        return sum(1 for line in self._lines(text) if self._line_match(line))
+
+
+class RegexPattern:
+    """Правило, проверяемое модулем re как есть (возможны возвраты)."""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, re.IGNORECASE)
+
+    def search(self, text: str) -> bool:
+        return self.regex.search(text) is not None
+
+    def count(self, text: str) -> int:
+        return len(self.regex.findall(text))
+
+
+def compile_rule(pattern: str, matcher: str) -> Tuple[Union[LinearPattern, RegexPattern], Optional[str]]:
+    """
+    Компилирует правило выбранным способом сопоставления.
+
+    Args:
+        pattern: Паттерн правила.
+        matcher: "linear" или "regex".
+
+    Returns:
+        Tuple: (правило, причина, по которой оно не линейное, или None).
+    """
+    if matcher == "regex":
+        return RegexPattern(pattern), None
+    try:
+        return LinearPattern(pattern), None
+    except ValueError as e:
+        return RegexPattern(pattern), str(e)
+
+
+def probe_texts(patterns: Iterable[str], count: int, seed: int = 0) -> List[str]:
+    """
+    Синтетические тексты для проверки правил: случайные сочетания
+    фрагментов самих паттернов, чисел, символов маны и переводов строк.
+    """
+    words = {'1', '23', '/', '+1/+1', '3/3', 'x', '{t}:', '{2}{t}:', '{12}{t}:', '{w}', '{r}{g}', '\n'}
+    for pattern in patterns:
+        words.update(word for word in re.split(r'\.\*|\\[a-z]|[\\\[\]{}()+*?|^$]', pattern.lower()) if word.strip())
+    words = sorted(words)
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 30))) for _ in range(count)]
+
+
+def parity_mismatches(patterns: Sequence[str], texts: Iterable[str]) -> Dict[str, Tuple[str, Tuple, Tuple]]:
+    """
+    Сравнивает LinearPattern с re (search и число совпадений) на текстах.
+
+    Returns:
+        Dict: паттерн -> первый расходящийся текст, (search, count) у re и у linear.
+            Паттерны вне линейного подмножества не проверяются.
+    """
+    pairs = []
+    for pattern in patterns:
+        try:
+            pairs.append((pattern, RegexPattern(pattern), LinearPattern(pattern)))
+        except ValueError:
+            continue
+    mismatches: Dict[str, Tuple[str, Tuple, Tuple]] = {}
+    for text in texts:
+        text = text.lower()
+        for pattern, regex, linear in pairs:
+            if pattern in mismatches:
+                continue
+            expected = (regex.search(text), regex.count(text))
+            actual = (linear.search(text), linear.count(text))
+            if expected != actual:
+                mismatches[pattern] = (text, expected, actual)
+    return mismatches
@@ -0,0 +1,423 @@
+"""Скомпилированные правила балльной оценки карт."""
+
+import json
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from config import (
+    MANA_COST_RULES,
+    PT_MULTIPLIER,
+    KEYWORD_ABILITIES,
+    TRIGGER_PATTERNS,
+    EFFECT_PATTERNS,
+    ACTIVATED_ABILITY_COST,
+    DRAWBACK_PATTERNS,
+    SYNERGY_BONUSES,
+    ABILITY_CALCULATION,
+    RULES_MATCHER,
+    RULES_CARD_TIME_BUDGET_MS,
+)
+from models.matching import compile_rule
+
+MANA_COLORS = {'W', 'U', 'B', 'R', 'G'}
+
+# Паттерны активации: {T}, {N}{T}, жертва, сброс -> ключ ACTIVATED_ABILITY_COST
+ACTIVATION_PATTERNS = [
+    (r'{t}:', 'tap_only'),
+    (r'{[01]}{t}:', 'tap_mana_1'),
+    (r'{[23]}{t}:', 'tap_mana_2_3'),
+    (r'{[4-9]}{t}:', 'tap_mana_4_plus'),
+    (r'{[0-9]{2,}}{t}:', 'tap_mana_4_plus'),
+    (r'sacrifice', 'sacrifice'),
+    (r'пожертвуйте', 'sacrifice'),
+    (r'discard', 'discard'),
+    (r'сбросьте', 'discard'),
+]
+
+SLOW_CARDS_KEPT = 20
+
+_TRIGGER_WORDS = r'whenever|when|at the beginning|каждый раз|когда|в начале'
+
+
+class PartialHits(dict):
+    """Срабатывания прерванного по пределу времени разбора: проверены не все правила."""
+
+    truncated = True
+
+
+class _Truncated(Exception):
+    """Очки по неполному разбору: lru_cache не кэширует исключения."""
+
+    def __init__(self, points: float):
+        super().__init__(points)
+        self.points = points
+
+
+class RuleSet:
+    """
+    Правила оценки карты, скомпилированные один раз.
+
+    Регулярные выражения из config.py компилируются при создании набора,
+    а очки способностей кэшируются по тексту: одинаковые тексты (печати
+    одной карты, повторы в пакете) считаются один раз. Card и сервис
+    оценки используют общий набор get_default_rules().
+
+    Паттерны проверяются способом RULES_MATCHER: "linear" — за линейное
+    время (models.matching), правила вне линейного подмножества — через
+    re с предупреждением при загрузке. Разбор текста одной карты
+    ограничен RULES_CARD_TIME_BUDGET_MS: по истечении времени оставшиеся
+    правила пропускаются, rule_hits возвращает PartialHits, а прерывание
+    учитывается в timeouts. Неполные очки не кэшируются; пакетные и
+    офлайн-пути, чьи результаты сохраняются, берут get_offline_rules()
+    без предела.
+
+    Каждое правило — столбец с весом: очки способностей равны взвешенной
+    сумме срабатываний (rule_hits), так что набор можно перевзвесить без
+    повторного разбора текстов и сохранить в JSON (to_bundle / load).
+
+    Attributes:
+        rule_names: Правила по столбцам: (вид, ключ или паттерн).
+        weights: Веса правил по столбцам.
+        keywords: Ключевые слова и номера их столбцов.
+        triggers: Скомпилированные триггеры и номера столбцов.
+        effects: Скомпилированные эффекты и номера столбцов.
+        activations: Скомпилированные паттерны активации и номера столбцов.
+        drawbacks: Скомпилированные недостатки и номера столбцов.
+        synergies: Группы слов синергий и номера столбцов.
+        settings: Лимиты и пороги (ABILITY_CALCULATION).
+        mana_rules: Правила стоимости маны (MANA_COST_RULES).
+        pt_multiplier: Коэффициент для P/T.
+        matcher: Способ сопоставления паттернов ("linear" или "regex").
+        nonlinear: Правила, проверяемые через re: (вид, паттерн, причина).
+        time_budget: Предел времени разбора текста карты в секундах (0 — без предела).
+        timeouts: Сколько разборов прервано по пределу времени.
+        slow_cards: Начала текстов прерванных разборов (первые SLOW_CARDS_KEPT).
+    """
+
+    def __init__(
+        self,
+        keywords: Dict[str, int] = KEYWORD_ABILITIES,
+        triggers: Dict[str, int] = TRIGGER_PATTERNS,
+        effects: Dict[str, int] = EFFECT_PATTERNS,
+        activation_costs: Dict[str, int] = ACTIVATED_ABILITY_COST,
+        drawbacks: Dict[str, int] = DRAWBACK_PATTERNS,
+        synergies: Dict[str, Dict[str, Any]] = SYNERGY_BONUSES,
+        settings: Dict[str, Any] = ABILITY_CALCULATION,
+        mana_rules: Dict[str, Any] = MANA_COST_RULES,
+        pt_multiplier: int = PT_MULTIPLIER,
+        matcher: str = RULES_MATCHER,
+        time_budget_ms: float = RULES_CARD_TIME_BUDGET_MS
+    ):
+        if matcher not in ("linear", "regex"):
+            raise ValueError(f"неизвестный способ сопоставления правил: {matcher}")
+        self.matcher = matcher
+        self.nonlinear: List[Tuple[str, str, str]] = []
+        self.time_budget = time_budget_ms / 1000
+        self.timeouts = 0
+        self.slow_cards: List[str] = []
+        self.rule_names: List[Tuple[str, str]] = []
+        self.weights: List[float] = []
+        self.keywords = [(keyword, self._column("keyword", keyword, value)) for keyword, value in keywords.items()]
+        self.triggers = [
+            (self._compile("trigger", pattern), self._column("trigger", pattern, value))
+            for pattern, value in triggers.items()
+        ]
+        self.effects = [
+            (self._compile("effect", pattern), self._column("effect", pattern, value))
+            for pattern, value in effects.items()
+        ]
+        # Несколько паттернов (sacrifice / пожертвуйте) делят один вес и один столбец
+        cost_columns: Dict[str, int] = {}
+        for _, cost_type in ACTIVATION_PATTERNS:
+            if cost_type not in cost_columns:
+                cost_columns[cost_type] = self._column("activation", cost_type, activation_costs[cost_type])
+        self.activations = [
+            (self._compile("activation", pattern), cost_columns[cost_type])
+            for pattern, cost_type in ACTIVATION_PATTERNS
+        ]
+        self.synergy_keywords = {name: list(data['keywords']) for name, data in synergies.items()}
+        self.synergies = [
+            # Слова синергии проверяются группами: keywords[i::n//2] для i < n//2
+            ([words[i::len(words) // 2] for i in range(len(words) // 2)],
+             self._column("synergy", name, synergies[name]['bonus']))
+            for name, words in self.synergy_keywords.items()
+        ]
+        self.trigger_words = re.compile(_TRIGGER_WORDS, re.IGNORECASE)
+        self.multiple_triggers = self._column("bonus", "multiple_triggers", settings['multiple_triggers_bonus'])
+        self.drawbacks = [
+            (self._compile("drawback", pattern), self._column("drawback", pattern, value))
+            for pattern, value in drawbacks.items()
+        ]
+        for kind, pattern, reason in self.nonlinear:
+            print(f"⚠️ Правило {kind} {pattern!r} проверяется через re (возможны возвраты): {reason}")
+        self.settings = settings
+        self.mana_rules = mana_rules
+        self.pt_multiplier = pt_multiplier
+        self._cached_points = lru_cache(maxsize=65536)(self._ability_points)
+
+    def _compile(self, kind: str, pattern: str) -> Any:
+        """Паттерн правила выбранным способом; нелинейные попадают в nonlinear."""
+        compiled, reason = compile_rule(pattern, self.matcher)
+        if reason:
+            self.nonlinear.append((kind, pattern, reason))
+        return compiled
+
+    def _column(self, kind: str, name: str, weight: float) -> int:
+        """Регистрирует правило; возвращает его номер (столбец матрицы срабатываний)."""
+        self.rule_names.append((kind, name))
+        self.weights.append(weight)
+        return len(self.weights) - 1
+
+    def rule_hits(self, text: str) -> Dict[int, int]:
+        """
+        Срабатывания правил на тексте карты с учётом лимитов повторов.
+
+        Очки способностей — max(0, Σ weights[rule] × hits[rule]), поэтому
+        для другого набора весов текст не нужно разбирать заново. Если
+        разбор не уложился в time_budget, оставшиеся правила пропускаются.
+
+        Returns:
+            Dict: номер правила (rule_names) -> число засчитанных срабатываний;
+            PartialHits, если разбор прерван.
+        """
+        hits: Dict[int, int] = {}
+        if not text or text.strip() == "":
+            return hits
+
+        text = text.lower()
+        deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+
+        def expired() -> bool:
+            if deadline is None or time.perf_counter() <= deadline:
+                return False
+            self.timeouts += 1
+            if len(self.slow_cards) < SLOW_CARDS_KEPT:
+                self.slow_cards.append(text[:60])
+            nonlocal hits
+            hits = PartialHits(hits)
+            return True
+
+        max_triggers = self.settings['max_duplicate_triggers']
+        max_activated = self.settings['max_activated_abilities']
+
+        # 1. Ключевые слова
+        for keyword, column in self.keywords:
+            if keyword in text:
+                hits[column] = 1
+
+        # 2. Триггеры: каждый паттерн — до max_duplicate_triggers раз
+        for pattern, column in self.triggers:
+            matches = pattern.count(text)
+            if matches:
+                hits[column] = min(matches, max_triggers)
+            if expired():
+                return hits
+
+        # 3. Эффекты
+        for pattern, column in self.effects:
+            if pattern.search(text):
+                hits[column] = 1
+            if expired():
+                return hits
+
+        # 4. Активируемые способности
+        for pattern, column in self.activations:
+            matches = pattern.count(text)
+            if matches:
+                hits[column] = hits.get(column, 0) + min(matches, max_activated)
+            if expired():
+                return hits
+
+        # 5. Синергии и бонус за множественные триггеры
+        for groups, column in self.synergies:
+            if all(any(word in text for word in group) for group in groups):
+                hits[column] = 1
+        if len(self.trigger_words.findall(text)) >= self.settings['multiple_triggers_threshold']:
+            hits[self.multiple_triggers] = 1
+
+        # 6. Штрафы
+        for pattern, column in self.drawbacks:
+            if pattern.search(text):
+                hits[column] = 1
+            if expired():
+                return hits
+
+        return hits
+
+    def ability_points(self, text: str) -> float:
+        """
+        Стоимость способностей по тексту карты (см. Card.calculate_ability_points).
+
+        Результат кэшируется по тексту, кроме прерванных разборов.
+
+        Returns:
+            Сумма очков способностей, не меньше 0.
+        """
+        try:
+            return self._cached_points(text)
+        except _Truncated as e:
+            return e.points
+
+    def _ability_points(self, text: str) -> float:
+        hits = self.rule_hits(text)
+        points = max(0, sum(self.weights[column] * count for column, count in hits.items()))
+        if isinstance(hits, PartialHits):
+            raise _Truncated(points)
+        return points
+
+    def to_bundle(self, weights: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+        """
+        Набор правил в виде JSON-совместимого словаря (см. from_bundle).
+
+        Args:
+            weights: Веса правил в порядке rule_names (None = текущие).
+        """
+        weights = list(self.weights if weights is None else weights)
+        groups: Dict[str, Dict[str, Any]] = {
+            kind: {} for kind in ("keyword", "trigger", "effect", "activation", "synergy", "bonus", "drawback")
+        }
+        for (kind, name), weight in zip(self.rule_names, weights):
+            groups[kind][name] = weight
+        return {
+            "keywords": groups["keyword"],
+            "triggers": groups["trigger"],
+            "effects": groups["effect"],
+            "activation_costs": groups["activation"],
+            "drawbacks": groups["drawback"],
+            "synergies": {
+                name: {"keywords": self.synergy_keywords[name], "bonus": bonus}
+                for name, bonus in groups["synergy"].items()
+            },
+            "settings": {**self.settings, "multiple_triggers_bonus": groups["bonus"]["multiple_triggers"]},
+            "mana_rules": self.mana_rules,
+            "pt_multiplier": self.pt_multiplier,
+        }
+
+    @classmethod
+    def from_bundle(cls, bundle: Dict[str, Any]) -> "RuleSet":
+        """Создаёт набор правил из словаря to_bundle (недостающие разделы — из config.py)."""
+        bundle = dict(bundle)
+        if "mana_rules" in bundle:
+            # JSON превращает числовые ключи таблиц стоимости в строки
+            bundle["mana_rules"] = {
+                key: {int(k): v for k, v in value.items()} if isinstance(value, dict) else value
+                for key, value in bundle["mana_rules"].items()
+            }
+        return cls(**bundle)
+
+    @classmethod
+    def load(cls, path: Path) -> "RuleSet":
+        """Читает набор правил из JSON-файла to_bundle."""
+        with path.open(encoding='utf-8') as f:
+            return cls.from_bundle(json.load(f))
+
+    def mana_points(self, mana_cost: str) -> int:
+        """Стоимость мана-коста по кастомным правилам."""
+        generic_total = 0
+        colored_total = 0
+        for sym in re.findall(r'{(.*?)}', mana_cost):
+            if sym.isdigit():
+                generic_total += int(sym)
+            elif '/' in sym or sym.upper() in MANA_COLORS:
+                colored_total += 1
+
+        total = 0
+        if generic_total > 0:
+            total += self._scaled(generic_total + colored_total, "generic", "generic")
+        if colored_total > 0:
+            total += self._scaled(colored_total, "colored_base", "colored")
+        return total
+
+    @staticmethod
+    def mana_value(mana_cost: str) -> int:
+        """Мана-стоимость: число за универсальную ману, по 1 за цветной и гибридный символ, X = 0."""
+        value = 0
+        for sym in re.findall(r'{(.*?)}', mana_cost):
+            generic = sym.split('/')[0]
+            if generic.isdigit():
+                value += int(generic)  # {2/W} — монопольный гибрид стоит 2
+            elif sym.upper() not in ('X', 'Y', 'Z'):
+                value += 1
+        return value
+
+    def _scaled(self, value: int, table: str, prefix: str) -> int:
+        """Табличная стоимость, а за пределами таблицы — линейная формула."""
+        rules = self.mana_rules
+        if value in rules[table]:
+            return rules[table][value]
+        start = rules[f"{prefix}_linear_start"]
+        return rules[f"{prefix}_linear_base"] + (value - start) * rules[f"{prefix}_linear_step"]
+
+    def pt_points(self, power_toughness: str) -> int:
+        """Стоимость силы/выносливости: (P + T) × коэффициент."""
+        try:
+            if '/' not in power_toughness:
+                return 0
+            p, t = power_toughness.strip().split('/')
+            power = int(re.search(r'\d+', p).group())
+            toughness = int(re.search(r'\d+', t).group())
+            return (power + toughness) * self.pt_multiplier
+        except (ValueError, AttributeError):
+            return 0
+
+    def score(self, mana_cost: str = "", text: str = "", power_toughness: str = "") -> Dict[str, int]:
+        """
+        Полная оценка карты.
+
+        Returns:
+            Dict: mana_points, pt_points, ability_points, total_power
+            (P/T + способности) и balance (мощь минус стоимость маны).
+        """
+        mana = self.mana_points(mana_cost)
+        pt = self.pt_points(power_toughness)
+        ability = self.ability_points(text)
+        return {
+            "mana_points": mana,
+            "pt_points": pt,
+            "ability_points": ability,
+            "total_power": pt + ability,
+            "balance": pt + ability - mana,
+        }
+
+    def score_many(self, cards: Iterable[Dict[str, str]]) -> List[Dict[str, int]]:
+        """
+        Оценивает пакет карт (словари с полями mana_cost, text, power_toughness).
+
+        Одинаковые карты в пакете оцениваются один раз.
+        """
+        memo: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        results = []
+        for card in cards:
+            key = (card.get("mana_cost", ""), card.get("text", ""), card.get("power_toughness", ""))
+            if key not in memo:
+                memo[key] = self.score(*key)
+            results.append(dict(memo[key]))
+        return results
+
+
+_default_rules: Optional[RuleSet] = None
+
+
+def get_default_rules() -> RuleSet:
+    """Общий набор правил из config.py (компилируется при первом обращении)."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = RuleSet()
+    return _default_rules
+
+
+_offline_rules: Optional[RuleSet] = None
+
+
+def get_offline_rules() -> RuleSet:
+    """
+    Правила config.py без предела времени на карту — для калибровки,
+    сравнения, агрегатов, снапшота и набора данных: их результаты
+    сохраняются и не должны зависеть от загрузки машины.
+    """
+    global _offline_rules
+    if _offline_rules is None:
+        _offline_rules = RuleSet(time_budget_ms=0)
+    return _offline_rules
@@ -34,23 +34,30 @@ class HTMLCardParser:
         return "\n".join(p.get_text(strip=True) for p in paragraphs)
     
     @classmethod
-    def parse(cls, html_content: str, source_url: str) -> Card:
+    def parse(cls, html_content: Union[str, bytes, memoryview], source_url: str) -> Card:
         """
         Factory-метод: создаёт Card из raw HTML.
         
         Args:
-            html_content: Исходный HTML страницы.
+            html_content: Исходный HTML страницы: байты UTF-8 как пришли из
+                сети или кэша (декодируются один раз внутри парсера) либо str.
             source_url: URL источника для отслеживания.
             
         Returns:
             Card: Заполненный объект карты.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        if isinstance(html_content, str):
+            soup = BeautifulSoup(html_content, 'html.parser')
+        else:
+            if isinstance(html_content, memoryview):
+                html_content = html_content.tobytes()
+            soup = BeautifulSoup(html_content, 'html.parser', from_encoding='utf-8')
         
         return Card(
             name=cls._find_text(soup, SELECTORS["CARD_NAME"]) or "Unknown",
             mana_cost=cls._extract_mana_symbols(soup),
             text=cls._extract_oracle_text(soup),
             power_toughness=cls._find_text(soup, SELECTORS["CARD_STATS"]) or "0/0",
-            url=source_url
+            url=source_url,
+            type_line=cls._find_text(soup, SELECTORS["TYPE_LINE"])
         )
\ No newline at end of file
@@ -0,0 +1,471 @@
+"""Агрегированная статистика корпуса, обновляемая инкрементально."""
+
+import hashlib
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import pandas as pd
+from config import (
+    AGGREGATES_COMPRESSION,
+    AGGREGATES_EXACT_VALUES,
+    AGGREGATES_PERCENTILES,
+    AGGREGATES_TOP_RULES,
+    CARD_TYPE_WORDS,
+)
+from models.card import Card
+from models.rules import RuleSet, get_offline_rules
+from services.card_store import CardStore
+from services.sampling import color_group, cost_group
+from services.snapshot import rules_fingerprint
+
+# Разрезы сводок: цвет, мана-стоимость, тип карты, семейство сработавших правил
+AGGREGATE_DIMENSIONS = ("color", "mana_value", "type", "family")
+DIMENSION_TITLES = {"color": "Цвет", "mana_value": "Мана-стоимость", "type": "Тип", "family": "Семейство правил"}
+
+
+def card_types(type_line: str) -> List[str]:
+    """Типы карты по строке типа; "?" — строка типа неизвестна."""
+    words = set(type_line.split("—")[0].lower().split())
+    if not words:
+        return ["?"]
+    types = [name for name, aliases in CARD_TYPE_WORDS.items() if words & set(aliases)]
+    return types or ["Other"]
+
+
+class TDigest:
+    """
+    Сжатое распределение для квантилей (merging t-digest).
+
+    Значения копятся в буфере и периодически сливаются в центроиды
+    (среднее, вес); размер центроида ограничен функцией масштаба
+    k = δ/2π·asin(2q − 1), поэтому на хвостах центроиды мельче и крайние
+    перцентили точнее. Два дайджеста сливаются без исходных данных —
+    центроиды одного добавляются в буфер другого.
+
+    Баланс обычно целый и принимает немного значений, а на таких данных
+    центроиды размывают перцентили; поэтому, пока различных значений не
+    больше AGGREGATES_EXACT_VALUES, дайджест хранит и точную гистограмму.
+
+    Attributes:
+        compression: Параметр δ: центроидов не больше ~δ/2.
+        count: Суммарный вес добавленных значений.
+    """
+
+    def __init__(self, compression: float = AGGREGATES_COMPRESSION):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+        self.values: Optional[Counter] = Counter()
+
+    def _count_exact(self, values: Iterable[Tuple[float, float]]) -> None:
+        if self.values is None:
+            return
+        for value, weight in values:
+            self.values[value] += weight
+        if len(self.values) > AGGREGATES_EXACT_VALUES:
+            self.values = None
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        self._count_exact([(value, weight)])
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Добавляет распределение другого дайджеста."""
+        if other.values is None:
+            self.values = None
+        else:
+            self._count_exact(other.values.items())
+        self._buffer.extend(zip(other.means, other.weights))
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        k = min(k, self.compression / 4)  # k(1) = δ/4
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        means, weights = [], []
+        merged = 0.0  # вес уже закрытых центроидов
+        mean, weight = points[0]
+        limit = self.count * self._q(self._k(0) + 1)
+        for value, value_weight in points[1:]:
+            if merged + weight + value_weight <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+                continue
+            means.append(mean)
+            weights.append(weight)
+            merged += weight
+            limit = self.count * self._q(self._k(merged / self.count) + 1)
+            mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля q ∈ [0, 1] (None — дайджест пуст)."""
+        if self.values is not None:
+            return self._exact_quantile(q)
+        self._compress()
+        if not self.weights:
+            return None
+        if len(self.weights) == 1 or self.min == self.max:
+            return self.means[0]
+        target = q * self.count
+        first, last = self.weights[0], self.weights[-1]
+        if target < first / 2:
+            return self.min + (self.means[0] - self.min) * target / (first / 2)
+        # Между центрами соседних центроидов — линейная интерполяция
+        cumulative = 0.0
+        for i in range(len(self.weights) - 1):
+            left = cumulative + self.weights[i] / 2
+            right = cumulative + self.weights[i] + self.weights[i + 1] / 2
+            if target <= right:
+                return self.means[i] + (self.means[i + 1] - self.means[i]) * (target - left) / (right - left)
+            cumulative += self.weights[i]
+        center = self.count - last / 2
+        return self.means[-1] + (self.max - self.means[-1]) * min(1.0, (target - center) / (last / 2))
+
+    def _exact_quantile(self, q: float) -> Optional[float]:
+        """Квантиль по гистограмме (линейная интерполяция, как numpy.quantile)."""
+        if not self.values:
+            return None
+        position = q * (self.count - 1)
+        lower = upper = None
+        cumulative = 0.0
+        for value in sorted(self.values):
+            cumulative += self.values[value]
+            if lower is None and cumulative > math.floor(position):
+                lower = value
+            if cumulative > math.ceil(position):
+                upper = value
+                break
+        upper = lower if upper is None else upper
+        return lower + (upper - lower) * (position - math.floor(position))
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self.means,
+            "weights": self.weights,
+            "count": self.count,
+            "min": self.min if self.weights else None,
+            "max": self.max if self.weights else None,
+            "values": None if self.values is None else [[value, weight] for value, weight in self.values.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TDigest":
+        digest = cls(data["compression"])
+        digest.means, digest.weights, digest.count = data["means"], data["weights"], data["count"]
+        if digest.weights:
+            digest.min, digest.max = data["min"], data["max"]
+        digest.values = None if data["values"] is None else Counter({value: weight for value, weight in data["values"]})
+        return digest
+
+
+class Summary:
+    """Число карт, сумма и дайджест баланса одной группы."""
+
+    def __init__(self, digest: Optional[TDigest] = None, count: int = 0, total: float = 0.0):
+        self.digest = digest or TDigest()
+        self.count = count
+        self.total = total
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.digest.add(value)
+
+    def merge(self, other: "Summary") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.digest.merge(other.digest)
+
+    def row(self, percentiles: Sequence[int] = AGGREGATES_PERCENTILES) -> Dict[str, Any]:
+        row: Dict[str, Any] = {
+            "Карт": self.count,
+            "Средний баланс": round(self.total / self.count, 2) if self.count else None,
+        }
+        for p in percentiles:
+            value = self.digest.quantile(p / 100)
+            row[f"P{p}"] = round(value, 1) if value is not None else None
+        return row
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "total": self.total, "digest": self.digest.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Summary":
+        return cls(TDigest.from_dict(data["digest"]), data["count"], data["total"])
+
+
+class CorpusAggregates:
+    """
+    Сводки корпуса, которые обновляются по мере добавления карт.
+
+    По каждому разрезу (цвет, мана-стоимость, тип, семейство сработавших
+    правил) хранится число карт, сумма и t-digest баланса; по каждому
+    правилу — сколько карт его задевают и сколько всего срабатываний.
+    Все части сливаемые: update стоит O(новых карт), а агрегаты
+    непересекающихся частей корпуса (например, собранные параллельно)
+    объединяются merge без повторного разбора текстов.
+
+    Оценки зависят от правил, поэтому агрегаты помнят отпечаток набора
+    и при смене правил строятся заново. Для каждого URL хранится отпечаток
+    полей учтённой версии карты: повторная запись без изменений не
+    учитывается, а изменённую карту (перезапись в хранилище) update не
+    учитывает вовсе — её прежний вклад из t-digest не вычесть, поэтому
+    refresh_aggregates в этом случае собирает агрегаты заново.
+
+    Attributes:
+        rules: Отпечаток набора правил (rules_fingerprint).
+        job: Задание хранилища, по которому собраны агрегаты (None — все).
+        cards: Учтено карт.
+        watermark: rowid последней учтённой записи хранилища.
+        groups: Разрез -> значение -> Summary.
+        rule_cards: Правило "вид: имя" -> карт с срабатыванием.
+        rule_hits: Правило "вид: имя" -> всего срабатываний.
+        urls: URL учтённых карт -> отпечаток их полей (card_fingerprint).
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None, job: Optional[str] = None):
+        self.rules = rules_fingerprint(rules or get_offline_rules())
+        self.job = job
+        self.cards = 0
+        self.watermark = 0
+        self.groups: Dict[str, Dict[str, Summary]] = {dimension: {} for dimension in AGGREGATE_DIMENSIONS}
+        self.rule_cards: Counter = Counter()
+        self.rule_hits: Counter = Counter()
+        self.urls: Dict[str, str] = {}
+
+    @staticmethod
+    def card_fingerprint(card: Card) -> str:
+        """Короткий хэш полей, от которых зависит вклад карты."""
+        fields = [card.mana_cost, card.text, card.power_toughness, card.type_line]
+        return hashlib.sha1(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+    def unseen(self, cards: Iterable[Card]) -> List[Card]:
+        """Карты, ещё не учтённые в агрегатах (по URL; из повторов — последняя версия)."""
+        fresh: Dict[str, Card] = {}
+        for card in cards:
+            if card.url not in self.urls:
+                fresh[card.url] = card
+        return list(fresh.values())
+
+    def changed(self, cards: Iterable[Card]) -> List[str]:
+        """URL учтённых карт, чьи поля отличаются от учтённой версии."""
+        return sorted({
+            card.url for card in cards
+            if card.url in self.urls and self.urls[card.url] != self.card_fingerprint(card)
+        })
+
+    def _add(self, dimension: str, key: str, balance: float) -> None:
+        self.groups[dimension].setdefault(key, Summary()).add(balance)
+
+    def update(self, cards: Iterable[Card], rules: Optional[RuleSet] = None) -> int:
+        """
+        Учитывает новые карты.
+
+        Returns:
+            int: Сколько карт добавлено (уже учтённые URL пропускаются,
+            в том числе изменённые — см. changed).
+        """
+        rules = rules or get_offline_rules()
+        memo: Dict[str, Dict[int, int]] = {}
+        added = 0
+        for card in cards:
+            if card.url in self.urls:
+                continue
+            # Текст разбирается один раз: по срабатываниям считаются и очки, и семейства
+            hits = memo.get(card.text)
+            if hits is None:
+                hits = memo[card.text] = rules.rule_hits(card.text)
+            ability = max(0, sum(rules.weights[column] * count for column, count in hits.items()))
+            balance = rules.pt_points(card.power_toughness) + ability - rules.mana_points(card.mana_cost)
+
+            self._add("color", color_group(card.mana_cost), balance)
+            self._add("mana_value", cost_group(card.mana_cost), balance)
+            for card_type in card_types(card.type_line):
+                self._add("type", card_type, balance)
+            families = set()
+            for column, count in hits.items():
+                kind, name = rules.rule_names[column]
+                families.add(kind)
+                self.rule_cards[f"{kind}: {name}"] += 1
+                self.rule_hits[f"{kind}: {name}"] += count
+            for family in families or ("без правил",):
+                self._add("family", family, balance)
+
+            self.urls[card.url] = self.card_fingerprint(card)
+            self.cards += 1
+            added += 1
+        return added
+
+    def merge(self, other: "CorpusAggregates") -> None:
+        """Добавляет агрегаты другой (непересекающейся) части корпуса."""
+        if other.rules != self.rules:
+            raise ValueError("агрегаты посчитаны разными наборами правил")
+        for dimension, groups in other.groups.items():
+            for key, summary in groups.items():
+                self.groups[dimension].setdefault(key, Summary()).merge(summary)
+        self.rule_cards.update(other.rule_cards)
+        self.rule_hits.update(other.rule_hits)
+        self.urls.update(other.urls)
+        self.cards += other.cards
+        self.watermark = max(self.watermark, other.watermark)
+
+    def tables(
+        self,
+        percentiles: Sequence[int] = AGGREGATES_PERCENTILES,
+        top: int = AGGREGATES_TOP_RULES
+    ) -> Dict[str, pd.DataFrame]:
+        """Таблицы сводок: по разрезам и самые частые правила."""
+        tables = {}
+        for dimension, groups in self.groups.items():
+            title = DIMENSION_TITLES[dimension]
+            keys = sorted(groups, key=lambda key: (-groups[key].count, key))
+            if dimension == "mana_value":
+                keys = sorted(groups, key=lambda key: int(key.rstrip("+")))
+            tables[title] = pd.DataFrame([{title: key, **groups[key].row(percentiles)} for key in keys])
+        tables["Правила"] = pd.DataFrame([
+            {
+                "Правило": rule,
+                "Карт": count,
+                "Доля карт, %": round(100 * count / self.cards, 1) if self.cards else None,
+                "Срабатываний": self.rule_hits[rule],
+            }
+            for rule, count in self.rule_cards.most_common(top)
+        ])
+        return tables
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rules": self.rules,
+            "job": self.job,
+            "cards": self.cards,
+            "watermark": self.watermark,
+            "groups": {
+                dimension: {key: summary.to_dict() for key, summary in groups.items()}
+                for dimension, groups in self.groups.items()
+            },
+            "rule_cards": dict(self.rule_cards),
+            "rule_hits": dict(self.rule_hits),
+            "urls": self.urls,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusAggregates":
+        aggregates = cls.__new__(cls)
+        aggregates.rules = data["rules"]
+        aggregates.job = data["job"]
+        aggregates.cards = data["cards"]
+        aggregates.watermark = data["watermark"]
+        aggregates.groups = {
+            dimension: {key: Summary.from_dict(summary) for key, summary in data["groups"].get(dimension, {}).items()}
+            for dimension in AGGREGATE_DIMENSIONS
+        }
+        aggregates.rule_cards = Counter(data["rule_cards"])
+        aggregates.rule_hits = Counter(data["rule_hits"])
+        urls = data["urls"]
+        # Состояние старой версии — список URL без отпечатков: любая новая запись считается изменением
+        aggregates.urls = urls if isinstance(urls, dict) else dict.fromkeys(urls, "")
+        return aggregates
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "CorpusAggregates":
+        return cls.from_dict(json.loads(path.read_text(encoding='utf-8')))
+
+
+def _aggregate_chunk(cards: List[Dict[str, str]], bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """Агрегаты части корпуса в процессе-воркере (аргументы и результат — словари)."""
+    rules = RuleSet.from_bundle({**bundle, "time_budget_ms": 0})
+    aggregates = CorpusAggregates(rules)
+    aggregates.update((Card.from_dict(card) for card in cards), rules)
+    return aggregates.to_dict()
+
+
+def refresh_aggregates(
+    store: CardStore,
+    path: Path,
+    job: Optional[str] = None,
+    rules: Optional[RuleSet] = None,
+    workers: int = 1,
+    rebuild: bool = False
+) -> Tuple[CorpusAggregates, int]:
+    """
+    Дополняет сохранённые агрегаты картами, записанными в хранилище
+    после прошлого обновления. Если среди них есть уже учтённые карты с
+    изменёнными полями, агрегаты собираются заново по всему хранилищу.
+
+    Args:
+        workers: Процессов для разбора новых карт: каждый собирает агрегаты
+            своей части, затем они сливаются.
+        rebuild: Собрать агрегаты заново по всему хранилищу.
+
+    Returns:
+        Tuple: (агрегаты, сколько карт добавлено).
+    """
+    rules = rules or get_offline_rules()
+    aggregates = None
+    if path.exists() and not rebuild:
+        aggregates = CorpusAggregates.load(path)
+        if aggregates.rules != rules_fingerprint(rules) or aggregates.job != job:
+            print("♻️ Правила или задание изменились — агрегаты собираются заново")
+            aggregates = None
+    if aggregates is None:
+        aggregates = CorpusAggregates(rules, job)
+
+    rows = list(store.iter_since(aggregates.watermark, job))
+    if not rows:
+        return aggregates, 0
+    changed = aggregates.changed(card for _, card in rows)
+    if changed:
+        print(f"♻️ Изменилось учтённых карт: {len(changed)} — агрегаты собираются заново")
+        aggregates = CorpusAggregates(rules, job)
+        rows = list(store.iter_since(0, job))
+    cards = aggregates.unseen(card for _, card in rows)
+
+    if workers > 1 and len(cards) > workers:
+        bundle = rules.to_bundle()
+        size = math.ceil(len(cards) / workers)
+        chunks = [[card.to_dict() for card in cards[i:i + size]] for i in range(0, len(cards), size)]
+        with ProcessPoolExecutor(workers) as pool:
+            for data in pool.map(_aggregate_chunk, chunks, [bundle] * len(chunks)):
+                aggregates.merge(CorpusAggregates.from_dict(data))
+    else:
+        aggregates.update(cards, rules)
+
+    aggregates.watermark = rows[-1][0]
+    aggregates.save(path)
+    return aggregates, len(cards)
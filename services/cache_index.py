@@ -0,0 +1,204 @@
+"""Манифест закэшированных HTML-страниц."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from utils.helpers import file_lock
+
+
+class CacheIndex:
+    """
+    Хранит манифест кэша в append-only JSONL-файле.
+
+    Каждая строка — запись вида {"slug": ..., поля...}. При чтении более
+    поздние записи по тому же slug дополняют и перекрывают предыдущие,
+    поэтому обновление метаданных — это дозапись одной строки. Запись
+    {"slug": ..., "deleted": true} удаляет страницу из манифеста.
+
+    Типичные поля: url (исходный URL), size, hash, fetched_at, etag,
+    last_modified, source (цель загрузки по списку).
+
+    Манифест может разделяться несколькими процессами: дозаписи и
+    перезапись выполняются под межпроцессной блокировкой, а refresh()
+    дочитывает строки, добавленные другими процессами.
+
+    Attributes:
+        path: Путь к файлу манифеста.
+        lock_path: Lock-файл для межпроцессной синхронизации.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock_path = path.with_name(f".{path.name}.lock")
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_url: Dict[str, str] = {}
+        self._lines = 0
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self.refresh()
+
+    def refresh(self) -> List[str]:
+        """
+        Дочитывает манифест с диска (строки других процессов, перезапись, удаление).
+
+        Returns:
+            List[str]: slug из дочитанных строк (после перезаписи файла — все).
+        """
+        with self._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                self._reset(None)
+                return []
+
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._reset(stat.st_ino)  # файл пересоздан или сжат другим процессом
+            if stat.st_size == self._offset:
+                return []
+
+            with self.path.open('rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            # Недописанную последнюю строку оставляем до следующего refresh
+            complete = data[:data.rfind(b"\n") + 1]
+            self._offset += len(complete)
+            touched = [self._apply(line) for line in complete.splitlines()]
+            return [slug for slug in touched if slug]
+
+    def _reset(self, inode: Optional[int]) -> None:
+        """Сбрасывает состояние перед полным перечитыванием."""
+        self._entries.clear()
+        self._by_url.clear()
+        self._lines = 0
+        self._offset = 0
+        self._inode = inode
+
+    def _apply(self, line: bytes) -> Optional[str]:
+        """Применяет одну строку манифеста к состоянию и возвращает её slug."""
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return None  # повреждённая строка после аварийного завершения
+        self._lines += 1
+        slug = record.pop("slug", None)
+        if not slug:
+            return None
+        if record.get("deleted"):
+            self._entries.pop(slug, None)
+        else:
+            self._set(slug, record)
+        return slug
+
+    def _set(self, slug: str, fields: Dict[str, Any]) -> None:
+        """Обновляет запись в памяти и обратный индекс URL -> slug."""
+        self._entries.setdefault(slug, {}).update(fields)
+        for key in ("url", "source"):
+            if fields.get(key):
+                self._by_url[fields[key]] = slug
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        """Дописывает записи одним write под межпроцессной блокировкой."""
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode('utf-8')
+        with file_lock(self.lock_path):
+            with self.path.open('ab') as f:
+                position = f.seek(0, os.SEEK_END)
+                f.write(data)
+            if self._inode is None:
+                self._inode = self.path.stat().st_ino
+            # Если до нас никто не дописывал, свои строки перечитывать не нужно
+            if position == self._offset:
+                self._offset += len(data)
+                self._lines += len(records)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._entries)
+
+    def __contains__(self, slug: str) -> bool:
+        return self.get(slug) is not None
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Возвращает метаданные страницы или None (с дочитыванием при промахе)."""
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is None:
+                self.refresh()
+                entry = self._entries.get(slug)
+            return dict(entry) if entry else None
+
+    def find(self, url: str) -> Optional[str]:
+        """Возвращает slug страницы по её URL или URL цели загрузки (source)."""
+        with self._lock:
+            slug = self._by_url.get(url)
+            if slug is None or slug not in self._entries:
+                self.refresh()
+                slug = self._by_url.get(url)
+            return slug if slug in self._entries else None
+
+    def update(self, slug: str, **fields: Any) -> None:
+        """Обновляет метаданные страницы и дописывает их в файл."""
+        self.update_many({slug: fields})
+
+    def update_many(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Обновляет несколько страниц одной дозаписью в файл."""
+        if not records:
+            return
+        with self._lock:
+            for slug, fields in records.items():
+                self._set(slug, fields)
+            self._append([{"slug": slug, **fields} for slug, fields in records.items()])
+
+    def remove(self, slug: str) -> None:
+        """Удаляет страницу из манифеста."""
+        with self._lock:
+            if self._entries.pop(slug, None) is not None:
+                self._append([{"slug": slug, "deleted": True}])
+
+    def slugs(self, limit: Optional[int] = None) -> List[str]:
+        """Возвращает slug страниц в алфавитном порядке."""
+        with self._lock:
+            self.refresh()
+            slugs = sorted(self._entries)
+        return slugs[:limit] if limit else slugs
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает копию всех записей манифеста."""
+        with self._lock:
+            self.refresh()
+            return {slug: dict(entry) for slug, entry in self._entries.items()}
+
+    def compact(self, min_ratio: float = 2.0) -> bool:
+        """
+        Переписывает манифест одной строкой на страницу.
+
+        Args:
+            min_ratio: Сжимать, только если строк в файле во столько раз
+                больше, чем живых записей.
+
+        Returns:
+            bool: True, если манифест был переписан.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self.refresh()  # учесть дозаписи других процессов до перезаписи
+            if self._lines < max(len(self._entries), 1) * min_ratio:
+                return False
+
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with tmp_path.open('w', encoding='utf-8') as f:
+                for slug, entry in self._entries.items():
+                    f.write(json.dumps({"slug": slug, **entry}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            stat = self.path.stat()
+            self._inode, self._offset = stat.st_ino, stat.st_size
+            self._lines = len(self._entries)
+            return True
+
+    def clear(self) -> None:
+        """Удаляет манифест целиком."""
+        with self._lock, file_lock(self.lock_path):
+            self._reset(None)
+            self.path.unlink(missing_ok=True)
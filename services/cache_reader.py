@@ -0,0 +1,94 @@
+"""Параллельное потоковое чтение HTML-кэша."""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+from config import CACHE_READ_WORKERS, CACHE_CHUNK_SIZE, CACHE_PREFETCH_CHUNKS
+
+
+class CacheReader:
+    """
+    Читает файлы кэша пачками через пул потоков.
+
+    Страницы отдаются как bytes без декодирования — парсер декодирует их
+    сам. В памяти одновременно находится не больше prefetch пачек, так что
+    потребление памяти ограничено независимо от размера кэша.
+
+    Attributes:
+        workers: Число потоков ввода-вывода.
+        chunk_size: Размер пачки (файлов).
+        prefetch: Сколько пачек читается заранее.
+    """
+
+    def __init__(
+        self,
+        workers: int = CACHE_READ_WORKERS,
+        chunk_size: int = CACHE_CHUNK_SIZE,
+        prefetch: int = CACHE_PREFETCH_CHUNKS
+    ):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.prefetch = prefetch
+
+    @staticmethod
+    def read_bytes(path: Path) -> bytes:
+        """Читает файл целиком одним read (страницы небольшие)."""
+        with path.open('rb') as f:
+            return f.read()
+
+    def read_verified(self, path: Path, verify: Optional[Callable[[Path, bytes], bool]] = None) -> bytes:
+        """
+        Читает файл и проверяет его целостность.
+
+        Несовпадение может означать, что файл только что заменила другая
+        версия страницы, поэтому файл перечитывается один раз.
+
+        Raises:
+            OSError: Файл не прошёл проверку и после перечитывания.
+        """
+        data = self.read_bytes(path)
+        if verify is None or verify(path, data):
+            return data
+        data = self.read_bytes(path)
+        if verify(path, data):
+            return data
+        raise OSError(f"размер или хэш не совпадает с манифестом ({len(data)} байт)")
+
+    def iter_chunks(
+        self,
+        files: Sequence[Tuple[Path, str]],
+        verify: Optional[Callable[[Path, bytes], bool]] = None
+    ) -> Iterator[List[Tuple[bytes, str]]]:
+        """
+        Потоково читает файлы кэша пачками в исходном порядке.
+
+        Args:
+            files: Пары (путь к файлу, URL карты).
+            verify: Проверка целостности (путь, байты) -> bool.
+
+        Yields:
+            List[Tuple]: Пачка кортежей (html_bytes, url); нечитаемые и
+            повреждённые файлы пропускаются с предупреждением.
+        """
+        batches = (files[i:i + self.chunk_size] for i in range(0, len(files), self.chunk_size))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def submit(batch: Sequence[Tuple[Path, str]]) -> List[Tuple[Future, Path, str]]:
+                return [(pool.submit(self.read_verified, path, verify), path, url) for path, url in batch]
+
+            window = deque(submit(batch) for batch in islice(batches, self.prefetch))
+            while window:
+                futures = window.popleft()
+                following = next(batches, None)
+                if following:
+                    window.append(submit(following))
+
+                chunk = []
+                for future, path, url in futures:
+                    try:
+                        chunk.append((future.result(), url))
+                    except OSError as e:
+                        print(f"⚠️ Ошибка чтения {path.name}: {e}")
+                yield chunk
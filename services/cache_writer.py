@@ -0,0 +1,192 @@
+"""Фоновая (write-behind) запись страниц в кэш."""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import CACHE_WRITE_QUEUE_SIZE, CACHE_WRITE_BATCH
+from services.cache_index import CacheIndex
+from utils.helpers import file_lock
+
+# Элемент очереди: (slug, содержимое, поля манифеста)
+WriteItem = Tuple[str, bytes, Dict[str, Any]]
+
+
+class CacheWriter:
+    """
+    Записывает страницы в кэш в фоновом потоке.
+
+    Загрузчик кладёт страницу в ограниченную очередь и сразу переходит к
+    следующему запросу. Поток записи забирает страницы пачками, публикует
+    каждую атомарно (временный файл + rename) и только после этого
+    регистрирует её в манифесте. Пока страница в очереди, её можно
+    прочитать через pending().
+
+    Attributes:
+        index: Манифест кэша.
+        path_for: Функция slug -> путь к файлу страницы.
+        lock_path: Lock-файл кэша: пачка публикуется под разделяемой
+            блокировкой, чтобы очистка кэша не шла параллельно с записью.
+        batch_size: Максимум страниц за один проход потока записи.
+    """
+
+    def __init__(
+        self,
+        index: CacheIndex,
+        path_for: Callable[[str], Path],
+        lock_path: Path,
+        queue_size: int = CACHE_WRITE_QUEUE_SIZE,
+        batch_size: int = CACHE_WRITE_BATCH
+    ):
+        self.index = index
+        self.path_for = path_for
+        self.lock_path = lock_path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[WriteItem]]" = queue.Queue(maxsize=queue_size)
+        self._pending: Dict[str, bytes] = {}
+        self._unsynced: List[Path] = []
+        self._lock = threading.Lock()
+        self._written = 0
+        self._errors = 0
+        self._batches = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._depth_max = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="cache-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, slug: str, data: bytes, **fields: Any) -> None:
+        """Ставит страницу в очередь записи (блокируется, если очередь полна)."""
+        with self._lock:
+            self._pending[slug] = data
+        self._queue.put((slug, data, fields))
+        self._depth_max = max(self._depth_max, self._queue.qsize())
+
+    def pending(self, slug: str) -> Optional[bytes]:
+        """Возвращает содержимое страницы, ещё не записанной на диск."""
+        with self._lock:
+            return self._pending.get(slug)
+
+    def _run(self) -> None:
+        """Цикл потока записи: пачка из очереди -> атомарная публикация."""
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            entries = [entry for entry in batch if entry is not None]
+            written, errors = self._written, self._errors
+            try:
+                with file_lock(self.lock_path, shared=True):
+                    published = [entry for entry in entries if self._write(*entry)]
+                    # Манифест обновляется одной дозаписью на пачку и только для опубликованных файлов
+                    self.index.update_many({slug: fields for slug, _, fields in published})
+            except Exception as e:
+                # Поток записи не должен падать: иначе flush() и close() ждут очередь вечно.
+                # Страницы пачки не попали в манифест — все считаются ошибками
+                self._written, self._errors = written, errors + len(entries)
+                print(f"⚠️ Ошибка записи пачки кэша ({len(entries)} стр.): {e}")
+            finally:
+                # Опубликованные страницы читаются с диска, неудавшиеся считаются потерянными
+                with self._lock:
+                    for slug, data, _ in entries:
+                        if self._pending.get(slug) is data:
+                            del self._pending[slug]
+                self._batches += 1
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, slug: str, data: bytes, fields: Dict[str, Any]) -> bool:
+        """Атомарно публикует страницу (временный файл + rename)."""
+        started = time.perf_counter()
+        filepath = self.path_for(slug)
+        tmp_path = filepath.with_name(f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            filepath.parent.mkdir(exist_ok=True)
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, filepath)
+        except OSError as e:
+            self._errors += 1
+            tmp_path.unlink(missing_ok=True)
+            with self._lock:
+                if self._pending.get(slug) is data:
+                    del self._pending[slug]
+            print(f"⚠️ Ошибка записи в кэш {filepath.name}: {e}")
+            return False
+        finally:
+            latency = time.perf_counter() - started
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+
+        self._written += 1
+        with self._lock:
+            self._unsynced.append(filepath)
+        return True
+
+    def flush(self, sync: bool = True) -> None:
+        """
+        Дожидается записи всей очереди.
+
+        Args:
+            sync: Сбросить записанные файлы и их директории на диск (fsync).
+        """
+        if self._closed:
+            return
+        self._queue.join()
+        if not sync:
+            return
+
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+        for path in paths:
+            _fsync_path(path)
+        for directory in {path.parent for path in paths}:
+            _fsync_path(directory)
+
+    def close(self) -> None:
+        """Записывает остаток очереди на диск и останавливает поток."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        """Метрики записи: глубина очереди, задержка записи, объёмы."""
+        done = self._written + self._errors
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_depth_max": self._depth_max,
+            "written": self._written,
+            "errors": self._errors,
+            "batches": self._batches,
+            "write_latency_avg_ms": round(self._latency_total / done * 1000, 3) if done else 0.0,
+            "write_latency_max_ms": round(self._latency_max * 1000, 3),
+        }
+
+
+def _fsync_path(path: Path) -> None:
+    """fsync файла или директории (директории не поддерживаются на Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
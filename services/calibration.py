@@ -0,0 +1,181 @@
+"""Матрица срабатываний правил и подбор весов под нулевой баланс."""
+
+import json
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+import numpy as np
+from tqdm import tqdm
+from config import CALIBRATION_RIDGE, CALIBRATION_ITERATIONS
+from models.card import Card
+from models.rules import RuleSet
+
+
+class RuleHitMatrix:
+    """
+    Разреженная матрица карта × правило (CSR) с числом срабатываний.
+
+    Срабатывания уже учитывают лимиты повторов (max_duplicate_triggers,
+    max_activated_abilities), поэтому очки способностей для любого
+    вектора весов — одно произведение матрицы на вектор. При изменении
+    паттернов или лимитов матрицу нужно построить заново.
+
+    Attributes:
+        indptr, indices, data: CSR-представление (строки — карты).
+        rule_names: Правила по столбцам (см. RuleSet.rule_names).
+        urls: URL карт по строкам.
+        mana_points: Стоимость маны каждой карты.
+        pt_points: Стоимость P/T каждой карты.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        rule_names: List[Tuple[str, str]],
+        urls: List[str],
+        mana_points: np.ndarray,
+        pt_points: np.ndarray
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.rule_names = rule_names
+        self.urls = urls
+        self.mana_points = mana_points
+        self.pt_points = pt_points
+        # Номер строки для каждого ненулевого элемента: произведения через bincount
+        self._rows = np.repeat(np.arange(len(urls)), np.diff(indptr))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.urls), len(self.rule_names)
+
+    @classmethod
+    def build(cls, cards: Iterable[Card], rules: RuleSet) -> "RuleHitMatrix":
+        """Разбирает тексты карт один раз и собирает матрицу."""
+        indptr, indices, data = [0], [], []
+        urls, mana_points, pt_points = [], [], []
+        for card in tqdm(cards, desc="🧮 Срабатывания правил", unit="карта", colour="cyan", ncols=80):
+            for column, count in sorted(rules.rule_hits(card.text).items()):
+                indices.append(column)
+                data.append(count)
+            indptr.append(len(indices))
+            urls.append(card.url)
+            mana_points.append(rules.mana_points(card.mana_cost))
+            pt_points.append(rules.pt_points(card.power_toughness))
+
+        return cls(
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(data, dtype=np.float64),
+            list(rules.rule_names),
+            urls,
+            np.array(mana_points, dtype=np.float64),
+            np.array(pt_points, dtype=np.float64),
+        )
+
+    def save(self, path: Path) -> None:
+        """Сохраняет матрицу в .npz (правила и URL — в JSON внутри архива)."""
+        np.savez_compressed(
+            path,
+            indptr=self.indptr, indices=self.indices, data=self.data,
+            mana_points=self.mana_points, pt_points=self.pt_points,
+            rule_names=np.array(json.dumps(self.rule_names, ensure_ascii=False)),
+            urls=np.array(json.dumps(self.urls, ensure_ascii=False)),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "RuleHitMatrix":
+        with np.load(path) as f:
+            return cls(
+                f["indptr"], f["indices"], f["data"],
+                [tuple(name) for name in json.loads(str(f["rule_names"]))],
+                json.loads(str(f["urls"])),
+                f["mana_points"], f["pt_points"],
+            )
+
+    def matches(self, rules: RuleSet) -> bool:
+        """Совпадают ли столбцы матрицы с правилами набора."""
+        return self.rule_names == list(rules.rule_names)
+
+    def matvec(self, weights: np.ndarray) -> np.ndarray:
+        """A·w: взвешенная сумма срабатываний по каждой карте."""
+        return np.bincount(self._rows, weights=self.data * weights[self.indices], minlength=self.shape[0])
+
+    def rmatvec(self, values: np.ndarray) -> np.ndarray:
+        """Aᵀ·v: вклад карт в каждое правило."""
+        return np.bincount(self.indices, weights=self.data * values[self._rows], minlength=self.shape[1])
+
+    def ability_points(self, weights: Sequence[float]) -> np.ndarray:
+        """Очки способностей всех карт при заданных весах (как RuleSet, не меньше 0)."""
+        return np.maximum(self.matvec(np.asarray(weights, dtype=np.float64)), 0.0)
+
+    def balance(self, weights: Sequence[float]) -> np.ndarray:
+        """Баланс всех карт: P/T + способности − мана."""
+        return self.pt_points + self.ability_points(weights) - self.mana_points
+
+    def rule_counts(self) -> np.ndarray:
+        """Сколько карт задевает каждое правило."""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+
+def calibrate(
+    matrix: RuleHitMatrix,
+    initial: Sequence[float],
+    ridge: float = CALIBRATION_RIDGE,
+    iterations: int = CALIBRATION_ITERATIONS,
+    tolerance: float = 1e-8
+) -> np.ndarray:
+    """
+    Подбирает веса правил, минимизирующие суммарный квадрат баланса.
+
+    Решает min ‖A·w − (мана − P/T)‖² + ridge·‖w − w₀‖² методом
+    сопряжённых градиентов для наименьших квадратов (CGLS) — нужны только
+    произведения A·v и Aᵀ·v. Регуляризация удерживает редкие правила
+    около исходных весов. Отсечение отрицательной суммы нулём (как в
+    RuleSet) при подборе не учитывается.
+
+    Args:
+        matrix: Матрица срабатываний эталонного корпуса.
+        initial: Исходные веса w₀ (обычно RuleSet.weights).
+        ridge: Сила регуляризации.
+        iterations: Максимум итераций.
+        tolerance: Порог относительной нормы градиента для остановки.
+
+    Returns:
+        np.ndarray: Подобранные веса в порядке rule_names.
+    """
+    initial = np.asarray(initial, dtype=np.float64)
+    # Ищем поправку d = w − w₀: min ‖A·d − r₀‖² + ridge·‖d‖²
+    residual = matrix.mana_points - matrix.pt_points - matrix.matvec(initial)
+    delta = np.zeros_like(initial)
+    gradient = matrix.rmatvec(residual)
+    direction = gradient.copy()
+    norm = start_norm = gradient @ gradient
+
+    for _ in range(iterations):
+        if norm <= tolerance ** 2 * start_norm or norm == 0:
+            break
+        projected = matrix.matvec(direction)
+        step = norm / (projected @ projected + ridge * (direction @ direction))
+        delta += step * direction
+        residual -= step * projected
+        gradient = matrix.rmatvec(residual) - ridge * delta
+        new_norm = gradient @ gradient
+        direction = gradient + (new_norm / norm) * direction
+        norm = new_norm
+
+    return initial + delta
+
+
+def save_bundle(rules: RuleSet, weights: Sequence[float], path: Path, digits: int = 0) -> None:
+    """
+    Записывает набор правил с новыми весами в JSON (см. RuleSet.load).
+
+    Args:
+        digits: Знаков после запятой в весах (0 — целые, как в config.py).
+    """
+    rounded = [int(round(w)) if digits == 0 else round(float(w), digits) for w in weights]
+    with path.open('w', encoding='utf-8') as f:
+        json.dump(rules.to_bundle(rounded), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,113 @@
+"""Общее хранилище распарсенных карт (SQLite)."""
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from config import CARD_STORE_PATH
+from models.card import Card
+
+_FIELDS = list(Card().to_dict())
+
+
+class CardStore:
+    """
+    Хранит распарсенные карты, ключ — задание и URL страницы.
+
+    Несколько процессов (в т.ч. воркеры на разных машинах с общим диском)
+    могут писать в одно хранилище: каждая запись — короткая транзакция,
+    повторная запись той же карты в том же задании заменяет предыдущую.
+
+    Attributes:
+        path: Путь к SQLite-файлу.
+    """
+
+    def __init__(self, path: Path = CARD_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        columns = ", ".join(f"{name} TEXT" for name in _FIELDS)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS cards ({columns}, job TEXT NOT NULL DEFAULT '', stored_at TEXT, "
+                "PRIMARY KEY (job, url))"
+            )
+            # Хранилища, созданные до появления новых полей карты
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(cards)")}
+            for name in _FIELDS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE cards ADD COLUMN {name} TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, cards: Iterable[Card], job: Optional[str] = None) -> None:
+        """Сохраняет карты одной транзакцией."""
+        stored_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        rows = [
+            [card.to_dict()[name] for name in _FIELDS] + [job or "", stored_at]
+            for card in cards
+        ]
+        placeholders = ", ".join("?" * (len(_FIELDS) + 2))
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO cards ({', '.join(_FIELDS)}, job, stored_at) VALUES ({placeholders})",
+                rows
+            )
+
+    def put(self, card: Card, job: Optional[str] = None) -> None:
+        """Сохраняет одну карту."""
+        self.put_many([card], job)
+
+    def iter_cards(self, job: Optional[str] = None) -> Iterator[Card]:
+        """Перебирает карты (всех заданий или одного) в порядке записи."""
+        query = f"SELECT {', '.join(_FIELDS)} FROM cards"
+        params = ()
+        if job is not None:
+            query += " WHERE job = ?"
+            params = (job,)
+        for row in self._connect().execute(query + " ORDER BY rowid", params):
+            yield Card.from_dict(dict(zip(_FIELDS, row)))
+
+    def iter_since(self, rowid: int, job: Optional[str] = None) -> Iterator[Tuple[int, Card]]:
+        """
+        Карты, записанные после строки rowid (перезапись карты тоже даёт
+        новую строку), вместе с их rowid — для инкрементальной обработки.
+        """
+        query = f"SELECT rowid, {', '.join(_FIELDS)} FROM cards WHERE rowid > ?"
+        params: Tuple = (rowid,)
+        if job is not None:
+            query += " AND job = ?"
+            params = (rowid, job)
+        for row in self._connect().execute(query + " ORDER BY rowid", params):
+            yield row[0], Card.from_dict(dict(zip(_FIELDS, row[1:])))
+
+    def column(self, name: str, job: Optional[str] = None) -> Dict[str, str]:
+        """Одно поле всех карт (всех заданий или одного): URL -> значение."""
+        if name not in _FIELDS:
+            raise ValueError(f"неизвестное поле карты: {name}")
+        query = f"SELECT url, {name} FROM cards"
+        params = ()
+        if job is not None:
+            query += " WHERE job = ?"
+            params = (job,)
+        return dict(self._connect().execute(query, params).fetchall())
+
+    def last_rowid(self, job: Optional[str] = None) -> int:
+        """rowid последней записи (растёт при каждой записи и перезаписи карты)."""
+        if job is None:
+            return self._connect().execute("SELECT COALESCE(MAX(rowid), 0) FROM cards").fetchone()[0]
+        return self._connect().execute(
+            "SELECT COALESCE(MAX(rowid), 0) FROM cards WHERE job = ?", (job,)
+        ).fetchone()[0]
+
+    def count(self, job: Optional[str] = None) -> int:
+        """Количество карт (всех или одного задания)."""
+        if job is None:
+            return self._connect().execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        return self._connect().execute("SELECT COUNT(*) FROM cards WHERE job = ?", (job,)).fetchone()[0]
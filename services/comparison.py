@@ -0,0 +1,186 @@
+"""Оценка одного корпуса несколькими наборами правил (A/B-сравнение)."""
+
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from config import COMPARISON_TOP_MOVERS, EXCEL_COLUMNS
+from models.card import Card
+from models.rules import RuleSet
+from services.calibration import RuleHitMatrix
+
+_SCORE_FIELDS = ("mana_points", "pt_points", "ability_points", "total_power", "balance")
+
+
+def _matching_settings(rules: RuleSet) -> Tuple[int, int, int]:
+    """Настройки, от которых зависит число срабатываний (а не только веса)."""
+    settings = rules.settings
+    return (
+        settings['max_duplicate_triggers'],
+        settings['max_activated_abilities'],
+        settings['multiple_triggers_threshold'],
+    )
+
+
+def _rule_keys(rules: RuleSet) -> List[Tuple]:
+    """Ключи правил по столбцам: совпадающие ключи срабатывают одинаково."""
+    return [
+        # Синергия определяется словами, а не именем
+        ("synergy", tuple(rules.synergy_keywords[name])) if kind == "synergy" else (kind, name)
+        for kind, name in rules.rule_names
+    ]
+
+
+def _union(rule_sets: List[RuleSet]) -> RuleSet:
+    """Набор правил, содержащий каждое правило всех наборов ровно один раз."""
+    keywords, triggers, effects, drawbacks, activation_costs = {}, {}, {}, {}, {}
+    synergies: Dict[str, Dict[str, Any]] = {}
+    seen_synergies = set()
+    for rules in rule_sets:
+        bundle = rules.to_bundle()
+        keywords.update(bundle["keywords"])
+        triggers.update(bundle["triggers"])
+        effects.update(bundle["effects"])
+        drawbacks.update(bundle["drawbacks"])
+        activation_costs.update(bundle["activation_costs"])
+        for name, synergy in bundle["synergies"].items():
+            words = tuple(synergy["keywords"])
+            if words not in seen_synergies:
+                seen_synergies.add(words)
+                synergies[f"{name}#{len(synergies)}"] = synergy
+    return RuleSet(
+        keywords=keywords,
+        triggers=triggers,
+        effects=effects,
+        activation_costs=activation_costs,
+        drawbacks=drawbacks,
+        synergies=synergies,
+        settings=rule_sets[0].settings,
+        mana_rules=rule_sets[0].mana_rules,
+        pt_multiplier=rule_sets[0].pt_multiplier,
+        time_budget_ms=0,
+    )
+
+
+class RuleSetComparison:
+    """
+    Оценивает корпус несколькими наборами правил за один проход.
+
+    Наборы с одинаковыми лимитами срабатываний объединяются в общий набор,
+    где каждый паттерн встречается один раз; тексты карт разбираются
+    только им (RuleHitMatrix), а очки каждого набора — произведение
+    матрицы срабатываний на его веса, спроецированные на общие столбцы.
+    Стоимость маны и P/T пересчитываются, только если у набора свои
+    таблицы стоимости.
+
+    Attributes:
+        rule_sets: Наборы правил по именам; первый — базовый для дельт.
+    """
+
+    def __init__(self, rule_sets: Dict[str, RuleSet]):
+        if not rule_sets:
+            raise ValueError("нужен хотя бы один набор правил")
+        self.rule_sets = rule_sets
+        self.baseline = next(iter(rule_sets))
+
+    def _groups(self) -> Dict[Tuple, List[str]]:
+        groups: Dict[Tuple, List[str]] = {}
+        for name, rules in self.rule_sets.items():
+            groups.setdefault(_matching_settings(rules), []).append(name)
+        return groups
+
+    def score(self, cards: List[Card]) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Оценки всех карт каждым набором.
+
+        Returns:
+            Dict: имя набора -> {mana_points, pt_points, ability_points,
+            total_power, balance} — массивы в порядке cards.
+        """
+        scores = {}
+        for names in self._groups().values():
+            union = _union([self.rule_sets[name] for name in names])
+            matrix = RuleHitMatrix.build(cards, union)
+            columns = {key: column for column, key in enumerate(_rule_keys(union))}
+
+            for name in names:
+                rules = self.rule_sets[name]
+                weights = np.zeros(matrix.shape[1])
+                np.add.at(weights, [columns[key] for key in _rule_keys(rules)], rules.weights)
+                if rules.mana_rules == union.mana_rules and rules.pt_multiplier == union.pt_multiplier:
+                    mana, pt = matrix.mana_points, matrix.pt_points
+                else:
+                    mana = np.array([rules.mana_points(card.mana_cost) for card in cards], dtype=np.float64)
+                    pt = np.array([rules.pt_points(card.power_toughness) for card in cards], dtype=np.float64)
+                ability = matrix.ability_points(weights)
+                scores[name] = {
+                    "mana_points": mana,
+                    "pt_points": pt,
+                    "ability_points": ability,
+                    "total_power": pt + ability,
+                    "balance": pt + ability - mana,
+                }
+        return {name: scores[name] for name in self.rule_sets}
+
+    def rows(self, cards: List[Card], scores: Dict[str, Dict[str, np.ndarray]]) -> List[Dict[str, Any]]:
+        """Строки отчёта: поля карты и столбцы оценок каждого набора."""
+        titles = {field: EXCEL_COLUMNS[field.upper()] for field in _SCORE_FIELDS}
+        base = scores[self.baseline]["balance"]
+        rows = []
+        for i, card in enumerate(cards):
+            row = {
+                EXCEL_COLUMNS["NAME"]: card.name,
+                EXCEL_COLUMNS["MANA_COST"]: card.mana_cost,
+                EXCEL_COLUMNS["PT"]: card.power_toughness,
+                EXCEL_COLUMNS["URL"]: card.url,
+            }
+            for name, fields in scores.items():
+                for field, title in titles.items():
+                    row[f"{title} [{name}]"] = _number(fields[field][i])
+                if name != self.baseline:
+                    row[f"Δ {titles['balance']} [{name}]"] = _number(fields["balance"][i] - base[i])
+            rows.append(row)
+        return rows
+
+    def movers(
+        self,
+        cards: List[Card],
+        scores: Dict[str, Dict[str, np.ndarray]],
+        top: int = COMPARISON_TOP_MOVERS
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Сводка изменений относительно базового набора.
+
+        Returns:
+            Tuple: (итоги по наборам, крупнейшие изменения баланса —
+            top карт по |Δ| для каждого набора).
+        """
+        base = scores[self.baseline]["balance"]
+        summary, movers = [], []
+        for name, fields in scores.items():
+            delta = fields["balance"] - base
+            summary.append({
+                "Набор": name,
+                "Средний баланс": round(float(fields["balance"].mean()), 2) if len(base) else None,
+                "Средний |баланс|": round(float(np.abs(fields["balance"]).mean()), 2) if len(base) else None,
+                "Изменилось карт": int(np.count_nonzero(delta)),
+                "Средняя Δ": round(float(delta.mean()), 2) if len(base) else None,
+            })
+            if name == self.baseline:
+                continue
+            for i in np.argsort(-np.abs(delta), kind="stable")[:top]:
+                if not delta[i]:
+                    break
+                movers.append({
+                    "Набор": name,
+                    EXCEL_COLUMNS["NAME"]: cards[i].name,
+                    EXCEL_COLUMNS["URL"]: cards[i].url,
+                    f"Баланс [{self.baseline}]": _number(base[i]),
+                    "Баланс": _number(fields["balance"][i]),
+                    "Δ": _number(delta[i]),
+                })
+        return summary, movers
+
+
+def _number(value: float) -> float:
+    """Целые значения — как int (веса из config.py целые), остальные — с округлением."""
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 3)
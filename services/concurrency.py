@@ -0,0 +1,178 @@
+"""Адаптивное управление числом параллельных запросов (AIMD)."""
+
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from config import (
+    CONCURRENCY_INITIAL,
+    CONCURRENCY_MIN,
+    CONCURRENCY_MAX,
+    CONCURRENCY_BACKOFF,
+    CONCURRENCY_DECISIONS_KEPT,
+    LATENCY_TOLERANCE,
+    MAX_RPS,
+)
+
+# Ответы, означающие перегрузку сервера (None — таймаут)
+THROTTLE_STATUSES = {429, 503}
+
+
+class AdaptiveConcurrency:
+    """
+    Окно параллельных запросов, подстраивающееся под ответы сервера.
+
+    Additive increase / multiplicative decrease: после каждого «раунда»
+    (limit завершённых запросов) без ошибок и с задержкой не хуже
+    LATENCY_TOLERANCE × лучшей медианы окно растёт на 1; на 429/503 и
+    таймаутах окно умножается на backoff. Прочие ошибки (отказ в
+    соединении, SSL, другие 5xx) о перегрузке не говорят и окно не
+    меняют (discard). Повторные ошибки от запросов,
+    начатых до сокращения, окно больше не уменьшают. Заголовок
+    Retry-After и пауза повтора загрузчика приостанавливают выдачу новых
+    запросов. Независимо от
+    окна частота запусков не превышает max_rps.
+
+    Attributes:
+        limit: Текущее окно (дробное; действует целая часть).
+        min_limit: Нижняя граница окна.
+        max_limit: Верхняя граница окна (размер пула потоков).
+        backoff: Множитель окна при перегрузке.
+        latency_tolerance: Допустимый рост медианной задержки.
+        max_rps: Жёсткий потолок запросов в секунду.
+        decisions: Последние CONCURRENCY_DECISIONS_KEPT изменений окна.
+    """
+
+    def __init__(
+        self,
+        initial: int = CONCURRENCY_INITIAL,
+        min_limit: int = CONCURRENCY_MIN,
+        max_limit: int = CONCURRENCY_MAX,
+        backoff: float = CONCURRENCY_BACKOFF,
+        latency_tolerance: float = LATENCY_TOLERANCE,
+        max_rps: float = MAX_RPS
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_rps = max_rps
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=CONCURRENCY_DECISIONS_KEPT)
+        self._changes = 0
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._paused_until = 0.0
+        self._backoff_at = 0.0
+        self._baseline: Optional[float] = None
+        self._window: List[float] = []
+        self._started = time.monotonic()
+        self._counts = {"requests": 0, "throttled": 0, "errors": 0}
+        self._peak = 0
+
+    def acquire(self) -> float:
+        """
+        Ждёт свободного места в окне и слота по частоте.
+
+        Returns:
+            float: Момент запуска запроса (передаётся в release).
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait: Optional[float] = self._paused_until - now
+                elif self._in_flight >= int(self.limit):
+                    wait = None  # ждём завершения одного из запросов
+                else:
+                    wait = self._next_start - now
+                    if wait <= 0:
+                        break
+                self._cond.wait(wait)
+
+            self._next_start = max(now, self._next_start) + 1 / self.max_rps
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+            return now
+
+    def release(self, started: float, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """
+        Учитывает завершённый запрос и при необходимости меняет окно.
+
+        Args:
+            started: Результат acquire.
+            status: HTTP-статус ответа или None (таймаут).
+            retry_after: Пауза перед новыми запросами в секундах (Retry-After
+                или пауза повтора загрузчика).
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            self._counts["requests"] += 1
+
+            if status is None or status in THROTTLE_STATUSES:
+                self._counts["throttled" if status in THROTTLE_STATUSES else "errors"] += 1
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                # Ошибки запросов, начатых до прошлого сокращения, уже учтены
+                if started >= self._backoff_at:
+                    self._backoff_at = now
+                    self._window = []
+                    self._decide(max(self.min_limit, self.limit * self.backoff),
+                                 f"backoff: {status or 'timeout'}", now)
+            else:
+                self._window.append(now - started)
+                if len(self._window) >= max(int(self.limit), 4):
+                    self._on_round(now)
+
+            self._cond.notify_all()
+
+    def discard(self) -> None:
+        """Освобождает место в окне после ошибки, не связанной с перегрузкой сервера."""
+        with self._cond:
+            self._in_flight -= 1
+            self._counts["requests"] += 1
+            self._counts["errors"] += 1
+            self._cond.notify_all()
+
+    def _on_round(self, now: float) -> None:
+        """Решение по итогам раунда запросов без ошибок."""
+        median = statistics.median(self._window)
+        self._window = []
+        self._baseline = median if self._baseline is None else min(self._baseline, median)
+
+        # При росте задержки окно не меняется (и в журнал не попадает)
+        if median <= self._baseline * self.latency_tolerance and self.limit < self.max_limit:
+            self._decide(min(self.max_limit, self.limit + 1), "increase", now, median)
+
+    def _decide(self, limit: float, reason: str, now: float, median: Optional[float] = None) -> None:
+        """Применяет новое окно; изменение целой части записывает в журнал."""
+        if int(limit) == int(self.limit):
+            self.limit = limit
+            return
+        self._changes += 1
+        elapsed = now - self._started
+        self.decisions.append({
+            "t": round(elapsed, 3),
+            "reason": reason,
+            "limit_before": int(self.limit),
+            "limit": int(limit),
+            "latency_p50_ms": round(median * 1000, 1) if median is not None else None,
+            "rps": round(self._counts["requests"] / elapsed, 2) if elapsed else None,
+        })
+        self.limit = limit
+
+    def stats(self) -> Dict[str, Any]:
+        """Итоговые показатели для метрик запуска."""
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            return {
+                **self._counts,
+                "limit": int(self.limit),
+                "peak_in_flight": self._peak,
+                "baseline_latency_ms": round(self._baseline * 1000, 1) if self._baseline else None,
+                "rps": round(self._counts["requests"] / elapsed, 2) if elapsed else None,
+                "decisions": self._changes,
+            }
@@ -0,0 +1,252 @@
+"""Инкрементальный набор данных карт, разбитый на партиции по дате и сету."""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+from config import (
+    DATASET_DIR,
+    DATASET_FORMAT,
+    DATASET_MANIFEST_FILENAME,
+    DATASET_INDEX_FILENAME,
+    DATASET_COMPACT_MIN_FILES,
+)
+from models.card import Card
+from models.rules import RuleSet, get_offline_rules
+from utils.helpers import file_lock, set_code
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401 — движок pandas для Parquet
+    except ImportError:
+        return False
+    return True
+
+
+class CardDataset:
+    """
+    Набор данных карт: файлы-партиции date=<дата запуска>/set=<сет>/.
+
+    Запуск дописывает только новые и изменившиеся карты (изменение —
+    другой отпечаток полей и оценок) новыми файлами в партиции своего
+    дня. Манифест перечисляет партиции и файлы, поэтому потребитель читает
+    только нужные партиции. Индекс карт (append-only JSONL) хранит для
+    каждого URL отпечаток и файл с актуальной строкой: устаревшие строки
+    старых файлов при чтении отбрасываются, а при сжатии удаляются.
+
+    Attributes:
+        root: Корень набора данных.
+        format: Формат файлов: "parquet" (нужен pyarrow) или "csv".
+    """
+
+    def __init__(self, root: Path = DATASET_DIR, file_format: str = DATASET_FORMAT):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = root / DATASET_MANIFEST_FILENAME
+        self.index_path = root / DATASET_INDEX_FILENAME
+        self.lock_path = root / ".lock"
+        self.manifest = self._load_manifest()
+        # Формат существующего набора не меняется: файлы одного набора однородны
+        self.format = self.manifest.get("format") or file_format
+        if self.format == "parquet" and not _parquet_available():
+            print("⚠️ pyarrow не установлен — набор данных пишется в CSV")
+            self.format = "csv"
+        self._cards = self._load_index()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"format": None, "partitions": {}, "runs": []}
+        return json.loads(self.manifest_path.read_text(encoding='utf-8'))
+
+    def _save_manifest(self) -> None:
+        self.manifest["format"] = self.format
+        tmp_path = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        """URL -> {"hash", "file"}; более поздние строки перекрывают ранние."""
+        cards: Dict[str, Dict[str, str]] = {}
+        if self.index_path.exists():
+            with self.index_path.open(encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # недописанная строка после аварийного завершения
+                    cards[record.pop("url")] = record
+        return cards
+
+    def _append_index(self, records: Dict[str, Dict[str, str]]) -> None:
+        with self.index_path.open('a', encoding='utf-8') as f:
+            f.write("".join(json.dumps({"url": url, **record}, ensure_ascii=False) + "\n"
+                            for url, record in records.items()))
+        self._cards.update(records)
+
+    def _refresh(self) -> None:
+        """Перечитывает манифест и индекс (их мог изменить другой процесс)."""
+        self.manifest = self._load_manifest()
+        self._cards = self._load_index()
+
+    @staticmethod
+    def _fingerprint(row: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(row, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _write(self, df: pd.DataFrame, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        if self.format == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        if self.format == "parquet":
+            return pd.read_parquet(path)
+        return pd.read_csv(path, encoding='utf-8', keep_default_na=False)
+
+    def append(self, cards: Iterable[Card], rules: Optional[RuleSet] = None) -> Dict[str, Any]:
+        """
+        Дописывает новые и изменившиеся карты в партиции текущего дня.
+
+        Returns:
+            Dict: run (идентификатор запуска), new, changed, unchanged, files, bytes.
+        """
+        rules = rules or get_offline_rules()
+        cards = list(cards)
+        scores = rules.score_many(card.to_dict() for card in cards)
+        now = datetime.now()
+        run = now.strftime("%Y%m%d-%H%M%S-%f") + f"-{os.getpid()}"
+        date = now.strftime("%Y-%m-%d")
+        stats = {"new": 0, "changed": 0, "unchanged": 0, "files": 0, "bytes": 0}
+
+        with file_lock(self.lock_path):
+            self._refresh()
+            partitions: Dict[str, List[Dict[str, Any]]] = {}
+            for card, score in zip(cards, scores):
+                row = {**card.to_dict(), **score, "set": set_code(card.url)}
+                fingerprint = self._fingerprint(row)
+                known = self._cards.get(card.url)
+                if known and known["hash"] == fingerprint:
+                    stats["unchanged"] += 1
+                    continue
+                stats["changed" if known else "new"] += 1
+                partition = f"date={date}/set={row['set']}"
+                partitions.setdefault(partition, []).append({**row, "run": run, "hash": fingerprint})
+
+            index_records = {}
+            for partition, rows in partitions.items():
+                relative = f"{partition}/part-{run}.{self.format}"
+                path = self.root / relative
+                self._write(pd.DataFrame(rows), path)
+                size = path.stat().st_size
+                self.manifest["partitions"].setdefault(partition, []).append(
+                    {"file": relative, "rows": len(rows), "bytes": size, "run": run}
+                )
+                index_records.update({row["url"]: {"hash": row["hash"], "file": relative} for row in rows})
+                stats["files"] += 1
+                stats["bytes"] += size
+
+            if index_records:
+                self._append_index(index_records)
+            self.manifest["runs"].append({"run": run, "date": date, **stats})
+            self._save_manifest()
+        return {"run": run, **stats}
+
+    def partitions(self, dates: Optional[Iterable[str]] = None, sets: Optional[Iterable[str]] = None) -> List[str]:
+        """Партиции манифеста с отбором по датам (YYYY-MM-DD) и кодам сетов."""
+        dates = set(dates) if dates else None
+        sets = set(sets) if sets else None
+        selected = []
+        for partition in sorted(self.manifest["partitions"]):
+            keys = dict(part.split("=", 1) for part in partition.split("/"))
+            if (dates is None or keys["date"] in dates) and (sets is None or keys["set"] in sets):
+                selected.append(partition)
+        return selected
+
+    def read(self, dates: Optional[Iterable[str]] = None, sets: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Актуальные строки выбранных партиций (читаются только их файлы).
+
+        Строка актуальна, если индекс указывает на её файл: версии карты,
+        перезаписанные более поздними запусками, отбрасываются.
+        """
+        frames = []
+        for partition in self.partitions(dates, sets):
+            for entry in self.manifest["partitions"][partition]:
+                df = self._read(self.root / entry["file"])
+                current = [self._cards.get(url, {}).get("file") == entry["file"] for url in df["url"]]
+                frames.append(df[current])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def compact(self, min_files: int = DATASET_COMPACT_MIN_FILES) -> Dict[str, int]:
+        """
+        Сливает файлы партиций, где их не меньше min_files, в один файл;
+        устаревшие версии карт при этом удаляются. Индекс переписывается
+        одной строкой на карту.
+
+        Returns:
+            Dict: partitions (сжато партиций), files_before, files_after, rows_dropped.
+        """
+        stats = {"partitions": 0, "files_before": 0, "files_after": 0, "rows_dropped": 0}
+        run = datetime.now().strftime("%Y%m%d-%H%M%S-%f") + f"-{os.getpid()}"
+        with file_lock(self.lock_path):
+            self._refresh()
+            obsolete = []
+            for partition, entries in list(self.manifest["partitions"].items()):
+                if len(entries) < min_files:
+                    continue
+                frames = []
+                for entry in entries:
+                    df = self._read(self.root / entry["file"])
+                    current = [self._cards.get(url, {}).get("file") == entry["file"] for url in df["url"]]
+                    stats["rows_dropped"] += len(df) - sum(current)
+                    frames.append(df[current])
+                merged = pd.concat(frames, ignore_index=True)
+
+                new_entries = []
+                if len(merged):
+                    relative = f"{partition}/part-{run}-compact.{self.format}"
+                    path = self.root / relative
+                    self._write(merged, path)
+                    new_entries.append({"file": relative, "rows": len(merged), "bytes": path.stat().st_size, "run": run})
+                    for url in merged["url"]:
+                        self._cards[url]["file"] = relative
+                obsolete += [self.root / entry["file"] for entry in entries]
+                if new_entries:
+                    self.manifest["partitions"][partition] = new_entries
+                else:
+                    del self.manifest["partitions"][partition]
+
+                stats["partitions"] += 1
+                stats["files_before"] += len(entries)
+                stats["files_after"] += len(new_entries)
+
+            if stats["partitions"]:
+                # Старые файлы удаляются только после того, как манифест и индекс ссылаются на новые
+                self._save_manifest()
+                tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+                with tmp_path.open('w', encoding='utf-8') as f:
+                    for url, record in self._cards.items():
+                        f.write(json.dumps({"url": url, **record}, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.index_path)
+                for path in obsolete:
+                    path.unlink(missing_ok=True)
+        return stats
+
+    def status(self) -> Dict[str, Any]:
+        """Сводка: карт, партиций, файлов, объём, последний запуск."""
+        entries = [entry for entries in self.manifest["partitions"].values() for entry in entries]
+        return {
+            "format": self.format,
+            "cards": len(self._cards),
+            "partitions": len(self.manifest["partitions"]),
+            "files": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries),
+            "last_run": self.manifest["runs"][-1] if self.manifest["runs"] else None,
+        }
@@ -0,0 +1,210 @@
+"""Анализ деклистов по локальному корпусу карт."""
+
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+from config import DECK_CURVE_MAX, DECK_SECTIONS, DECK_FILE_PATTERNS
+from models.card import Card
+from models.rules import RuleSet, get_default_rules
+
+# "4 Lightning Bolt", "4x Молния", "SB: 2 Duress", "1 Opt (ELD) 59" (формат MTG Arena)
+_LINE = re.compile(r'^(?:(?P<sb>SB:)\s*)?(?:(?P<count>\d+)\s*[xх×]?\s+)?(?P<name>.+?)(?:\s+\([A-Za-z0-9]+\)(?:\s+\S+)?)?$')
+
+
+@lru_cache(maxsize=131072)
+def normalize_name(name: str) -> str:
+    """
+    Ключ поиска карты по названию: без регистра, диакритики и пунктуации.
+
+    "Lightning Bolt", "lightning-bolt" и "LIGHTNING BOLT" дают один ключ,
+    "Ёж" и "еж" — тоже.
+    """
+    name = unicodedata.normalize("NFKD", name.casefold().replace("ё", "е"))
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[\W_]+", " ", name).split())
+
+
+def english_name(url: str) -> Optional[str]:
+    """
+    Английское название из URL Scryfall (/card/<set>/<номер>/<язык>/<slug>).
+
+    Returns:
+        Название из slug (слова через пробел) или None, если slug нет.
+    """
+    parts = [unquote(part) for part in urlsplit(url).path.strip("/").split("/")]
+    if len(parts) < 4 or parts[0] != "card":
+        return None
+    slug = parts[-1]
+    return slug.replace("-", " ") if slug and not slug.isdigit() else None
+
+
+def parse_decklist(lines: Iterable[str]) -> List[Tuple[str, int, str]]:
+    """
+    Разбирает деклист: "N Название" по строке, строки без числа — 1 копия.
+
+    Заголовки разделов (Deck, Sideboard, Commander, ...) переключают
+    раздел, префикс "SB:" относит строку к сайдборду. Комментарии (#, //)
+    и пустые строки пропускаются.
+
+    Returns:
+        List[Tuple]: (раздел, количество, название) в исходном порядке.
+    """
+    entries = []
+    section = "main"
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith(("#", "//")):
+            continue
+        header = line.rstrip(":").casefold()
+        if header in DECK_SECTIONS:
+            section = DECK_SECTIONS[header]
+            continue
+        match = _LINE.match(line)
+        if not match:
+            continue
+        entries.append((
+            "sideboard" if match["sb"] else section,
+            int(match["count"] or 1),
+            match["name"].strip(),
+        ))
+    return entries
+
+
+def load_decklists(path: Path) -> Iterator[Tuple[str, List[Tuple[str, int, str]]]]:
+    """
+    Читает деклисты: один файл или все файлы директории (DECK_FILE_PATTERNS).
+
+    Yields:
+        Tuple: (имя колоды = имя файла без расширения, строки parse_decklist).
+    """
+    if path.is_file():
+        files = [path]
+    else:
+        files = sorted({file for pattern in DECK_FILE_PATTERNS for file in path.rglob(pattern)})
+    for file in files:
+        with file.open(encoding='utf-8-sig') as f:
+            yield file.stem, parse_decklist(f)
+
+
+class CardNameIndex:
+    """
+    Индекс название → карта с заранее посчитанными баллами.
+
+    Каждая карта индексируется по русскому названию, английскому (из slug
+    URL) и, для карт "A // B", по каждой стороне. При совпадении названий
+    остаётся первая карта. Поиск — один словарный запрос.
+
+    Attributes:
+        rules: Правила, по которым посчитаны баллы.
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        self.rules = rules or get_default_rules()
+        self._cards: List[Card] = []
+        self._scores: List[Dict[str, int]] = []
+        self._mana_values: List[int] = []
+        self._by_name: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def add_many(self, cards: Iterable[Card]) -> None:
+        """Добавляет карты и считает их баллы одним пакетом."""
+        cards = list(cards)
+        scores = self.rules.score_many(card.to_dict() for card in cards)
+        for card, score in zip(cards, scores):
+            position = len(self._cards)
+            self._cards.append(card)
+            self._scores.append(score)
+            self._mana_values.append(self.rules.mana_value(card.mana_cost))
+
+            names = [card.name, english_name(card.url) or ""]
+            names += [face for name in names if "//" in name for face in name.split("//")]
+            for name in names:
+                key = normalize_name(name)
+                if key:
+                    self._by_name.setdefault(key, position)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Позиция карты по названию (любой язык, любой регистр) или None."""
+        return self._by_name.get(normalize_name(name))
+
+    def card(self, position: int) -> Card:
+        return self._cards[position]
+
+    def score(self, position: int) -> Dict[str, int]:
+        return self._scores[position]
+
+    def mana_value(self, position: int) -> int:
+        return self._mana_values[position]
+
+
+class DeckAnalyzer:
+    """
+    Сводные показатели колод по индексу карт.
+
+    Attributes:
+        index: Индекс карт корпуса.
+    """
+
+    def __init__(self, index: CardNameIndex):
+        self.index = index
+
+    def analyze(self, deck: str, entries: List[Tuple[str, int, str]]) -> Dict[str, Any]:
+        """
+        Считает показатели одной колоды (основная часть; сайдборд — только размер).
+
+        Returns:
+            Dict: deck, cards, sideboard, resolved, total_mana_points,
+            total_power, avg_balance, avg_mana_value (по картам с мана-костом),
+            curve (мана-стоимость -> копий, последний столбец — "N+"),
+            unresolved (ненайденные названия).
+        """
+        cards = sideboard = resolved = spells = 0
+        mana_points = power = balance = mana_value = 0
+        curve = [0] * (DECK_CURVE_MAX + 1)
+        unresolved = []
+
+        for section, count, name in entries:
+            if section != "main":
+                sideboard += count
+                continue
+            cards += count
+            position = self.index.lookup(name)
+            if position is None:
+                unresolved.append(name)
+                continue
+
+            score = self.index.score(position)
+            resolved += count
+            mana_points += score["mana_points"] * count
+            power += score["total_power"] * count
+            balance += score["balance"] * count
+            if self.index.card(position).mana_cost:
+                value = self.index.mana_value(position)
+                spells += count
+                mana_value += value * count
+                curve[min(value, DECK_CURVE_MAX)] += count
+
+        return {
+            "deck": deck,
+            "cards": cards,
+            "sideboard": sideboard,
+            "resolved": resolved,
+            "total_mana_points": mana_points,
+            "total_power": power,
+            "avg_balance": round(balance / resolved, 2) if resolved else None,
+            "avg_mana_value": round(mana_value / spells, 2) if spells else None,
+            "curve": {
+                (f"{value}+" if value == DECK_CURVE_MAX else str(value)): copies
+                for value, copies in enumerate(curve)
+            },
+            "unresolved": unresolved,
+        }
+
+    def analyze_many(self, decks: Iterable[Tuple[str, List[Tuple[str, int, str]]]]) -> List[Dict[str, Any]]:
+        """Показатели для каждой колоды из load_decklists."""
+        return [self.analyze(deck, entries) for deck, entries in decks]
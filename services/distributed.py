@@ -0,0 +1,157 @@
+"""Распределённый режим: координатор раздаёт задачи, воркеры их выполняют."""
+
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config import RANDOM_TASK_SIZE
+from models.card import Card
+from parsers.html_extractor import HTMLCardParser
+from services.card_store import CardStore
+from services.downloader import CardDownloader, load_targets
+from services.excel_exporter import ExcelExporter
+from services.task_queue import TaskQueue, TASK_RANDOM, TASK_URL, TASK_PARSE
+
+
+class Coordinator:
+    """
+    Формирует задания для воркеров и собирает итоговый экспорт.
+
+    Attributes:
+        queue: Общая очередь задач.
+        store: Общее хранилище карт.
+    """
+
+    def __init__(self, queue: TaskQueue, store: CardStore):
+        self.queue = queue
+        self.store = store
+
+    def submit_random(self, job: str, count: int, chunk: int = RANDOM_TASK_SIZE) -> int:
+        """Делит N случайных карт на квоты по chunk карт."""
+        quotas = [min(chunk, count - start) for start in range(0, count, chunk)]
+        return self.queue.add(job, TASK_RANDOM, ({"count": quota} for quota in quotas))
+
+    def submit_targets(self, job: str, path: Path) -> int:
+        """Ставит по задаче на каждую карту из файла целей."""
+        urls = list(dict.fromkeys(load_targets(path)))
+        return self.queue.add(job, TASK_URL, ({"url": url} for url in urls))
+
+    def submit_parse_cache(self, job: str, downloader: CardDownloader) -> int:
+        """Ставит задачи парсинга всех страниц общего кэша с известным URL."""
+        return self.queue.add(job, TASK_PARSE, ({"url": url} for _, url in downloader.list_cache() if url))
+
+    def status(self, job: Optional[str] = None) -> Dict[str, int]:
+        """Статусы задач и количество карт в хранилище."""
+        stats = self.queue.stats(job)
+        stats["cards"] = self.store.count(job)
+        return stats
+
+    def merge(self, job: str, exporter: ExcelExporter) -> Optional[Path]:
+        """Собирает карты задания из общего хранилища в один отчёт."""
+        stats = self.queue.stats(job)
+        if stats["pending"] or stats["leased"]:
+            print(f"⚠️ Задание {job} ещё не завершено: {stats['pending']} в очереди, "
+                  f"{stats['leased']} в работе — экспорт будет частичным.")
+        cards = list(self.store.iter_cards(job))
+        return exporter.export(cards)
+
+
+class Worker:
+    """
+    Выполняет задачи из общей очереди и пишет карты в общее хранилище.
+
+    Частоту запросов ограничивает rate_limiter загрузчика (общий для
+    всех воркеров), поэтому собственная пауза загрузчика не нужна.
+
+    Attributes:
+        queue: Общая очередь задач.
+        store: Общее хранилище карт.
+        downloader: Загрузчик (кэш может быть общим для воркеров узла).
+        worker_id: Идентификатор воркера в очереди.
+    """
+
+    def __init__(
+        self,
+        queue: TaskQueue,
+        store: CardStore,
+        downloader: CardDownloader,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.store = store
+        self.downloader = downloader
+        self.parser = HTMLCardParser()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    def _handle(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Выполняет одну задачу; возвращает результат для очереди или None,
+        если аренда истекла до записи карт в хранилище.
+        """
+        payload = task["payload"]
+        pages = []
+
+        if task["kind"] == TASK_RANDOM:
+            for _ in range(payload["count"]):
+                page = self.downloader.fetch_one()
+                if page:
+                    pages.append(page)
+        elif task["kind"] == TASK_URL:
+            page = self.downloader.get_or_fetch(payload["url"])
+            if page is None:
+                raise RuntimeError(f"не удалось загрузить {payload['url']}")
+            pages.append(page)
+        elif task["kind"] == TASK_PARSE:
+            html = self.downloader.read_cached(payload["url"])
+            if html is None:
+                raise RuntimeError(f"нет в кэше: {payload['url']}")
+            pages.append((html, payload["url"]))
+        else:
+            raise ValueError(f"неизвестный вид задачи: {task['kind']}")
+
+        cards: List[Card] = [self.parser.parse(html, url) for html, url in pages]
+        if not self.queue.holds(task["id"], self.worker_id):
+            return None  # аренда истекла: задачу уже выполняет другой воркер
+        self.store.put_many(cards, task["job"])
+        return {"cards": len(cards)}
+
+    def run(self, job: Optional[str] = None, wait: bool = False, poll_interval: float = 5.0) -> int:
+        """
+        Обрабатывает задачи, пока очередь не опустеет.
+
+        Args:
+            job: Брать задачи только этого задания.
+            wait: Не завершаться на пустой очереди, а ждать новых задач.
+            poll_interval: Пауза между проверками пустой очереди.
+
+        Returns:
+            int: Количество выполненных задач.
+        """
+        done = 0
+        print(f"🛠️ Воркер {self.worker_id} запущен")
+        while True:
+            task = self.queue.lease(self.worker_id, job)
+            if task is None:
+                if not wait:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                result = self._handle(task)
+            except Exception as e:
+                print(f"⚠️ Задача {task['id']} ({task['kind']}): {e}")
+                if not self.queue.fail(task["id"], self.worker_id, str(e), task["attempts"]):
+                    print(f"⌛ Задача {task['id']}: аренда истекла — ошибка не учтена")
+                continue
+
+            # Страницы должны оказаться в общем кэше до отметки о выполнении
+            self.downloader.flush(sync=False)
+            if result is None or not self.queue.complete(task["id"], self.worker_id, result):
+                print(f"⌛ Задача {task['id']}: аренда истекла — результат отброшен")
+                continue
+            done += 1
+
+        print(f"✅ Воркер {self.worker_id}: выполнено задач: {done}")
+        return done
@@ -1,11 +1,75 @@
 """Сервис загрузки карт с Scryfall с кэшированием."""
 
+import hashlib
+import os
+import random
+import threading
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Set, Tuple
 from tqdm import tqdm
-from config import SCRYFALL_RANDOM_URL, REQUEST_DELAY, REQUEST_TIMEOUT, DIR_HTML_CACHE
+from config import (
+    SCRYFALL_RANDOM_URL,
+    SCRYFALL_CARD_URL,
+    REQUEST_DELAY,
+    REQUEST_TIMEOUT,
+    REQUEST_WORKERS,
+    REQUEST_RETRIES,
+    REQUEST_BACKOFF_BASE,
+    REQUEST_BACKOFF_MAX,
+    ADAPTIVE_CONCURRENCY,
+    DIR_HTML_CACHE,
+    CACHE_INDEX_FILENAME,
+    CACHE_SHARD_CHARS,
+    CACHE_LOCK_FILENAME,
+)
+from services.cache_index import CacheIndex
+from services.concurrency import AdaptiveConcurrency, THROTTLE_STATUSES
+from services.rate_limit import RateLimiter
+from services.cache_reader import CacheReader
+from services.cache_writer import CacheWriter
+from utils.helpers import file_lock
+
+
+def normalize_target_url(url: str) -> str:
+    """Приводит URL карты к каноническому виду для дедупликации."""
+    return url.strip().rstrip('/')
+
+
+def parse_targets(lines: Iterable[str]) -> List[str]:
+    """
+    Разбирает список целей: URL карт или пары (set, номер).
+    
+    Поддерживаемые строки: "https://scryfall.com/card/...", "m21 159",
+    "m21/159", "m21,159". Пустые строки и комментарии (#) пропускаются.
+    
+    Returns:
+        List[str]: URL для загрузки в исходном порядке.
+    """
+    urls = []
+    for raw in lines:
+        line = raw.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith(("http://", "https://")):
+            urls.append(line)
+            continue
+        parts = line.replace(',', ' ').replace('/', ' ').split()
+        if len(parts) != 2:
+            print(f"⚠️ Не удалось разобрать цель: {raw.strip()}")
+            continue
+        set_code, number = parts
+        urls.append(SCRYFALL_CARD_URL.format(set=set_code.lower(), number=number))
+    return urls
+
+
+def load_targets(path: Path) -> List[str]:
+    """Читает файл целей (по одной на строку), см. parse_targets."""
+    with path.open(encoding='utf-8') as f:
+        return parse_targets(f)
 
 
 class CardDownloader:
@@ -15,50 +79,218 @@ class CardDownloader:
     Attributes:
         cache_dir: Директория для сохранения HTML-файлов.
         delay: Пауза между запросами (защита от rate-limit).
+        workers: Число параллельных запросов (список целей, обновление кэша).
+        rate_limiter: Общий лимит частоты запросов (например, для всех
+            воркеров распределённого режима) или None.
+        index: Манифест кэша (URL, размер, хэш, HTTP-валидаторы страниц).
+        reader: Параллельное чтение файлов кэша.
+        writer: Фоновая запись страниц в кэш.
+        lock_path: Lock-файл кэша: чтение и запись берут разделяемую
+            блокировку, очистка — эксклюзивную. Кэш можно разделять
+            между несколькими процессами на одной машине.
     """
     
-    def __init__(self, cache_dir: Path = DIR_HTML_CACHE, delay: float = REQUEST_DELAY):
+    def __init__(
+        self,
+        cache_dir: Path = DIR_HTML_CACHE,
+        delay: float = REQUEST_DELAY,
+        workers: int = REQUEST_WORKERS,
+        rate_limiter: Optional[RateLimiter] = None,
+        adaptive: bool = ADAPTIVE_CONCURRENCY
+    ):
         self.cache_dir = cache_dir
         self.delay = delay
+        self.rate_limiter = rate_limiter
+        self.concurrency = AdaptiveConcurrency() if adaptive else None
+        # При адаптивном окне пул не ограничивает параллельность — это делает контроллер
+        self.workers = self.concurrency.max_limit if self.concurrency else workers
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index = CacheIndex(self.cache_dir / CACHE_INDEX_FILENAME)
+        self.reader = CacheReader()
+        self.lock_path = self.cache_dir / CACHE_LOCK_FILENAME
+        self.writer = CacheWriter(self.index, self._cache_path, self.lock_path)
+        self._local = threading.local()
+        self._in_flight: Set[str] = set()
+        self._in_flight_lock = threading.Lock()
+        self._migrate_flat_layout()
     
-    def _save_to_cache(self, html: str, url: str) -> None:
-        """Сохраняет HTML-контент в локальный файл."""
-        slug = url.rstrip('/').split('/')[-1]
-        filepath = self.cache_dir / f"card_{slug}.html"
-        filepath.write_text(html, encoding='utf-8')
+    def _session(self) -> requests.Session:
+        """Возвращает HTTP-сессию текущего потока (keep-alive соединения)."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
     
-    def fetch_one(self) -> Optional[Tuple[str, str]]:
+    def _throttle(self) -> None:
+        """Ждёт разрешения общего лимита частоты запросов, если он задан."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+    
+    def _request(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
         """
-        Загружает одну случайную карту.
+        GET-запрос с учётом общего лимита частоты и адаптивного окна.
+        
+        При адаптивной конкурентности ответы 429/5xx, таймауты и ошибки
+        соединения повторяются до REQUEST_RETRIES раз. Перед повтором —
+        экспоненциальная пауза со случайным разбросом (не больше
+        REQUEST_BACKOFF_MAX, но не меньше Retry-After). Контроллеру как
+        перегрузка сообщаются только 429, 503 и таймауты: их пауза
+        приостанавливает новые запросы всех потоков. Прочие ошибки окно не
+        сокращают, и пауза выдерживается только перед своим повтором.
+        
+        Raises:
+            requests.RequestException: Ошибка соединения после всех повторов.
+        """
+        attempts = REQUEST_RETRIES + 1 if self.concurrency else 1
+        for attempt in range(attempts):
+            self._throttle()
+            started = self.concurrency.acquire() if self.concurrency else 0.0
+            status, retry_after, timed_out, pause = None, None, False, None
+            try:
+                response = self._session().get(
+                    url,
+                    headers=headers,
+                    allow_redirects=True,
+                    timeout=REQUEST_TIMEOUT
+                )
+                status = response.status_code
+                delay = response.headers.get("Retry-After", "")
+                retry_after = float(delay) if delay.isdigit() else None
+            except requests.Timeout:
+                timed_out = True
+                if attempt == attempts - 1:
+                    raise
+            except requests.ConnectionError:
+                if attempt == attempts - 1:
+                    raise
+            finally:
+                if self.concurrency:
+                    failed = status is None or status >= 500 or status == 429
+                    pause = self._backoff(attempt, retry_after) if failed and attempt < attempts - 1 else retry_after
+                    if timed_out or status in THROTTLE_STATUSES:
+                        self.concurrency.release(started, status, pause)
+                        pause = None  # паузу выдерживает контроллер
+                    elif status is None or status >= 500:
+                        self.concurrency.discard()
+                    else:
+                        self.concurrency.release(started, status)
+            
+            if status is not None and status < 500 and status != 429:
+                break
+            if pause and attempt < attempts - 1:
+                time.sleep(pause)
+        return response
+    
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+        """Пауза перед повтором: половина экспоненты плюс случайная половина, не меньше Retry-After."""
+        delay = min(REQUEST_BACKOFF_MAX, REQUEST_BACKOFF_BASE * 2 ** attempt)
+        return max(retry_after or 0.0, delay / 2 + random.uniform(0, delay / 2))
+    
+    @staticmethod
+    def _slug(url: str) -> str:
+        """Извлекает slug карты из URL."""
+        return url.rstrip('/').split('/')[-1]
+    
+    def _cache_path(self, slug: str) -> Path:
+        """Путь к HTML-файлу карты в кэше: <cache_dir>/<префикс хэша slug>/card_<slug>.html."""
+        shard = hashlib.md5(slug.encode('utf-8')).hexdigest()[:CACHE_SHARD_CHARS]
+        return self.cache_dir / shard / f"card_{slug}.html"
+    
+    @staticmethod
+    def _content_fields(data: bytes) -> Dict[str, Any]:
+        """Размер и хэш содержимого страницы для манифеста."""
+        return {"size": len(data), "hash": hashlib.blake2b(data, digest_size=16).hexdigest()}
+    
+    def _migrate_flat_layout(self) -> None:
+        """Переносит файлы старого плоского кэша в шарды и заносит их в манифест."""
+        if not any(self.cache_dir.glob("card_*.html")):
+            return
+        
+        with file_lock(self.lock_path):
+            legacy = list(self.cache_dir.glob("card_*.html"))  # другой процесс мог успеть раньше
+            if legacy:
+                print(f"📦 Перенос {len(legacy)} файлов кэша в шардированную структуру...")
+            for filepath in legacy:
+                slug = filepath.stem.replace("card_", "", 1)
+                target = self._cache_path(slug)
+                target.parent.mkdir(exist_ok=True)
+                fields = self._content_fields(filepath.read_bytes())
+                os.replace(filepath, target)
+                # URL сохраняется только если известен из манифеста: восстановить его по slug нельзя
+                self.index.update(slug, **fields)
+    
+    @staticmethod
+    def _validators(response: requests.Response) -> Dict[str, Optional[str]]:
+        """Извлекает HTTP-валидаторы ответа и время загрузки."""
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+    
+    def _save_to_cache(self, data: bytes, url: str, **fields: Any) -> None:
+        """
+        Ставит HTML-контент в очередь фоновой записи в кэш (см. CacheWriter).
+        
+        Args:
+            data: Содержимое страницы (байты ответа как есть).
+            url: Исходный URL страницы карты.
+            **fields: Дополнительные поля манифеста (валидаторы, source).
+        """
+        self.writer.submit(self._slug(url), data, url=url, **self._content_fields(data), **fields)
+    
+    def _fetch_url(self, url: str, source: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """
+        Загружает страницу по URL и сохраняет её в кэш.
         
+        Args:
+            url: Адрес запроса (может редиректить на страницу карты).
+            source: Исходная цель для индекса, чтобы повторно её не загружать.
+            
         Returns:
-            Tuple(html_content, final_url) или None при ошибке.
+            Tuple(html_bytes, final_url) или None при ошибке.
         """
         try:
-            response = requests.get(
-                SCRYFALL_RANDOM_URL,
-                allow_redirects=True,
-                timeout=REQUEST_TIMEOUT
-            )
+            response = self._request(url)
             response.raise_for_status()
             
-            self._save_to_cache(response.text, response.url)
-            return response.text, response.url
+            fields = self._validators(response)
+            if source:
+                fields["source"] = source
+            # Байты ответа идут в кэш и парсер без декодирования в str
+            self._save_to_cache(response.content, response.url, **fields)
+            return response.content, response.url
             
         except requests.RequestException as e:
             print(f"⚠️ Ошибка загрузки: {e}")
             return None
     
-    def fetch_batch(self, count: int) -> List[Tuple[str, str]]:
+    def fetch_one(self) -> Optional[Tuple[bytes, str]]:
+        """
+        Загружает одну случайную карту.
+        
+        Returns:
+            Tuple(html_bytes, final_url) или None при ошибке.
+        """
+        return self._fetch_url(SCRYFALL_RANDOM_URL)
+    
+    def fetch_batch(
+        self,
+        count: int,
+        on_result: Optional[Callable[[bytes, str], None]] = None
+    ) -> List[Tuple[bytes, str]]:
         """
         Загружает пакет карт с прогресс-баром.
         
         Args:
             count: Количество карт для загрузки.
+            on_result: Вызывается с (html_bytes, url) сразу после загрузки
+                каждой карты (журнал задания, потоковый парсинг).
             
         Returns:
-            List[Tuple]: Список кортежей (html_content, url).
+            List[Tuple]: Список кортежей (html_bytes, url).
         """
         results = []
         
@@ -69,22 +301,181 @@ class CardDownloader:
             colour="green",
             ncols=80
         ) as pbar:
-            for i in range(count):
-                card = self.fetch_one()
-                
+            def account(card: Optional[Tuple[bytes, str]]) -> None:
                 if card:
                     results.append(card)
-                    pbar.set_postfix({"✅": len(results), "❌": i + 1 - len(results)})
-                    pbar.update(1)
-                else:
-                    pbar.set_postfix({"✅": len(results), "❌": i + 1 - len(results)})
-                    pbar.update(1)
-                
+                    if on_result:
+                        on_result(*card)
+                pbar.set_postfix({"✅": len(results), "❌": pbar.n + 1 - len(results),
+                                  "💾": self.writer.stats()["queue_depth"]})
+                pbar.update(1)
+            
+            if self.concurrency:
+                # Параллельность и паузы определяет адаптивный контроллер
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for future in as_completed([pool.submit(self.fetch_one) for _ in range(count)]):
+                        account(future.result())
+            else:
+                for _ in range(count):
+                    account(self.fetch_one())
+                    time.sleep(self.delay)
+        
+        return results
+    
+    def _verify(self, path: Path, data: bytes) -> bool:
+        """Сверяет размер и хэш прочитанной страницы с манифестом."""
+        slug = path.stem.replace("card_", "", 1)
+        entry = self.index.get(slug)
+        if not entry or "hash" not in entry:
+            return True  # страница старого кэша — сверять не с чем
+        actual = self._content_fields(data)
+        if (entry.get("size"), entry["hash"]) == (actual["size"], actual["hash"]):
+            return True
+        # Возможно, страницу только что обновил другой процесс
+        self.index.refresh()
+        entry = self.index.get(slug) or {}
+        return (entry.get("size"), entry.get("hash")) == (actual["size"], actual["hash"])
+    
+    def read_cached(self, url: str) -> Optional[bytes]:
+        """Читает закэшированную страницу по URL карты или None (в т.ч. при повреждении)."""
+        slug = self._slug(url)
+        pending = self.writer.pending(slug)
+        if pending is not None:
+            return pending
+        if slug not in self.index:
+            return None
+        try:
+            with file_lock(self.lock_path, shared=True):
+                return self.reader.read_verified(self._cache_path(slug), self._verify)
+        except OSError as e:
+            print(f"⚠️ Ошибка чтения {slug}: {e}")
+            return None
+    
+    def _fetch_target(self, target: str) -> Optional[Tuple[bytes, str]]:
+        """Загружает цель, если её не загружает параллельно другой поток."""
+        with self._in_flight_lock:
+            if target in self._in_flight:
+                return None
+            self._in_flight.add(target)
+        try:
+            card = self._fetch_url(target, source=target)
+            if not self.concurrency:
                 time.sleep(self.delay)
+            return card
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(target)
+    
+    def _read_target(self, target: str) -> Optional[Tuple[bytes, str]]:
+        """Читает закэшированную страницу цели (по URL или source) или None."""
+        slug = self.index.find(target)
+        entry = self.index.get(slug) if slug else None
+        html = self.read_cached(entry["url"]) if entry and entry.get("url") else None
+        return (html, entry["url"]) if html is not None else None
+    
+    def get_or_fetch(self, target: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Возвращает страницу цели из кэша, а при промахе загружает её.
+        
+        Args:
+            target: URL карты или цели (см. parse_targets).
+            
+        Returns:
+            Tuple(html_bytes, url) или None при ошибке.
+        """
+        target = normalize_target_url(target)
+        return self._read_target(target) or self._fetch_url(target, source=target)
+    
+    def fetch_targets(self, targets: Iterable[str]) -> List[Tuple[bytes, str]]:
+        """
+        Загружает конкретные карты по списку URL.
+        
+        Уже закэшированные цели читаются с диска без запроса, повторы
+        отбрасываются, остальные цели загружаются параллельно. Прерванный
+        запуск при повторе продолжается ровно с незагруженных карт.
+        
+        Args:
+            targets: URL карт (см. parse_targets для списков set/номер).
+            
+        Returns:
+            List[Tuple]: Список кортежей (html_bytes, url) для всех целей.
+        """
+        unique = list(dict.fromkeys(normalize_target_url(t) for t in targets))
+        self.writer.flush(sync=False)
+        
+        results = []
+        pending = []
+        for target in unique:
+            cached = self._read_target(target)
+            if cached:
+                results.append(cached)
+            else:
+                pending.append(target)
+        
+        print(f"🎯 Целей: {len(unique)}, в кэше: {len(results)}, к загрузке: {len(pending)}")
+        if not pending:
+            return results
+        
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, tqdm(
+            total=len(pending),
+            desc="🎯 Загрузка по списку",
+            unit="карта",
+            colour="green",
+            ncols=80
+        ) as pbar:
+            futures = [pool.submit(self._fetch_target, target) for target in pending]
+            for future in as_completed(futures):
+                card = future.result()
+                if card:
+                    results.append(card)
+                else:
+                    failed += 1
+                pbar.set_postfix({"✅": len(results), "❌": failed})
+                pbar.update(1)
         
         return results
     
-    def load_from_cache(self, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    def list_cache(self, limit: Optional[int] = None) -> List[Tuple[Path, str]]:
+        """
+        Перечисляет файлы кэша по манифесту (без сканирования директорий).
+        
+        Args:
+            limit: Максимальное количество файлов (None = все).
+            
+        Returns:
+            List[Tuple]: Пары (путь к файлу, URL карты) в порядке slug.
+        """
+        self.writer.flush(sync=False)
+        return self.cache_files(self.index.slugs(limit))
+    
+    def cache_files(self, slugs: Iterable[str]) -> List[Tuple[Path, str]]:
+        """
+        Пути и URL страниц кэша по их slug (без чтения файлов).
+        
+        Returns:
+            List[Tuple]: Пары (путь к файлу, URL карты) в порядке slugs. У
+            страниц старого кэша URL неизвестен (по slug его не восстановить)
+            и вместо него пустая строка.
+        """
+        return [(self._cache_path(slug), (self.index.get(slug) or {}).get("url", "")) for slug in slugs]
+    
+    def iter_cache(self, files: List[Tuple[Path, str]]) -> Iterator[List[Tuple[bytes, str]]]:
+        """
+        Потоково читает файлы кэша пачками (см. CacheReader).
+        
+        Args:
+            files: Результат list_cache.
+            
+        Yields:
+            List[Tuple]: Пачка кортежей (html_bytes, url). Файлы, не
+            совпадающие с манифестом по размеру и хэшу, пропускаются.
+        """
+        # Разделяемая блокировка держится, пока поток не дочитан: очистка ждёт
+        with file_lock(self.lock_path, shared=True):
+            yield from self.reader.iter_chunks(files, self._verify)
+    
+    def load_from_cache(self, limit: Optional[int] = None) -> List[Tuple[bytes, str]]:
         """
         Загружает карты из локального кэша HTML.
         
@@ -92,44 +483,109 @@ class CardDownloader:
             limit: Максимальное количество карт для загрузки (None = все).
             
         Returns:
-            List[Tuple]: Список кортежей (html_content, url).
+            List[Tuple]: Список кортежей (html_bytes, url).
         """
-        html_files = sorted(self.cache_dir.glob("card_*.html"))
+        files = self.list_cache(limit)
         
-        if not html_files:
+        if not files:
             print("⚠️ Кэш пуст — нет сохранённых страниц.")
             return []
         
-        if limit:
-            html_files = html_files[:limit]
-        
         results = []
-        print(f"📂 Найдено {len(html_files)} файлов в кэше")
+        print(f"📂 Найдено {len(files)} файлов в кэше")
         
         with tqdm(
-            total=len(html_files),
+            total=len(files),
             desc="📂 Загрузка из кэша",
             unit="файл",
             colour="cyan",
             ncols=80
         ) as pbar:
-            for filepath in html_files:
-                try:
-                    html_content = filepath.read_text(encoding='utf-8')
-                    # Извлекаем URL из имени файла
-                    slug = filepath.stem.replace("card_", "")
-                    url = f"https://scryfall.com/card/{slug}"
-                    results.append((html_content, url))
-                    pbar.update(1)
-                except Exception as e:
-                    print(f"⚠️ Ошибка чтения {filepath.name}: {e}")
-                    pbar.update(1)
+            for chunk in self.iter_cache(files):
+                results.extend(chunk)
+                pbar.update(len(chunk))
         
         return results
     
+    def _revalidate(self, slug: str, entry: Dict[str, Optional[str]]) -> str:
+        """
+        Перепроверяет одну страницу условным запросом.
+        
+        Returns:
+            "changed", "unchanged" или "failed".
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        
+        try:
+            response = self._request(entry["url"], headers)
+            if response.status_code == 304:
+                # Страница не изменилась — байты в кэше остаются как есть
+                self.index.update(slug, **{
+                    k: v for k, v in self._validators(response).items() if v
+                })
+                return "unchanged"
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️ Ошибка проверки {slug}: {e}")
+            return "failed"
+        
+        changed = self._content_fields(response.content)["hash"] != entry.get("hash")
+        if changed:
+            self._save_to_cache(response.content, entry["url"], **self._validators(response))
+        else:
+            self.index.update(slug, **self._validators(response))
+        return "changed" if changed else "unchanged"
+    
+    def refresh_cache(self) -> Dict[str, int]:
+        """
+        Обновляет кэш условными запросами (If-None-Match / If-Modified-Since).
+        
+        Страницы проверяются параллельно по их исходным URL. Ответ 304
+        оставляет закэшированные байты, 200 перезаписывает файл только
+        при изменении содержимого.
+        
+        Returns:
+            Dict: Счётчики "changed", "unchanged", "failed" и "skipped"
+            (страницы без сохранённого URL, загруженные до появления индекса).
+        """
+        self.writer.flush(sync=False)
+        entries = self.index.entries()
+        targets = {slug: entry for slug, entry in entries.items() if entry.get("url")}
+        stats = {"changed": 0, "unchanged": 0, "failed": 0}
+        stats["skipped"] = len(entries) - len(targets)
+        
+        if not targets:
+            return stats
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, tqdm(
+            total=len(targets),
+            desc="🔄 Проверка кэша",
+            unit="стр",
+            colour="yellow",
+            ncols=80
+        ) as pbar:
+            futures = [pool.submit(self._revalidate, slug, entry) for slug, entry in targets.items()]
+            for future in as_completed(futures):
+                stats[future.result()] += 1
+                pbar.set_postfix({"🆕": stats["changed"], "❌": stats["failed"]})
+                pbar.update(1)
+        
+        # Каждая проверка дописывает строку в манифест — периодически сжимаем его
+        self.writer.flush()
+        self.index.compact()
+        return stats
+    
+    def flush(self, sync: bool = True) -> None:
+        """Дожидается фоновой записи кэша и (при sync) сбрасывает её на диск."""
+        self.writer.flush(sync)
+    
     def get_cache_count(self) -> int:
-        """Возвращает количество файлов в кэше."""
-        return len(list(self.cache_dir.glob("card_*.html")))
+        """Возвращает количество файлов в кэше (по манифесту)."""
+        return len(self.index)
     
     def clear_cache(self) -> int:
         """
@@ -138,7 +594,20 @@ class CardDownloader:
         Returns:
             int: Количество удалённых файлов.
         """
-        html_files = list(self.cache_dir.glob("card_*.html"))
-        for filepath in html_files:
-            filepath.unlink()
-        return len(html_files)
\ No newline at end of file
+        self.writer.flush(sync=False)
+        # Эксклюзивная блокировка: ждём читателей и писателей других процессов
+        with file_lock(self.lock_path):
+            slugs = self.index.slugs()
+            shards = set()
+            for slug in slugs:
+                filepath = self._cache_path(slug)
+                filepath.unlink(missing_ok=True)
+                shards.add(filepath.parent)
+            self.index.clear()
+        
+        for shard in shards:
+            try:
+                shard.rmdir()
+            except OSError:
+                pass  # в шарде остались посторонние файлы
+        return len(slugs)
\ No newline at end of file
@@ -1,10 +1,88 @@
 """Экспорт данных карт в Excel."""
 
 import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from openpyxl import Workbook
 from pathlib import Path
-from typing import List, Optional
-from config import DIR_RESULTS, EXCEL_DATE_FORMAT, EXCEL_FILENAME_TEMPLATE, EXCEL_COLUMNS
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import (
+    DIR_RESULTS,
+    EXCEL_DATE_FORMAT,
+    EXCEL_FILENAME_TEMPLATE,
+    EXCEL_COLUMNS,
+    DECKS_FILENAME_TEMPLATE,
+    DECK_COLUMNS,
+    COMPARISON_FILENAME_TEMPLATE,
+    AGGREGATES_FILENAME_TEMPLATE,
+    EXCEL_SHARD_ROWS,
+    EXCEL_SHARD_MODE,
+    EXCEL_SHARD_WORKERS,
+    EXCEL_SHARD_FILENAME_TEMPLATE,
+)
 from models.card import Card
+from models.rules import get_default_rules
+
+# Без автоматических формул и ссылок: текст карт и URL пишутся как есть (как у pandas)
+_XLSX_OPTIONS = {"constant_memory": True, "strings_to_formulas": False, "strings_to_urls": False}
+# Столбцы-формулы и поле оценки с их значением
+_FORMULA_SCORES = {"TOTAL_POWER": "total_power", "BALANCE": "balance"}
+
+Row = Tuple[Card, Dict[str, int]]
+
+
+def _xlsxwriter() -> Any:
+    """xlsxwriter импортируется только для шардированного экспорта (необязательная зависимость)."""
+    try:
+        import xlsxwriter
+    except ImportError:
+        return None
+    return xlsxwriter
+
+
+def _new_workbook(path: Path) -> Any:
+    workbook = _xlsxwriter().Workbook(str(path), _XLSX_OPTIONS)
+    # Значения формул записаны вместе с формулами — пересчёт при открытии не нужен
+    workbook.calc_on_load = False
+    return workbook
+
+
+def _write_cards(worksheet: Any, rows: List[Row]) -> None:
+    """Лист карт: те же столбцы и формулы, что у export, плюс значения формул."""
+    worksheet.write_row(0, 0, list(EXCEL_COLUMNS.values()))
+    for i, (card, score) in enumerate(rows):
+        values = card.to_excel_dict(i, score)
+        for column, (key, title) in enumerate(EXCEL_COLUMNS.items()):
+            if key in _FORMULA_SCORES:
+                worksheet.write_formula(i + 1, column, values[title], None, score[_FORMULA_SCORES[key]])
+            else:
+                worksheet.write(i + 1, column, values[title])
+
+
+def _write_shard_file(path: Path, rows: List[Row]) -> Path:
+    """Файл-шард (выполняется в процессе-воркере)."""
+    workbook = _new_workbook(path)
+    _write_cards(workbook.add_worksheet("Карты"), rows)
+    workbook.close()
+    return path
+
+
+def _batches(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _shard_summary(number: int, rows: List[Row]) -> Dict[str, Any]:
+    """Строка листа-индекса (без ссылки)."""
+    return {
+        "Шард": number,
+        "Карт": len(rows),
+        "Первая карта": rows[0][0].name,
+        "Последняя карта": rows[-1][0].name,
+        "Средний баланс": round(sum(score["balance"] for _, score in rows) / len(rows), 2),
+    }
 
 
 class ExcelExporter:
@@ -14,19 +92,42 @@ class ExcelExporter:
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def _make_filename(self, count: int) -> Path:
+    def _make_filename(self, count: int, template: str = EXCEL_FILENAME_TEMPLATE) -> Path:
         """Генерирует имя файла с таймстампом."""
         from datetime import datetime
         timestamp = datetime.now().strftime(EXCEL_DATE_FORMAT)
-        filename = EXCEL_FILENAME_TEMPLATE.format(date=timestamp, count=count)
+        filename = template.format(date=timestamp, count=count)
         return self.output_dir / filename
     
-    def export(self, cards: List[Card]) -> Optional[Path]:
+    def _save(self, df: pd.DataFrame, filepath: Path) -> Optional[Path]:
+        """Записывает таблицу в Excel, сообщая об ошибке вместо исключения."""
+        try:
+            df.to_excel(filepath, index=False)
+            print(f"💾 Сохранено: \"{filepath}\"")
+            return filepath
+        except Exception as e:
+            print(f"❌ Ошибка экспорта: {e}")
+            return None
+    
+    def _save_sheets(self, sheets: Dict[str, pd.DataFrame], filepath: Path) -> Optional[Path]:
+        """Записывает несколько таблиц в листы одной книги."""
+        try:
+            with pd.ExcelWriter(filepath) as writer:
+                for sheet, df in sheets.items():
+                    df.to_excel(writer, sheet_name=sheet, index=False)
+            print(f"💾 Сохранено: \"{filepath}\"")
+            return filepath
+        except Exception as e:
+            print(f"❌ Ошибка экспорта: {e}")
+            return None
+    
+    def export(self, cards: List[Card], filepath: Optional[Path] = None) -> Optional[Path]:
         """
         Сохраняет карты в Excel.
         
         Args:
             cards: Список объектов Card.
+            filepath: Путь к файлу (None = новое имя с таймстампом).
             
         Returns:
             Path к сохранённому файлу или None при ошибке.
@@ -34,15 +135,219 @@ class ExcelExporter:
         if not cards:
             print("⚠️ Нет данных для экспорта.")
             return None
+        if EXCEL_SHARD_ROWS and len(cards) > EXCEL_SHARD_ROWS:
+            scores = get_default_rules().score_many(card.to_dict() for card in cards)
+            return self.export_sharded(zip(cards, scores), len(cards), filepath)
         
         data = [card.to_excel_dict(i) for i, card in enumerate(cards)]
         df = pd.DataFrame(data, columns=list(EXCEL_COLUMNS.values()))
         
-        filepath = self._make_filename(len(cards))
+        return self._save(df, filepath or self._make_filename(len(cards)))
+    
+    def export_stream(
+        self,
+        rows: Iterable[Tuple[Card, Dict[str, int]]],
+        count: int,
+        filepath: Optional[Path] = None
+    ) -> Optional[Path]:
+        """
+        Сохраняет карты в Excel построчно, не собирая таблицу в памяти.
+        
+        Книга пишется в режиме write-only openpyxl; столбцы и формулы те же,
+        что у export.
+        
+        Args:
+            rows: Пары (карта, оценка) — например, CardSpill.rows().
+            count: Количество карт (для имени файла).
+            filepath: Путь к файлу (None = новое имя с таймстампом).
+            
+        Returns:
+            Path к сохранённому файлу или None при ошибке.
+        """
+        if not count:
+            print("⚠️ Нет данных для экспорта.")
+            return None
+        if EXCEL_SHARD_ROWS and count > EXCEL_SHARD_ROWS:
+            return self.export_sharded(rows, count, filepath)
+        
+        filepath = filepath or self._make_filename(count)
         try:
-            df.to_excel(filepath, index=False)
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Sheet1")
+            sheet.append(list(EXCEL_COLUMNS.values()))
+            for i, (card, score) in enumerate(rows):
+                sheet.append(list(card.to_excel_dict(i, score).values()))
+            workbook.save(filepath)
             print(f"💾 Сохранено: \"{filepath}\"")
             return filepath
         except Exception as e:
             print(f"❌ Ошибка экспорта: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def export_sharded(
+        self,
+        rows: Iterable[Row],
+        count: int,
+        filepath: Optional[Path] = None,
+        mode: Optional[str] = None,
+        shard_rows: int = EXCEL_SHARD_ROWS,
+        workers: int = EXCEL_SHARD_WORKERS
+    ) -> Optional[Path]:
+        """
+        Сохраняет большой отчёт шардами по shard_rows карт.
+        
+        Шарды пишутся через xlsxwriter построчно, а в ячейках формул
+        (итоговая мощь, баланс) сохраняется и посчитанное значение, поэтому
+        Excel и LibreOffice открывают отчёт без полного пересчёта. Первый
+        лист (или отдельная книга) — индекс со ссылками на шарды.
+        
+        Args:
+            rows: Пары (карта, оценка) по порядку.
+            count: Количество карт (для имени файла).
+            filepath: Путь к отчёту; при явном пути (контрольная точка)
+                шарды — листы одной книги.
+            mode: "files" — книга-индекс и файлы-шарды рядом с ней, которые
+                параллельно пишут workers процессов; "sheets" — листы одной
+                книги. None — EXCEL_SHARD_MODE (или "sheets" при явном пути).
+            
+        Returns:
+            Path к отчёту (книге с индексом) или None при ошибке.
+        """
+        if _xlsxwriter() is None:
+            print("⚠️ xlsxwriter не установлен — отчёт пишется одной книгой без значений формул")
+            return self._save_unsharded(rows, count, filepath)
+        
+        mode = mode or ("sheets" if filepath else EXCEL_SHARD_MODE)
+        filepath = filepath or self._make_filename(count)
+        try:
+            if mode == "sheets":
+                shards = self._write_sheet_shards(_batches(rows, shard_rows), filepath)
+            else:
+                shards = self._write_file_shards(_batches(rows, shard_rows), filepath, workers)
+            print(f"💾 Сохранено: \"{filepath}\" ({shards} шардов)")
+            return filepath
+        except Exception as e:
+            print(f"❌ Ошибка экспорта: {e}")
+            return None
+    
+    def _save_unsharded(self, rows: Iterable[Row], count: int, filepath: Optional[Path]) -> Optional[Path]:
+        """Одна книга (openpyxl write-only), если xlsxwriter недоступен."""
+        cards, scores = [], []
+        for card, score in rows:
+            cards.append(card)
+            scores.append(score)
+        df = pd.DataFrame([card.to_excel_dict(i, score) for i, (card, score) in enumerate(zip(cards, scores))],
+                          columns=list(EXCEL_COLUMNS.values()))
+        return self._save(df, filepath or self._make_filename(count))
+    
+    def _write_sheet_shards(self, batches: Iterable[List[Row]], filepath: Path) -> int:
+        """Шарды — листы "Карты N" одной книги; индекс — первый лист."""
+        workbook = _new_workbook(filepath)
+        index = workbook.add_worksheet("Индекс")
+        summaries = []
+        for number, batch in enumerate(batches, 1):
+            sheet = f"Карты {number}"
+            _write_cards(workbook.add_worksheet(sheet), batch)
+            summaries.append((f"internal:'{sheet}'!A1", sheet, _shard_summary(number, batch)))
+        self._write_index(index, summaries, "Лист")
+        workbook.close()
+        return len(summaries)
+    
+    def _write_file_shards(self, batches: Iterable[List[Row]], filepath: Path, workers: int) -> int:
+        """Файлы-шарды пишут процессы; в работе не больше workers шардов (ограничивает память)."""
+        summaries = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for number, batch in enumerate(batches, 1):
+                path = filepath.with_name(EXCEL_SHARD_FILENAME_TEMPLATE.format(
+                    stem=filepath.stem, number=number, suffix=filepath.suffix
+                ))
+                summaries.append((f"external:{path.name}", path.name, _shard_summary(number, batch)))
+                pending.append(pool.submit(_write_shard_file, path, batch))
+                if len(pending) >= workers:
+                    pending.popleft().result()
+            for future in pending:
+                future.result()
+        
+        workbook = _new_workbook(filepath)
+        self._write_index(workbook.add_worksheet("Индекс"), summaries, "Файл")
+        workbook.close()
+        return len(summaries)
+    
+    @staticmethod
+    def _write_index(worksheet: Any, summaries: List[Tuple[str, str, Dict[str, Any]]], title: str) -> None:
+        """Лист-индекс: ссылка на шард и его сводка."""
+        if not summaries:
+            return
+        columns = [title, *summaries[0][2]]
+        worksheet.write_row(0, 0, columns)
+        for row, (link, name, summary) in enumerate(summaries, 1):
+            worksheet.write_url(row, 0, link, string=name)
+            worksheet.write_row(row, 1, list(summary.values()))
+    
+    def export_decks(self, decks: List[Dict[str, Any]], filepath: Optional[Path] = None) -> Optional[Path]:
+        """
+        Сохраняет показатели колод (см. DeckAnalyzer.analyze) в Excel.
+        
+        Кривая маны раскладывается по столбцам "MV 0", "MV 1", ...
+        
+        Returns:
+            Path к сохранённому файлу или None при ошибке.
+        """
+        if not decks:
+            print("⚠️ Нет колод для экспорта.")
+            return None
+        
+        rows = []
+        for deck in decks:
+            row = {title: deck[key] for key, title in DECK_COLUMNS.items() if key != "unresolved"}
+            row.update({f"MV {value}": copies for value, copies in deck["curve"].items()})
+            row[DECK_COLUMNS["unresolved"]] = "; ".join(deck["unresolved"])
+            rows.append(row)
+        
+        df = pd.DataFrame(rows)
+        return self._save(df, filepath or self._make_filename(len(decks), DECKS_FILENAME_TEMPLATE))
+    
+    def export_comparison(
+        self,
+        rows: List[Dict[str, Any]],
+        summary: List[Dict[str, Any]],
+        movers: List[Dict[str, Any]],
+        filepath: Optional[Path] = None
+    ) -> Optional[Path]:
+        """
+        Сохраняет сравнение наборов правил (см. RuleSetComparison).
+        
+        Листы: "Карты" — оценки каждым набором, "Сводка" — итоги по
+        наборам, "Изменения" — карты с наибольшим изменением баланса.
+        
+        Returns:
+            Path к сохранённому файлу или None при ошибке.
+        """
+        if not rows:
+            print("⚠️ Нет данных для экспорта.")
+            return None
+        
+        sheets = {
+            "Карты": pd.DataFrame(rows),
+            "Сводка": pd.DataFrame(summary),
+            "Изменения": pd.DataFrame(movers),
+        }
+        return self._save_sheets(sheets, filepath or self._make_filename(len(rows), COMPARISON_FILENAME_TEMPLATE))
+    
+    def export_aggregates(
+        self,
+        tables: Dict[str, pd.DataFrame],
+        count: int,
+        filepath: Optional[Path] = None
+    ) -> Optional[Path]:
+        """
+        Сохраняет сводки корпуса (см. CorpusAggregates.tables), по листу на таблицу.
+        
+        Returns:
+            Path к сохранённому файлу или None при ошибке.
+        """
+        if not count:
+            print("⚠️ Нет данных для экспорта.")
+            return None
+        return self._save_sheets(tables, filepath or self._make_filename(count, AGGREGATES_FILENAME_TEMPLATE))
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""Журнал задания: контрольные точки длинных запусков."""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config import DIR_JOBS
+from models.card import Card
+
+
+class JobJournal:
+    """
+    Append-only журнал одного запуска анализа (JSONL).
+
+    Фиксирует загруженные страницы, распарсенные карты и контрольные
+    экспорты, чтобы прерванный запуск можно было продолжить без
+    повторной загрузки и парсинга.
+
+    Attributes:
+        path: Путь к файлу журнала.
+        job_id: Идентификатор задания (имя файла).
+        mode: Режим запуска ("online", "offline", "targets").
+        params: Параметры запуска для повторения.
+        fetched: URL успешно загруженных страниц.
+        cards: Распарсенные карты по URL (после detach_cards — только URL,
+            значения None).
+        checkpoint_path: Последний контрольный экспорт.
+        finished: Задание завершено финальным экспортом.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.job_id = path.stem
+        self.mode = ""
+        self.params: Dict[str, Any] = {}
+        self.fetched: List[str] = []
+        self.cards: Dict[str, Optional[Card]] = {}
+        self._keep_cards = True
+        self.checkpoint_path: Optional[Path] = None
+        self.finished = False
+        self._lock = threading.Lock()
+        self._load()
+        self._file = self.path.open('a', encoding='utf-8')
+
+    def _load(self) -> None:
+        """Восстанавливает состояние задания из журнала."""
+        if not self.path.exists():
+            return
+
+        with self.path.open(encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # недописанная строка после аварийного завершения
+                event = record.get("event")
+                if event == "start":
+                    self.mode = record["mode"]
+                    self.params = record.get("params", {})
+                elif event == "fetched":
+                    self.fetched.append(record["url"])
+                elif event == "parsed":
+                    card = Card.from_dict(record["card"])
+                    if card.url:
+                        self.cards[card.url] = card
+                elif event == "checkpoint":
+                    self.checkpoint_path = Path(record["path"])
+                elif event == "done":
+                    self.finished = True
+
+    def _write(self, event: str, sync: bool = False, **fields: Any) -> None:
+        """Дописывает событие в журнал."""
+        line = json.dumps({"event": event, **fields}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    @classmethod
+    def create(cls, mode: str, jobs_dir: Path = DIR_JOBS, **params: Any) -> "JobJournal":
+        """Создаёт журнал нового задания."""
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+        # Микросекунды и PID: запуски, начатые в одну секунду, не делят журнал
+        job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}-{mode}"
+        journal = cls(jobs_dir / f"{job_id}.jsonl")
+        journal.mode = mode
+        journal.params = params
+        journal._write("start", sync=True, mode=mode, params=params)
+        return journal
+
+    @classmethod
+    def find(cls, job_id: Optional[str] = None, jobs_dir: Path = DIR_JOBS) -> Optional["JobJournal"]:
+        """
+        Находит задание для продолжения.
+
+        Args:
+            job_id: ID задания; None — последнее незавершённое.
+
+        Returns:
+            JobJournal или None, если продолжать нечего.
+        """
+        if job_id:
+            path = jobs_dir / f"{job_id}.jsonl"
+            return cls(path) if path.exists() else None
+
+        for path in sorted(jobs_dir.glob("*.jsonl"), reverse=True):
+            journal = cls(path)
+            if not journal.finished:
+                return journal
+            journal.close()
+        return None
+
+    def record_fetched(self, url: str) -> None:
+        """Отмечает загруженную (и закэшированную) страницу."""
+        self.fetched.append(url)
+        self._write("fetched", url=url)
+
+    def record_card(self, card: Card) -> None:
+        """Отмечает распарсенную карту (карты без URL при продолжении разбираются заново)."""
+        if card.url:
+            self.cards[card.url] = card if self._keep_cards else None
+        self._write("parsed", card=card.to_dict())
+
+    def detach_cards(self) -> List[Card]:
+        """
+        Отдаёт восстановленные карты; дальше журнал помнит только их URL
+        (под бюджетом памяти карты держит CardSpill).
+        """
+        cards = [card for card in self.cards.values() if card is not None]
+        self.cards = dict.fromkeys(self.cards)
+        self._keep_cards = False
+        return cards
+
+    def record_checkpoint(self, path: Path) -> None:
+        """Отмечает контрольный экспорт и сбрасывает журнал на диск."""
+        self.checkpoint_path = path
+        self._write("checkpoint", sync=True, path=str(path), cards=len(self.cards))
+
+    def finish(self, path: Optional[Path]) -> None:
+        """Отмечает завершение задания финальным экспортом."""
+        self.finished = True
+        self._write("done", sync=True, path=str(path) if path else None, cards=len(self.cards))
+
+    def close(self) -> None:
+        """Закрывает файл журнала."""
+        self._file.close()
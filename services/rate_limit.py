@@ -0,0 +1,85 @@
+"""Ограничение частоты запросов к Scryfall."""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Protocol
+
+
+class RateLimiter(Protocol):
+    """Любой ограничитель частоты: acquire() блокируется до разрешения запроса."""
+
+    def acquire(self) -> None:
+        ...
+
+
+class SharedRateLimiter:
+    """
+    Глобальный лимит запросов в секунду, общий для процессов и машин.
+
+    Token bucket хранится в SQLite-файле на общем диске; каждый процесс
+    перед запросом забирает токен в транзакции BEGIN IMMEDIATE. Часы
+    узлов должны быть синхронизированы (NTP): пополнение считается по
+    time.time().
+
+    Attributes:
+        path: Путь к SQLite-файлу.
+        rps: Суммарный лимит запросов в секунду.
+        burst: Максимальный запас токенов.
+        name: Имя бакета (разные лимиты в одном файле).
+    """
+
+    def __init__(self, path: Path, rps: float, burst: Optional[float] = None, name: str = "scryfall"):
+        self.path = path
+        self.rps = rps
+        self.burst = burst if burst is not None else max(1.0, rps)
+        self.name = name
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_bucket (name TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не разделяет соединения между потоками)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _try_take(self) -> float:
+        """Пытается забрать токен; возвращает 0 или время ожидания в секундах."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rps)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rps
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_bucket (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, tokens, now)
+            )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self) -> None:
+        """Блокируется, пока глобальный лимит не разрешит следующий запрос."""
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
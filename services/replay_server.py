@@ -0,0 +1,330 @@
+"""Локальный сервер-заменитель Scryfall для нагрузочного тестирования загрузчика."""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from config import (
+    REPLAY_HOST,
+    REPLAY_PORT,
+    REPLAY_LATENCY,
+    REPLAY_PAGE_SIZE,
+)
+from services.cache_reader import CacheReader
+from services.downloader import CardDownloader
+
+# Синтетические карты: (название, мана-кост, текст, сила/выносливость)
+_SYNTHETIC_CARDS = [
+    ("Молния", "{R}", "Молния наносит 3 повреждения любой цели.", ""),
+    ("Медведи-гризли", "{1}{G}", "", "2/2"),
+    ("Ангел Серры", "{3}{W}{W}", "Полет, бдительность", "4/4"),
+    ("Шиванский дракон", "{4}{R}{R}", "Полет\n{R}: Шиванский дракон получает +1/+0 до конца хода.", "5/5"),
+    ("Эльфы Лла́новара", "{G}", "{T}: добавьте {G}.", "1/1"),
+    ("Контрзаклинание", "{U}{U}", "Отмените целевое заклинание.", ""),
+    ("Темный ритуал", "{B}", "Добавьте {B}{B}{B}.", ""),
+    ("Гигантский рост", "{G}", "Целевое существо получает +3/+3 до конца хода.", ""),
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Разбирает распределение задержки ответа (значения в миллисекундах).
+
+    Поддерживаемые формы: "0", "fixed:50", "uniform:20:80",
+    "exp:50" (экспоненциальное со средним 50), "lognormal:80:0.5"
+    (медиана 80, сигма 0.5 — тяжёлый хвост, как у реального сервера).
+
+    Returns:
+        Функция без аргументов, возвращающая задержку в секундах.
+
+    Raises:
+        ValueError: Неизвестное распределение или неверные параметры.
+    """
+    kind, _, rest = spec.partition(":")
+    params = [float(p) for p in rest.split(":")] if rest else []
+    if not params and kind.replace(".", "", 1).isdigit():
+        kind, params = "fixed", [float(kind)]
+
+    if kind == "fixed" and len(params) == 1:
+        return lambda: params[0] / 1000
+    if kind == "uniform" and len(params) == 2:
+        return lambda: random.uniform(*params) / 1000
+    if kind == "exp" and len(params) == 1:
+        return lambda: random.expovariate(1 / params[0]) / 1000 if params[0] else 0.0
+    if kind == "lognormal" and len(params) == 2:
+        median, sigma = params
+        return lambda: median * random.lognormvariate(0, sigma) / 1000
+    raise ValueError(f"неизвестное распределение задержки: {spec}")
+
+
+class ReplayCorpus:
+    """
+    Набор страниц, которые отдаёт replay-сервер.
+
+    Страницы адресуются путём URL карты (/card/<set>/<номер>/<slug>);
+    короткий путь /card/<set>/<номер>[/ru] редиректит на полный.
+
+    Attributes:
+        paths: Полные пути страниц (для /random).
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self._pages: Dict[str, Callable[[], bytes]] = {}
+        self._etags: Dict[str, str] = {}
+        self._short: Dict[str, str] = {}
+
+    def add(self, path: str, load: Callable[[], bytes], etag: Optional[str] = None) -> None:
+        """Добавляет страницу: путь карты, функция чтения байтов, ETag."""
+        if path in self._pages:
+            return
+        self.paths.append(path)
+        self._pages[path] = load
+        if etag:
+            self._etags[path] = etag
+        parts = path.strip("/").split("/")
+        if len(parts) >= 3:
+            self._short.setdefault("/".join(parts[:3]), path)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Полный путь страницы по полному или короткому пути или None."""
+        if path in self._pages:
+            return path
+        return self._short.get("/".join(path.strip("/").split("/")[:3]))
+
+    def page(self, path: str) -> bytes:
+        return self._pages[path]()
+
+    def etag(self, path: str) -> Optional[str]:
+        return self._etags.get(path)
+
+    @classmethod
+    def from_cache(cls, downloader: CardDownloader) -> "ReplayCorpus":
+        """
+        Корпус из HTML-кэша: страницы читаются с диска при каждом запросе
+        (после первого обращения — из page cache ОС).
+        """
+        corpus = cls()
+        for path, url in downloader.list_cache():
+            if not url:
+                continue  # страница старого кэша: адрес на Scryfall неизвестен
+            entry = downloader.index.get(path.stem.replace("card_", "", 1)) or {}
+            corpus.add(
+                urlsplit(url).path.rstrip("/"),
+                lambda path=path: CacheReader.read_bytes(path),
+                f'"{entry["hash"]}"' if entry.get("hash") else None
+            )
+        return corpus
+
+    @classmethod
+    def synthetic(cls, count: int, page_size: int = REPLAY_PAGE_SIZE, seed: int = 0) -> "ReplayCorpus":
+        """Синтетический корпус из count страниц в разметке Scryfall (в памяти)."""
+        rng = random.Random(seed)
+        corpus = cls()
+        for number in range(1, count + 1):
+            name, mana, text, stats = rng.choice(_SYNTHETIC_CARDS)
+            symbols = "".join(f"<abbr>{s}}}</abbr>" for s in mana.split("}") if s)
+            paragraphs = "".join(f"<p>{line}</p>" for line in text.split("\n") if line)
+            html = (
+                '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"></head><body>'
+                f'<span class="card-text-card-name">{name} #{number}</span>'
+                f'<span class="card-text-mana-cost">{symbols}</span>'
+                f'<div class="card-text-oracle">{paragraphs}</div>'
+                f'<div class="card-text-stats">{stats}</div>'
+            ).encode()
+            # Добиваем до размера реальной страницы, чтобы ограничение полосы было честным
+            html += b"<!--" + b" " * max(0, page_size - len(html) - 21) + b"--></body></html>"
+            path = f"/card/syn/{number}/synthetic-card-{number}"
+            corpus.add(path, lambda html=html: html, f'"syn-{number}"')
+        return corpus
+
+
+class _Bandwidth:
+    """Общее ограничение полосы сервера (token bucket по байтам)."""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def consume(self, size: int) -> None:
+        """Блокируется, пока полоса не позволит отправить size байт."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + size / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+class _ReplayHTTPServer(ThreadingHTTPServer):
+    """HTTP-сервер с длинной очередью соединений (listen вызывается в __init__)."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class ReplayServer:
+    """
+    HTTP-сервер, отдающий страницы корпуса как Scryfall.
+
+    /random редиректит (302) на случайную страницу карты, страницы
+    поддерживают ETag / If-None-Match (304), /stats возвращает счётчики
+    в JSON. Нагрузку можно сделать реалистичной: задержка ответа по
+    распределению, доля ответов 429, лимит одновременных запросов
+    (сверх него — 429) и общая полоса в байтах в секунду.
+
+    Attributes:
+        corpus: Страницы для выдачи.
+        latency: Генератор задержки ответа в секундах.
+        throttle_rate: Вероятность ответа 429 на любой запрос.
+        max_concurrent: Одновременных запросов до ответа 429 (0 = без лимита).
+        retry_after: Значение Retry-After в ответах 429 (None = без заголовка).
+        bandwidth: Ограничение полосы или None.
+    """
+
+    def __init__(
+        self,
+        corpus: ReplayCorpus,
+        latency: str = REPLAY_LATENCY,
+        throttle_rate: float = 0.0,
+        max_concurrent: int = 0,
+        retry_after: Optional[int] = None,
+        bandwidth: Optional[float] = None
+    ):
+        if not len(corpus):
+            raise ValueError("корпус пуст — нечего отдавать")
+        self.corpus = corpus
+        self.latency = parse_latency(latency)
+        self.throttle_rate = throttle_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.bandwidth = _Bandwidth(bandwidth) if bandwidth else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {"requests": 0, "redirects": 0, "pages": 0, "not_modified": 0,
+                        "throttled": 0, "not_found": 0, "bytes": 0, "peak_in_flight": 0}
+        self._started = time.monotonic()
+        self._httpd: Optional[_ReplayHTTPServer] = None
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += value
+
+    def _enter(self) -> bool:
+        """Учитывает новый запрос; False — превышен лимит одновременных."""
+        with self._lock:
+            self._counts["requests"] += 1
+            if self.max_concurrent and self._in_flight >= self.max_concurrent:
+                return False
+            self._in_flight += 1
+            self._counts["peak_in_flight"] = max(self._counts["peak_in_flight"], self._in_flight)
+            return True
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики сервера и средняя частота запросов."""
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {**self._counts, "in_flight": self._in_flight,
+                    "rps": round(self._counts["requests"] / elapsed, 1) if elapsed else 0.0}
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего сервера
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # тысячи строк в секунду только мешают замерам
+
+            def _reply(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    if server.bandwidth:
+                        server.bandwidth.consume(len(body))
+                    self.wfile.write(body)
+                    server._count("bytes", len(body))
+
+            def do_GET(self) -> None:
+                path = urlsplit(self.path).path.rstrip("/")
+                if path == "/stats":
+                    self._reply(200, json.dumps(server.stats()).encode(),
+                                {"Content-Type": "application/json"})
+                    return
+
+                if not server._enter():
+                    self._throttled()
+                    return
+                try:
+                    time.sleep(server.latency())
+                    if server.throttle_rate and random.random() < server.throttle_rate:
+                        self._throttled()
+                    else:
+                        self._serve(path)
+                finally:
+                    server._leave()
+
+            def _throttled(self) -> None:
+                server._count("throttled")
+                headers = {"Retry-After": str(server.retry_after)} if server.retry_after is not None else {}
+                self._reply(429, b"", headers)
+
+            def _serve(self, path: str) -> None:
+                if path == "/random":
+                    server._count("redirects")
+                    self._reply(302, headers={"Location": random.choice(server.corpus.paths)})
+                    return
+
+                full = server.corpus.resolve(path)
+                if full is None:
+                    server._count("not_found")
+                    self._reply(404)
+                elif full != path:
+                    server._count("redirects")
+                    self._reply(302, headers={"Location": full})
+                else:
+                    etag = server.corpus.etag(full)
+                    if etag and self.headers.get("If-None-Match") == etag:
+                        server._count("not_modified")
+                        self._reply(304, headers={"ETag": etag})
+                        return
+                    headers = {"Content-Type": "text/html; charset=utf-8"}
+                    if etag:
+                        headers["ETag"] = etag
+                    server._count("pages")
+                    self._reply(200, server.corpus.page(full), headers)
+
+        return Handler
+
+    def start(self, host: str = REPLAY_HOST, port: int = REPLAY_PORT) -> str:
+        """
+        Запускает сервер в фоновом потоке.
+
+        Returns:
+            str: Базовый URL сервера (для MTG_SCRYFALL_URL).
+        """
+        self._httpd = _ReplayHTTPServer((host, port), self._handler())
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
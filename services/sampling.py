@@ -0,0 +1,151 @@
+"""Случайные выборки карт из локального кэша без обращения к сети."""
+
+import random
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from tqdm import tqdm
+from config import DECK_CURVE_MAX
+from models.rules import MANA_COLORS, RuleSet
+from parsers.html_extractor import HTMLCardParser
+from services.card_store import CardStore
+from services.downloader import CardDownloader
+from utils.helpers import set_code
+
+# Признаки стратификации
+SAMPLE_BY_SET = "set"
+SAMPLE_BY_COLOR = "color"
+SAMPLE_BY_COST = "cost"
+SAMPLE_STRATA = (SAMPLE_BY_SET, SAMPLE_BY_COLOR, SAMPLE_BY_COST)
+
+
+def color_group(mana_cost: str) -> str:
+    """Цвет по мана-косту: одна буква WUBRG, "M" (многоцветная) или "C" (бесцветная)."""
+    colors = {ch for ch in mana_cost.upper() if ch in MANA_COLORS}
+    if not colors:
+        return "C"
+    return colors.pop() if len(colors) == 1 else "M"
+
+
+def cost_group(mana_cost: str) -> str:
+    """Мана-стоимость с объединением больших значений ("7+")."""
+    value = RuleSet.mana_value(mana_cost)
+    return f"{DECK_CURVE_MAX}+" if value >= DECK_CURVE_MAX else str(value)
+
+
+def allocate(sizes: Dict[str, int], count: int) -> Dict[str, int]:
+    """
+    Пропорционально делит count между стратами (метод наибольших остатков).
+
+    Returns:
+        Dict: страта -> размер выборки (не больше размера страты).
+    """
+    total = sum(sizes.values())
+    if not total:
+        return {key: 0 for key in sizes}
+    count = min(count, total)
+    quotas = {key: count * size / total for key, size in sizes.items()}
+    shares = {key: int(quota) for key, quota in quotas.items()}
+    by_remainder = sorted(sizes, key=lambda key: quotas[key] - shares[key], reverse=True)
+    for key in by_remainder[:count - sum(shares.values())]:
+        shares[key] += 1
+    return shares
+
+
+class CardSampler:
+    """
+    Равномерные и стратифицированные выборки из HTML-кэша.
+
+    Совокупность строится по манифесту кэша. Цвет и стоимость берутся
+    из поля mana_cost манифеста (оно действительно, пока mana_cost_hash
+    совпадает с хэшем страницы), затем из хранилища карт; страницы без
+    них разбираются один раз, и их mana_cost дописывается в манифест, так
+    что следующие выборки страниц не читают.
+
+    Attributes:
+        downloader: Загрузчик с кэшем (манифест и пути файлов).
+        store: Хранилище карт (необязательный источник mana_cost).
+    """
+
+    def __init__(self, downloader: CardDownloader, store: Optional[CardStore] = None):
+        self.downloader = downloader
+        self.store = store
+
+    def _strata(self, by: str) -> Dict[str, List[str]]:
+        """Slug страниц кэша, сгруппированные по признаку by."""
+        entries = self.downloader.index.entries()
+        if by == SAMPLE_BY_SET:
+            key: Callable[[str, Dict], Optional[str]] = lambda slug, entry: set_code(entry.get("url", ""))
+        else:
+            group = color_group if by == SAMPLE_BY_COLOR else cost_group
+            mana_costs = self._mana_costs(entries)
+            key = lambda slug, entry: group(mana_costs[slug]) if slug in mana_costs else None
+
+        strata: Dict[str, List[str]] = defaultdict(list)
+        missing = 0
+        for slug in sorted(entries):
+            stratum = key(slug, entries[slug])
+            if stratum is None:
+                missing += 1
+            else:
+                strata[stratum].append(slug)
+        if missing:
+            print(f"⚠️ {missing} страниц кэша не прочитаны — они не участвуют в выборке")
+        return strata
+
+    def _mana_costs(self, entries: Dict[str, Dict]) -> Dict[str, str]:
+        """slug -> mana_cost для страниц кэша; недостающие разбираются и запоминаются в манифесте."""
+        stored = self.store.column("mana_cost") if self.store is not None else {}
+        mana_costs: Dict[str, str] = {}
+        unknown = []
+        for slug, entry in entries.items():
+            if "mana_cost" in entry and entry.get("mana_cost_hash") == entry.get("hash"):
+                mana_costs[slug] = entry["mana_cost"]
+            elif entry.get("url") in stored:
+                mana_costs[slug] = stored[entry["url"]]
+            else:
+                unknown.append(slug)
+        if not unknown:
+            return mana_costs
+
+        # Вместо URL (у страниц старого кэша он пуст) читателю передаётся slug
+        files = [(path, slug) for (path, _), slug in zip(self.downloader.cache_files(unknown), unknown)]
+        parser = HTMLCardParser()
+        parsed: Dict[str, Dict[str, str]] = {}
+        with tqdm(total=len(files), desc="🔍 Мана-стоимость", unit="стр", colour="cyan", ncols=80) as progress:
+            for chunk in self.downloader.iter_cache(files):
+                for html, slug in chunk:
+                    mana_costs[slug] = parser.parse(html, "").mana_cost
+                    parsed[slug] = {"mana_cost": mana_costs[slug], "mana_cost_hash": entries[slug].get("hash")}
+                progress.update(len(chunk))
+        self.downloader.index.update_many(parsed)
+        return mana_costs
+
+    def sample(self, count: int, by: Optional[str] = None, seed: Optional[int] = None) -> List[Tuple[Path, str]]:
+        """
+        Случайная выборка страниц кэша.
+
+        Args:
+            count: Размер выборки (не больше размера кэша).
+            by: Признак стратификации (SAMPLE_STRATA) или None — равномерно.
+            seed: Зерно генератора: одинаковое зерно и кэш дают одну выборку.
+
+        Returns:
+            List[Tuple]: Пары (путь к файлу, URL карты), как list_cache.
+        """
+        rng = random.Random(seed)
+        if by is None:
+            slugs = sorted(self.downloader.index.entries())
+            chosen = rng.sample(slugs, min(count, len(slugs)))
+        else:
+            if by not in SAMPLE_STRATA:
+                raise ValueError(f"неизвестный признак стратификации: {by}")
+            strata = self._strata(by)
+            shares = allocate({key: len(slugs) for key, slugs in strata.items()}, count)
+            chosen = [
+                slug
+                for key in sorted(strata)
+                for slug in rng.sample(strata[key], shares[key])
+            ]
+            rng.shuffle(chosen)
+        return self.downloader.cache_files(chosen)
@@ -0,0 +1,257 @@
+"""Резидентный сервис оценки карт (HTTP, JSON)."""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from config import (
+    SCORING_HOST,
+    SCORING_PORT,
+    SCORING_BATCH_MAX,
+    SCORING_BATCH_WAIT_MS,
+    SCORING_LATENCY_WINDOW,
+)
+from models.rules import RuleSet, get_default_rules
+from parsers.html_extractor import HTMLCardParser
+
+_CARD_FIELDS = ("mana_cost", "text", "power_toughness")
+
+
+class LatencyTracker:
+    """Задержки последних запросов по эндпоинтам и их перцентили."""
+
+    def __init__(self, window: int = SCORING_LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Количество запросов и p50/p95/p99/max в миллисекундах по эндпоинтам."""
+        with self._lock:
+            samples = {endpoint: sorted(values) for endpoint, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        def percentile(values: List[float], q: float) -> float:
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+        return {
+            endpoint: {
+                "requests": counts[endpoint],
+                "p50_ms": percentile(values, 0.50),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+            for endpoint, values in samples.items()
+        }
+
+
+class MicroBatcher:
+    """
+    Собирает одиночные запросы конкурентных клиентов в пакеты.
+
+    Фоновый поток берёт первый запрос из очереди, добирает остальные в
+    течение max_wait (не больше max_batch) и оценивает пакет одним
+    вызовом; каждый клиент ждёт свой результат во Future.
+
+    Attributes:
+        handler: Функция пакетной обработки (список -> список результатов).
+        max_batch: Максимальный размер пакета.
+        max_wait: Сколько ждать добора пакета, секунд.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        max_batch: int = SCORING_BATCH_MAX,
+        max_wait: float = SCORING_BATCH_WAIT_MS / 1000
+    ):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "Queue[tuple]" = Queue()
+        self._batches = 0
+        self._items = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, item: Any) -> Any:
+        """Ставит элемент в пакет и ждёт его результата."""
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except Empty:
+                    break
+
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self._batches += 1
+            self._items += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch": round(self._items / self._batches, 2) if self._batches else 0,
+        }
+
+
+class ScoringServer:
+    """
+    HTTP-сервис оценки карт с тёплыми правилами и парсером.
+
+    Эндпоинты (JSON):
+    - POST /score — {"mana_cost", "text", "power_toughness"} -> оценка;
+      конкурентные запросы объединяются в пакеты (MicroBatcher)
+    - POST /parse — HTML страницы (text/html, ?url=...) или
+      {"html", "url"} -> поля карты и оценка
+    - POST /batch — {"cards": [...]} -> {"results": [...]}
+    - GET /stats — перцентили задержки по эндпоинтам, размеры пакетов и
+      карты, разбор которых прерван по пределу времени
+
+    Attributes:
+        rules: Скомпилированные правила оценки.
+        parser: Парсер HTML-страниц.
+        latency: Статистика задержек.
+        batcher: Пакетирование одиночных запросов /score.
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        self.rules = rules or get_default_rules()
+        self.parser = HTMLCardParser()
+        self.latency = LatencyTracker()
+        self.batcher = MicroBatcher(self.rules.score_many)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def score(self, card: Dict[str, Any]) -> Dict[str, int]:
+        """Оценивает одну карту через общий пакет."""
+        return self.batcher.submit(card)
+
+    def parse(self, html: bytes, url: str = "") -> Dict[str, Any]:
+        """Парсит страницу и оценивает карту."""
+        card = self.parser.parse(html, url).to_dict()
+        return {**card, **self.score(card)}
+
+    def batch(self, cards: List[Dict[str, Any]]) -> List[Dict[str, int]]:
+        """Оценивает пакет клиента одним вызовом."""
+        return self.rules.score_many(cards)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoints": self.latency.summary(),
+            "micro_batching": self.batcher.stats(),
+            "rule_timeouts": {"cards": self.rules.timeouts, "examples": self.rules.slow_cards[:5]},
+        }
+
+    def _handler(self) -> type:
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _reply(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self) -> None:
+                path = urlsplit(self.path).path
+                if path == "/stats":
+                    self._reply(200, service.stats())
+                elif path == "/health":
+                    self._reply(200, {"status": "ok"})
+                else:
+                    self._reply(404, {"error": f"неизвестный эндпоинт: {path}"})
+
+            def do_POST(self) -> None:
+                started = time.perf_counter()
+                parts = urlsplit(self.path)
+                try:
+                    body = self._body()
+                    if parts.path == "/score":
+                        result = service.score(_card_fields(json.loads(body)))
+                    elif parts.path == "/parse":
+                        if self.headers.get("Content-Type", "").startswith("application/json"):
+                            data = json.loads(body)
+                            if not isinstance(data, dict) or not isinstance(data.get("html"), str):
+                                raise TypeError("ожидался объект с полем html (строка)")
+                            result = service.parse(data["html"].encode('utf-8'), str(data.get("url") or ""))
+                        else:
+                            url = parse_qs(parts.query).get("url", [""])[0]
+                            result = service.parse(body, url)
+                    elif parts.path == "/batch":
+                        cards = json.loads(body)["cards"]
+                        result = {"results": service.batch([_card_fields(card) for card in cards])}
+                    else:
+                        self._reply(404, {"error": f"неизвестный эндпоинт: {parts.path}"})
+                        return
+                except (ValueError, KeyError, TypeError) as e:
+                    self._reply(400, {"error": f"некорректный запрос: {e}"})
+                    return
+
+                self._reply(200, result)
+                service.latency.record(parts.path, time.perf_counter() - started)
+
+        return Handler
+
+    def start(self, host: str = SCORING_HOST, port: int = SCORING_PORT) -> str:
+        """
+        Запускает сервис в фоновом потоке.
+
+        Returns:
+            str: Базовый URL сервиса.
+        """
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        """Останавливает сервис."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def _card_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """Поля карты для оценки из JSON запроса (отсутствующие — пустые)."""
+    if not isinstance(data, dict):
+        raise TypeError("ожидался объект карты")
+    return {field: str(data.get(field) or "") for field in _CARD_FIELDS}
@@ -0,0 +1,123 @@
+"""Снапшот распарсенных и оценённых карт в формате Arrow IPC (Feather v2)."""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from models.card import Card
+from models.rules import RuleSet, get_offline_rules
+
+CARD_FIELDS = tuple(Card().to_dict())
+SCORE_FIELDS = ("mana_points", "pt_points", "ability_points", "total_power", "balance")
+
+
+def _pyarrow() -> Any:
+    """pyarrow импортируется только при работе со снапшотами (необязательная зависимость)."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise RuntimeError("для снапшотов нужен pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def rules_fingerprint(rules: RuleSet) -> str:
+    """Короткий хэш набора правил: по нему видно, что оценки снапшота устарели."""
+    bundle = json.dumps(rules.to_bundle(), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(bundle.encode('utf-8')).hexdigest()[:16]
+
+
+def write_snapshot(cards: Iterable[Card], path: Path, rules: Optional[RuleSet] = None) -> int:
+    """
+    Записывает поля карт и все составляющие оценки в Arrow IPC-файл.
+
+    Файл пишется без сжатия, чтобы его можно было отображать в память.
+    В метаданных схемы — время создания и отпечаток правил.
+
+    Returns:
+        int: Количество записанных карт.
+    """
+    pa = _pyarrow()
+    rules = rules or get_offline_rules()
+    cards = list(cards)
+    scores = rules.score_many(card.to_dict() for card in cards)
+
+    columns: Dict[str, Any] = {
+        field: pa.array([getattr(card, field) for card in cards], type=pa.string())
+        for field in CARD_FIELDS
+    }
+    for field in SCORE_FIELDS:
+        values = [score[field] for score in scores]
+        integral = all(float(value).is_integer() for value in values)
+        columns[field] = pa.array(values, type=pa.int64() if integral else pa.float64())
+
+    metadata = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "rules": rules_fingerprint(rules),
+    }
+    table = pa.table(columns).replace_schema_metadata(metadata)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_path.replace(path)
+    return len(cards)
+
+
+class CardSnapshot:
+    """
+    Снапшот карт, отображённый в память.
+
+    Открытие не читает данные: столбцы — представления страниц файла,
+    которые ОС подгружает по требованию и разделяет между процессами.
+    Объекты Card создаются только при обращении к cards().
+
+    Attributes:
+        path: Путь к файлу снапшота.
+        table: Таблица pyarrow (поля карт и оценки).
+        metadata: created_at, rules (отпечаток правил на момент записи).
+    """
+
+    def __init__(self, path: Path):
+        pa = _pyarrow()
+        self.path = path
+        self._source = pa.memory_map(str(path), 'r')
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self.metadata = {
+            key.decode(): value.decode() for key, value in (self.table.schema.metadata or {}).items()
+        }
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def is_current(self, rules: Optional[RuleSet] = None) -> bool:
+        """Посчитаны ли оценки снапшота теми же правилами."""
+        return self.metadata.get("rules") == rules_fingerprint(rules or get_offline_rules())
+
+    def column(self, name: str) -> Any:
+        """
+        Столбец снапшота: оценки — массив numpy без копирования,
+        строковые поля — список Python.
+        """
+        values = self.table.column(name)
+        if name in SCORE_FIELDS:
+            return values.to_numpy()
+        return values.to_pylist()
+
+    def cards(self) -> List[Card]:
+        """Карты снапшота (без парсинга HTML)."""
+        # Снапшоты старых версий могут не содержать новых полей карты
+        fields = [field for field in CARD_FIELDS if field in self.table.column_names]
+        columns = [self.table.column(field).to_pylist() for field in fields]
+        return [Card(**dict(zip(fields, values))) for values in zip(*columns)]
+
+    def scores(self) -> List[Dict[str, Any]]:
+        """Оценки карт в порядке cards()."""
+        columns = {field: self.table.column(field).to_pylist() for field in SCORE_FIELDS}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def close(self) -> None:
+        self.table = None
+        self._source.close()
+
@@ -0,0 +1,101 @@
+"""Карты запуска под бюджетом памяти: буфер в памяти и чанки на диске."""
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import MEMORY_SPILL_THRESHOLD, MEMORY_CHECK_EVERY, SPILL_DIR
+from models.card import Card
+from models.rules import RuleSet, get_default_rules
+from services.snapshot import CARD_FIELDS, SCORE_FIELDS
+from utils.memory import MemoryBudget
+
+
+class CardSpill:
+    """
+    Список карт запуска, который при нехватке памяти сбрасывается на диск.
+
+    Карты копятся в буфере, пока RSS ниже MEMORY_SPILL_THRESHOLD бюджета.
+    Первое превышение задаёт размер пачки — столько карт поместилось в
+    бюджет; дальше буфер сбрасывается каждые batch_size карт, а каждое
+    новое превышение уменьшает пачку вдвое. На диск пишутся строки с
+    полями карты и оценками (JSONL), поэтому при экспорте карты не
+    оцениваются повторно. Порядок карт сохраняется.
+
+    Attributes:
+        budget: Бюджет памяти запуска.
+        batch_size: Карт в сбрасываемой пачке (None — ещё не было превышения).
+        chunks: Файлы сброшенных пачек по порядку.
+        spilled: Сколько карт на диске.
+    """
+
+    def __init__(self, budget: MemoryBudget, rules: Optional[RuleSet] = None, directory: Optional[str] = SPILL_DIR):
+        self.budget = budget
+        self.rules = rules or get_default_rules()
+        self.batch_size: Optional[int] = None
+        self.chunks: List[Path] = []
+        self.spilled = 0
+        self._buffer: List[Card] = []
+        # Удаляется при close(), а при аварийном завершении — при выходе процесса
+        self._dir = tempfile.TemporaryDirectory(prefix="mtg-spill-", dir=directory)
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._buffer)
+
+    def __iter__(self) -> Iterator[Card]:
+        for card, _ in self.rows():
+            yield card
+
+    def append(self, card: Card) -> None:
+        self._buffer.append(card)
+        if self.batch_size and len(self._buffer) >= self.batch_size:
+            self.spill()
+        elif len(self._buffer) % MEMORY_CHECK_EVERY == 0 and self.budget.over(MEMORY_SPILL_THRESHOLD):
+            # Первое превышение задаёт размер пачки, повторное — уменьшает её
+            if self.batch_size is None:
+                self.batch_size = len(self._buffer)
+            else:
+                self.batch_size = max(MEMORY_CHECK_EVERY, self.batch_size // 2)
+            self.spill()
+
+    def _scored(self, cards: List[Card]) -> List[Dict[str, int]]:
+        return self.rules.score_many(card.to_dict() for card in cards)
+
+    def spill(self) -> None:
+        """Оценивает буфер и записывает его на диск новым чанком."""
+        if not self._buffer:
+            return
+        path = Path(self._dir.name) / f"chunk-{len(self.chunks):05d}.jsonl"
+        with path.open('w', encoding='utf-8') as f:
+            for card, score in zip(self._buffer, self._scored(self._buffer)):
+                f.write(json.dumps({**card.to_dict(), **score}, ensure_ascii=False) + "\n")
+        self.chunks.append(path)
+        self.spilled += len(self._buffer)
+        self._buffer = []
+
+    def _read_chunk(self, path: Path) -> Iterator[Tuple[Card, Dict[str, int]]]:
+        with path.open(encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                yield (
+                    Card.from_dict({field: row[field] for field in CARD_FIELDS}),
+                    {field: row[field] for field in SCORE_FIELDS},
+                )
+
+    def rows(self) -> Iterator[Tuple[Card, Dict[str, int]]]:
+        """Карты с оценками по порядку: сначала с диска, затем из буфера."""
+        for path in self.chunks:
+            yield from self._read_chunk(path)
+        yield from zip(self._buffer, self._scored(self._buffer))
+
+    def batches(self) -> Iterator[List[Card]]:
+        """Карты пачками не больше batch_size (по чанку за раз)."""
+        for path in self.chunks:
+            yield [card for card, _ in self._read_chunk(path)]
+        if self._buffer:
+            yield list(self._buffer)
+
+    def close(self) -> None:
+        """Удаляет чанки с диска."""
+        self._buffer = []
+        self._dir.cleanup()
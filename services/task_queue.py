@@ -0,0 +1,171 @@
+"""Очередь задач для распределённой загрузки и парсинга (SQLite)."""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from config import TASK_QUEUE_PATH, TASK_LEASE_SECONDS, TASK_MAX_ATTEMPTS
+
+# Виды задач
+TASK_RANDOM = "random"  # payload: {"count": N} — N случайных карт
+TASK_URL = "url"  # payload: {"url": ...} — конкретная карта (из кэша или сети)
+TASK_PARSE = "parse"  # payload: {"url": ...} — распарсить страницу из общего кэша
+
+
+class TaskQueue:
+    """
+    Очередь задач с арендой (lease) поверх SQLite-файла.
+
+    Координатор добавляет задачи, воркеры арендуют их по одной. Если
+    воркер упал, аренда истекает и задача достаётся другому воркеру;
+    истёкшая аренда считается неудачной попыткой, и после
+    TASK_MAX_ATTEMPTS попыток задача помечается как failed.
+
+    Attributes:
+        path: Путь к SQLite-файлу (общий для всех узлов).
+        lease_seconds: Длительность аренды задачи.
+    """
+
+    def __init__(self, path: Path = TASK_QUEUE_PATH, lease_seconds: float = TASK_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until);
+            CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job);
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока (autocommit, транзакции вручную)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def add(self, job: str, kind: str, payloads: Iterable[Dict[str, Any]]) -> int:
+        """
+        Добавляет задачи одного вида.
+
+        Returns:
+            int: Количество добавленных задач.
+        """
+        rows = [(job, kind, json.dumps(payload, ensure_ascii=False)) for payload in payloads]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT INTO tasks (job, kind, payload) VALUES (?, ?, ?)", rows)
+        conn.execute("COMMIT")
+        return len(rows)
+
+    def lease(self, worker: str, job: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Арендует следующую свободную задачу (или задачу с истёкшей арендой).
+
+        Попытка засчитывается при аренде, поэтому истёкшая аренда — уже
+        неудачная попытка: задачи, исчерпавшие TASK_MAX_ATTEMPTS (например,
+        роняющие воркер), помечаются failed и больше не выдаются.
+
+        Args:
+            worker: Идентификатор воркера.
+            job: Брать задачи только этого задания (None = любого).
+
+        Returns:
+            Dict с полями id, job, kind, payload, attempts или None.
+        """
+        now = time.time()
+        query = (
+            "SELECT id, job, kind, payload, attempts FROM tasks "
+            "WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?))"
+        )
+        params: tuple = (now,)
+        if job is not None:
+            query += " AND job = ?"
+            params += (job,)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', lease_until = NULL, result = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (json.dumps({"error": "аренда истекла"}, ensure_ascii=False), now, TASK_MAX_ATTEMPTS)
+            )
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            task_id, task_job, kind, payload, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, now + self.lease_seconds, task_id)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        return {"id": task_id, "job": task_job, "kind": kind,
+                "payload": json.loads(payload), "attempts": attempts + 1}
+
+    # Задачу закрывает только воркер, чья аренда ещё действует
+    _LEASE_HELD = "id = ? AND status = 'leased' AND worker = ? AND lease_until >= ?"
+
+    def holds(self, task_id: int, worker: str) -> bool:
+        """Действует ли ещё аренда задачи у воркера."""
+        row = self._connect().execute(
+            f"SELECT 1 FROM tasks WHERE {self._LEASE_HELD}", (task_id, worker, time.time())
+        ).fetchone()
+        return row is not None
+
+    def complete(self, task_id: int, worker: str, result: Any = None) -> bool:
+        """
+        Отмечает задачу выполненной.
+
+        Returns:
+            bool: False, если аренда истекла или перешла к другому воркеру
+                (результат не записан).
+        """
+        cursor = self._connect().execute(
+            f"UPDATE tasks SET status = 'done', lease_until = NULL, result = ? WHERE {self._LEASE_HELD}",
+            (json.dumps(result, ensure_ascii=False), task_id, worker, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, task_id: int, worker: str, error: str, attempts: int) -> bool:
+        """
+        Возвращает задачу в очередь или окончательно помечает как failed.
+
+        Returns:
+            bool: False, если аренда истекла или перешла к другому воркеру.
+        """
+        status = "failed" if attempts >= TASK_MAX_ATTEMPTS else "pending"
+        cursor = self._connect().execute(
+            f"UPDATE tasks SET status = ?, lease_until = NULL, result = ? WHERE {self._LEASE_HELD}",
+            (status, json.dumps({"error": error}, ensure_ascii=False), task_id, worker, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def stats(self, job: Optional[str] = None) -> Dict[str, int]:
+        """Количество задач по статусам."""
+        query = "SELECT status, COUNT(*) FROM tasks"
+        params: tuple = ()
+        if job is not None:
+            query += " WHERE job = ?"
+            params = (job,)
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(self._connect().execute(query + " GROUP BY status", params).fetchall()))
+        return counts
@@ -0,0 +1,232 @@
+"""Триграммный индекс корпуса для быстрого поиска карт по паттернам правил."""
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from tqdm import tqdm
+from models.card import Card
+from models.rules import RuleSet, get_default_rules
+
+try:
+    import re._parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+INDEX_FIELDS = ("text", "name", "mana_cost")
+
+# Запрос к индексу: None — подходит любая карта, ("lit", строка) — строка
+# входит в поле, ("and" | "or", [запросы]).
+Query = Optional[Tuple[str, Any]]
+
+
+def trigrams(value: str) -> set:
+    """Все триграммы строки."""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _and(parts: List[Query]) -> Query:
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ("and", parts)
+
+
+def _or(parts: List[Query]) -> Query:
+    if not parts or any(part is None for part in parts):
+        return None  # одна из альтернатив может совпасть с чем угодно
+    return parts[0] if len(parts) == 1 else ("or", parts)
+
+
+def _sequence_query(items: Iterable) -> Query:
+    """Обязательные подстроки последовательности узлов регулярного выражения."""
+    parts: List[Query] = []
+    run = ""
+    for op, arg in items:
+        if op is _sre_parse.LITERAL:
+            run += chr(arg).lower()
+            continue
+        if run:
+            parts.append(("lit", run))
+            run = ""
+        if op is _sre_parse.SUBPATTERN:
+            parts.append(_sequence_query(arg[-1]))
+        elif op is _sre_parse.BRANCH:
+            parts.append(_or([_sequence_query(branch) for branch in arg[1]]))
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT) and arg[0] >= 1:
+            parts.append(_sequence_query(arg[2]))  # повторяется хотя бы раз
+        # Остальные узлы (классы символов, .*, якоря) ничего не требуют и рвут строку
+    if run:
+        parts.append(("lit", run))
+    return _and([part for part in parts if part is None or part[0] != "lit" or len(part[1]) >= 3])
+
+
+def regex_query(pattern: str) -> Query:
+    """
+    Запрос к триграммному индексу для регулярного выражения.
+
+    Из выражения извлекаются подстроки, которые обязана содержать любая
+    совпадающая строка (с учётом альтернатив); по их триграммам индекс
+    отбирает кандидатов. Запрос консервативен: кандидатов может быть
+    больше, чем совпадений, но совпадения не теряются.
+
+    Returns:
+        Query или None, если обязательных подстрок нет (нужен полный перебор).
+    """
+    return _sequence_query(_sre_parse.parse(pattern))
+
+
+class TrigramIndex:
+    """
+    Инвертированный триграммный индекс по тексту, названию и мана-косту.
+
+    Поля индексируются в нижнем регистре — так же, как текст сопоставляется
+    с правилами RuleSet. Поиск отбирает кандидатов пересечением списков
+    триграмм и проверяет их настоящим регулярным выражением; оценки
+    найденных карт считаются текущими правилами.
+
+    Attributes:
+        cards: Карты корпуса (по одной на URL).
+        postings: Поле -> (триграмма -> отсортированный массив номеров карт).
+        source: Описание источника карт и правил на момент построения
+            (сохраняется с индексом; по нему видно, что индекс устарел).
+    """
+
+    def __init__(
+        self,
+        cards: List[Card],
+        postings: Dict[str, Dict[str, np.ndarray]],
+        source: Optional[Dict[str, Any]] = None
+    ):
+        self.cards = cards
+        self.postings = postings
+        self.source = source or {}
+        self._values = {field: [None] * len(cards) for field in INDEX_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    @classmethod
+    def build(cls, cards: Iterable[Card], source: Optional[Dict[str, Any]] = None) -> "TrigramIndex":
+        """Строит индекс (повторы URL пропускаются); source сохраняется вместе с ним."""
+        unique: Dict[str, Card] = {}
+        for card in cards:
+            unique.setdefault(card.url, card)
+        cards = list(unique.values())
+
+        lists: Dict[str, Dict[str, List[int]]] = {field: {} for field in INDEX_FIELDS}
+        for position, card in enumerate(tqdm(cards, desc="🔤 Индекс триграмм", unit="карта", colour="cyan", ncols=80)):
+            for field in INDEX_FIELDS:
+                field_lists = lists[field]
+                for gram in trigrams(getattr(card, field).lower()):
+                    field_lists.setdefault(gram, []).append(position)
+
+        postings = {
+            field: {gram: np.array(ids, dtype=np.int32) for gram, ids in field_lists.items()}
+            for field, field_lists in lists.items()
+        }
+        return cls(cards, postings, source)
+
+    def save(self, path: Path) -> None:
+        """Сохраняет индекс в .npz: списки каждого поля склеены в один массив."""
+        arrays = {
+            "cards": np.array(json.dumps([card.to_dict() for card in self.cards], ensure_ascii=False)),
+            "source": np.array(json.dumps(self.source, ensure_ascii=False)),
+        }
+        for field, field_postings in self.postings.items():
+            grams = list(field_postings)
+            lengths = [len(field_postings[gram]) for gram in grams]
+            arrays[f"{field}_grams"] = np.array(json.dumps(grams, ensure_ascii=False))
+            arrays[f"{field}_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            arrays[f"{field}_ids"] = (
+                np.concatenate([field_postings[gram] for gram in grams]) if grams else np.zeros(0, np.int32)
+            )
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "TrigramIndex":
+        with np.load(path) as f:
+            cards = [Card.from_dict(data) for data in json.loads(str(f["cards"]))]
+            # Индексы старых версий без источника считаются устаревшими
+            source = json.loads(str(f["source"])) if "source" in f.files else {}
+            postings = {}
+            for field in INDEX_FIELDS:
+                grams = json.loads(str(f[f"{field}_grams"]))
+                offsets, ids = f[f"{field}_offsets"], f[f"{field}_ids"]
+                # Срезы — представления общего массива, без копирования
+                postings[field] = {gram: ids[offsets[i]:offsets[i + 1]] for i, gram in enumerate(grams)}
+        return cls(cards, postings, source)
+
+    def _value(self, field: str, position: int) -> str:
+        """Значение поля карты в нижнем регистре (кэшируется)."""
+        values = self._values[field]
+        if values[position] is None:
+            values[position] = getattr(self.cards[position], field).lower()
+        return values[position]
+
+    def candidates(self, query: Query, field: str = "text") -> Optional[np.ndarray]:
+        """Номера карт, удовлетворяющих запросу, или None — все карты."""
+        if query is None:
+            return None
+        kind, arg = query
+        if kind == "lit":
+            lists = [self.postings[field].get(gram) for gram in trigrams(arg)]
+            if any(ids is None for ids in lists):
+                return np.zeros(0, dtype=np.int32)
+            parts = sorted(lists, key=len)
+        else:
+            parts = [self.candidates(part, field) for part in arg]
+            if kind == "or":
+                return np.unique(np.concatenate(parts))
+            parts = sorted((ids for ids in parts if ids is not None), key=len)
+        result = parts[0]
+        for ids in parts[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def search(
+        self,
+        pattern: str,
+        field: str = "text",
+        keyword: bool = False,
+        limit: Optional[int] = None,
+        rules: Optional[RuleSet] = None
+    ) -> Dict[str, Any]:
+        """
+        Карты, у которых поле field совпадает с паттерном (как в RuleSet).
+
+        Args:
+            pattern: Регулярное выражение (без учёта регистра) или слово.
+            field: Поле: text, name или mana_cost.
+            keyword: Искать pattern как подстроку, а не выражение.
+            limit: Максимум карт в результате (None = все).
+            rules: Правила для оценок найденных карт (по умолчанию — config.py).
+
+        Returns:
+            Dict: cards (поля карты и текущие оценки), matches (всего
+            совпадений), candidates (проверено карт), ms (время поиска).
+        """
+        if field not in INDEX_FIELDS:
+            raise ValueError(f"поле не индексируется: {field}")
+        started = time.perf_counter()
+        if keyword:
+            pattern = re.escape(pattern)
+        compiled = re.compile(pattern, re.IGNORECASE)
+
+        ids = self.candidates(regex_query(pattern), field)
+        positions = range(len(self.cards)) if ids is None else ids.tolist()
+        matched = [position for position in positions if compiled.search(self._value(field, position))]
+        elapsed = time.perf_counter() - started
+
+        shown = [self.cards[position] for position in matched[:limit]]
+        scores = (rules or get_default_rules()).score_many(card.to_dict() for card in shown)
+        return {
+            "cards": [{**card.to_dict(), **score} for card, score in zip(shown, scores)],
+            "matches": len(matched),
+            "candidates": len(positions),
+            "ms": round(elapsed * 1000, 2),
+        }
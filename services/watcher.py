@@ -0,0 +1,254 @@
+"""Наблюдение за кэшем: инкрементальная обработка новых страниц."""
+
+import csv
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config import (
+    CACHE_INDEX_FILENAME,
+    WATCH_DEBOUNCE_MS,
+    WATCH_MAX_DELAY,
+    WATCH_BATCH_MAX,
+    WATCH_POLL_INTERVAL,
+)
+from models.rules import RuleSet, get_default_rules
+from parsers.html_extractor import HTMLCardParser
+from services.cache_index import CacheIndex
+from services.downloader import CardDownloader
+
+# Маски событий inotify (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+WATCH_COLUMNS = (
+    "url", "name", "mana_cost", "text", "power_toughness",
+    "mana_points", "pt_points", "ability_points", "total_power", "balance",
+    "hash", "processed_at",
+)
+
+
+class _Inotify:
+    """
+    События inotify для одного файла директории (через libc, без зависимостей).
+
+    Наблюдается директория, а не сам файл: сжатие манифеста заменяет
+    файл новым (os.replace), и наблюдение за старым inode потерялось бы.
+    """
+
+    def __init__(self, path: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.name = os.fsencode(path.name)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(path.parent), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    def wait(self, timeout: float) -> bool:
+        """Ждёт события по файлу не дольше timeout секунд; True — файл менялся."""
+        changed = False
+        if not select.select([self.fd], [], [], max(timeout, 0))[0]:
+            return False
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if data[offset:offset + length].rstrip(b"\0") == self.name:
+                changed = True
+            offset += length
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _Poller:
+    """Запасной вариант без inotify: периодический stat файла."""
+
+    def __init__(self, path: Path, interval: float = WATCH_POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._state = self._stat()
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(max(min(timeout, self.interval), 0))
+        state = self._stat()
+        changed, self._state = state != self._state, state
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class CacheWatcher:
+    """
+    Следит за манифестом кэша и обрабатывает только новые и изменённые страницы.
+
+    Изменения манифеста приходят через inotify (Linux) или опрос файла.
+    Дочитываются только новые строки манифеста; страница обрабатывается,
+    если её хэш отличается от уже обработанного. Всплески записей
+    собираются в пакеты: пакет уходит в обработку после WATCH_DEBOUNCE_MS
+    тишины, но не позже WATCH_MAX_DELAY после первой страницы пакета.
+
+    Результат дописывается в накопительный CSV (одна строка на обработку
+    страницы; для изменившейся страницы актуальна последняя строка).
+    По нему же восстанавливается состояние после перезапуска.
+
+    Attributes:
+        downloader: Загрузчик с кэшем (пути и проверка файлов).
+        output: Накопительный CSV.
+        rules: Правила оценки.
+        poll: Опрашивать манифест вместо inotify.
+    """
+
+    def __init__(
+        self,
+        downloader: CardDownloader,
+        output: Path,
+        rules: Optional[RuleSet] = None,
+        poll: bool = False
+    ):
+        self.downloader = downloader
+        self.output = output
+        self.rules = rules or get_default_rules()
+        self.parser = HTMLCardParser()
+        # Свой экземпляр манифеста: его refresh() возвращает только наши новые строки
+        self.index = CacheIndex(downloader.cache_dir / CACHE_INDEX_FILENAME)
+        self.events = self._events(poll)
+        self._seen = self._load_seen()
+        self.stats = {"batches": 0, "cards": 0, "skipped": 0}
+
+    def _events(self, poll: bool) -> Any:
+        path = self.index.path
+        if not poll:
+            try:
+                return _Inotify(path)
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify недоступен ({e}) — опрос манифеста каждые {WATCH_POLL_INTERVAL} с")
+        return _Poller(path)
+
+    def _load_seen(self) -> Dict[str, str]:
+        """URL -> хэш страниц, уже записанных в накопительный CSV."""
+        if not self.output.exists():
+            return {}
+        with self.output.open(encoding='utf-8-sig', newline='') as f:
+            return {row["url"]: row["hash"] for row in csv.DictReader(f)}
+
+    def _pending(self, slugs: List[str]) -> List[str]:
+        """Slug страниц, которых ещё нет в результате или которые изменились."""
+        pending = []
+        for slug in dict.fromkeys(slugs):
+            entry = self.index.get(slug)
+            if entry and entry.get("url") and self._seen.get(entry["url"]) != entry.get("hash"):
+                pending.append(slug)
+        return pending
+
+    def _process(self, slugs: List[str]) -> int:
+        """Парсит, оценивает и дописывает в CSV пакет страниц."""
+        files = self.downloader.cache_files(slugs)
+        hashes = {url: (self.index.get(slug) or {}).get("hash", "") for slug, (_, url) in zip(slugs, files)}
+        cards = [self.parser.parse(html, url) for html, url in chain.from_iterable(self.downloader.iter_cache(files))]
+        scores = self.rules.score_many(card.to_dict() for card in cards)
+        processed_at = datetime.now().isoformat(timespec="seconds")
+
+        new_file = not self.output.exists()
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        with self.output.open('a', encoding='utf-8-sig' if new_file else 'utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=WATCH_COLUMNS)
+            if new_file:
+                writer.writeheader()
+            for card, score in zip(cards, scores):
+                writer.writerow({
+                    **card.to_dict(), **score,
+                    "hash": hashes[card.url], "processed_at": processed_at,
+                })
+                self._seen[card.url] = hashes[card.url]
+
+        self.stats["batches"] += 1
+        self.stats["cards"] += len(cards)
+        # Страницы, не прошедшие проверку хэша, ещё дописываются — придут следующей строкой манифеста
+        self.stats["skipped"] += len(slugs) - len(cards)
+        return len(cards)
+
+    def run(self, backlog: bool = True, stop_after: Optional[float] = None) -> Dict[str, int]:
+        """
+        Обрабатывает изменения кэша до Ctrl+C (или stop_after секунд).
+
+        Args:
+            backlog: Сначала обработать страницы, которых ещё нет в результате
+                (False — только поступившие после запуска).
+            stop_after: Остановиться через столько секунд (None = работать бесконечно).
+
+        Returns:
+            Dict: batches, cards, skipped.
+        """
+        if backlog:
+            pending = dict.fromkeys(self._pending(self.index.slugs()))
+        else:
+            pending = {}
+            for entry in self.index.entries().values():
+                if entry.get("url"):
+                    self._seen[entry["url"]] = entry.get("hash")
+        first_at = last_at = time.monotonic()
+        deadline = None if stop_after is None else first_at + stop_after
+        mode = "опрос" if isinstance(self.events, _Poller) else "inotify"
+        print(f"👀 Наблюдение за {self.index.path} ({mode}), к обработке: {len(pending)}")
+
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                now = time.monotonic()
+                if pending and (
+                    now - last_at >= WATCH_DEBOUNCE_MS / 1000
+                    or now - first_at >= WATCH_MAX_DELAY
+                    or len(pending) >= WATCH_BATCH_MAX
+                ):
+                    batch = list(pending)[:WATCH_BATCH_MAX]
+                    for slug in batch:
+                        del pending[slug]
+                    started = time.perf_counter()
+                    count = self._process(batch)
+                    print(f"🆕 +{count} карт за {time.perf_counter() - started:.2f} с "
+                          f"(всего {self.stats['cards']}) → {self.output.name}")
+                    first_at = last_at = time.monotonic()
+                    continue
+
+                timeout = WATCH_DEBOUNCE_MS / 1000 if pending else WATCH_POLL_INTERVAL
+                if deadline is not None:
+                    timeout = min(timeout, deadline - now)
+                if self.events.wait(timeout):
+                    new = self._pending(self.index.refresh())
+                    if new:
+                        if not pending:
+                            first_at = time.monotonic()
+                        pending.update(dict.fromkeys(new))
+                        last_at = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pending:
+                self._process(list(pending))
+            self.events.close()
+        return self.stats
@@ -0,0 +1,38 @@
+"""Вспомогательные функции общего назначения."""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессные блокировки не поддерживаются
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """
+    Межпроцессная блокировка через flock на отдельном lock-файле.
+
+    Args:
+        path: Путь к lock-файлу (создаётся при необходимости).
+        shared: Разделяемая блокировка (читатели) вместо эксклюзивной.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with path.open('a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def set_code(url: str) -> str:
+    """Код сета из URL карты (/card/<set>/...) или "?"."""
+    parts = urlsplit(url).path.strip("/").split("/")
+    return parts[1] if len(parts) > 1 and parts[0] == "card" else "?"
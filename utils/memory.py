@@ -0,0 +1,80 @@
+"""Бюджет памяти процесса: замер RSS и размеры пачек под бюджет."""
+
+import os
+import sys
+from config import MEMORY_READ_SHARE
+
+try:
+    import resource
+except ImportError:  # Windows: RSS берётся из psutil, если он установлен
+    resource = None
+
+_SIZE_UNITS = {"": 1, "K": 2 ** 10, "M": 2 ** 20, "G": 2 ** 30, "T": 2 ** 40}
+
+
+def parse_size(value: str) -> int:
+    """Размер "512M", "2G", "1.5GB" или "1048576" в байтах; пустая строка — 0."""
+    text = str(value).strip().upper().removesuffix("B")
+    if not text:
+        return 0
+    unit = text[-1] if text[-1] in _SIZE_UNITS else ""
+    try:
+        return int(float(text[:-1] if unit else text) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"некорректный размер памяти: {value}") from None
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах (0 — замерить нечем)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # Без /proc — пиковый RSS (Linux — КБ, macOS — байты)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
+
+
+class MemoryBudget:
+    """
+    Предел RSS запуска.
+
+    Attributes:
+        limit: Предел в байтах (0 — без ограничения).
+        peak: Наибольший замеренный RSS (0 — RSS замерить нечем, бюджет
+            не соблюдается).
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.peak = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def rss(self) -> int:
+        value = current_rss()
+        self.peak = max(self.peak, value)
+        return value
+
+    def over(self, fraction: float = 1.0) -> bool:
+        """Превышена ли доля fraction бюджета."""
+        return self.enabled and self.rss() > self.limit * fraction
+
+    def batch_size(self, item_bytes: float, copies: int, maximum: int, minimum: int = 16) -> int:
+        """
+        Размер пачки, при котором copies пачек по item_bytes на элемент
+        занимают не больше MEMORY_READ_SHARE свободной части бюджета.
+        """
+        if not self.enabled or item_bytes <= 0:
+            return maximum
+        headroom = max(0, self.limit - self.rss())
+        return max(minimum, min(maximum, int(headroom * MEMORY_READ_SHARE / (item_bytes * copies))))
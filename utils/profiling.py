@@ -0,0 +1,245 @@
+"""Профилирование этапов пайплайна: cProfile, tracemalloc, сэмплирование стеков."""
+
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+from config import (
+    PROFILE_SAMPLE_INTERVAL_MS,
+    PROFILE_TOP_ALLOCATIONS,
+    PROFILE_MEMORY_SNAPSHOT_SECONDS,
+    PROFILE_FILENAME_TEMPLATE,
+)
+
+PROFILE_CPROFILE = "cprofile"
+PROFILE_TRACEMALLOC = "tracemalloc"
+PROFILE_SAMPLING = "sampling"
+PROFILE_MODES = (PROFILE_CPROFILE, PROFILE_TRACEMALLOC, PROFILE_SAMPLING)
+
+T = TypeVar("T")
+
+
+def parse_modes(value: str) -> List[str]:
+    """Режимы из строки "cprofile,sampling" ("all" — все)."""
+    modes = [mode.strip() for mode in value.split(",") if mode.strip()]
+    if "all" in modes:
+        return list(PROFILE_MODES)
+    unknown = set(modes) - set(PROFILE_MODES)
+    if unknown:
+        raise ValueError(f"неизвестные режимы профилирования: {', '.join(sorted(unknown))}")
+    return modes
+
+
+class _StackSampler:
+    """
+    Сэмплер стеков по настенному времени для всех потоков.
+
+    Фоновый поток периодически снимает sys._current_frames() и считает
+    одинаковые стеки в формате collapsed stacks ("этап;файл:функция;... N"),
+    который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, stages: List[str], interval: float):
+        self.stages = stages
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            stage = ";".join(self.stages) or "idle"
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                if ident not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = thread.name if thread else str(ident)
+                self.counts[";".join([stage, names[ident], *reversed(stack)])] += 1
+            self.samples += 1
+
+
+class PipelineProfiler:
+    """
+    Профилирование запуска по этапам (fetch, cache_io, parse, score, export).
+
+    Время этапов (настенное, включая вложенные этапы) считается всегда.
+    Дополнительно по включённым режимам:
+    - cprofile — отдельный cProfile на каждый этап (основной поток;
+      вложенный этап приостанавливает внешний), файлы .pstats;
+    - tracemalloc — пик памяти каждого этапа и рост памяти по строкам
+      кода; снимок памяти дорогой, поэтому рост меряется на вызовах этапа
+      не чаще раза в PROFILE_MEMORY_SNAPSHOT_SECONDS (выборочно);
+    - sampling — стеки всех потоков с интервалом PROFILE_SAMPLE_INTERVAL_MS
+      в формате collapsed stacks для флеймграфов.
+
+    Attributes:
+        modes: Включённые режимы (PROFILE_MODES).
+        timings: Этап -> {"seconds", "calls"}.
+    """
+
+    def __init__(self, modes: Iterable[str] = ()):
+        self.modes = list(modes)
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._stages: List[str] = []
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._memory: Dict[str, Counter] = {}
+        self._memory_peaks: Dict[str, int] = {}
+        self._last_snapshot: Dict[str, float] = {}
+        self._sampler: Optional[_StackSampler] = None
+        self._started = time.perf_counter()
+        self._began_tracing = False
+
+        if PROFILE_TRACEMALLOC in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._began_tracing = True
+        if PROFILE_SAMPLING in self.modes:
+            self._sampler = _StackSampler(self._stages, PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            self._sampler.start()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.modes)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Отмечает участок кода как этап пайплайна."""
+        outer = self._profiles.get(self._stages[-1]) if self._stages else None
+        profile = None
+        if PROFILE_CPROFILE in self.modes:
+            if outer:
+                outer.disable()
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        tracing = PROFILE_TRACEMALLOC in self.modes
+        snapshot = None
+        if tracing:
+            now = time.perf_counter()
+            if now - self._last_snapshot.get(name, float("-inf")) >= PROFILE_MEMORY_SNAPSHOT_SECONDS:
+                self._last_snapshot[name] = now
+                snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+
+        self._stages.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stages.pop()
+            timing = self.timings.setdefault(name, {"seconds": 0.0, "calls": 0})
+            timing["seconds"] += elapsed
+            timing["calls"] += 1
+            if profile:
+                profile.disable()
+                if outer:
+                    outer.enable()
+            if tracing:
+                self._record_memory(name, snapshot)
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Проходит по потоку, относя ожидание каждого элемента к этапу name."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _record_memory(self, name: str, before: Optional[tracemalloc.Snapshot]) -> None:
+        """Пик памяти этапа и, если был снимок до вызова, рост по строкам кода."""
+        _, peak = tracemalloc.get_traced_memory()
+        self._memory_peaks[name] = max(self._memory_peaks.get(name, 0), peak)
+        growth = self._memory.setdefault(name, Counter())
+        if before is None:
+            return
+        for stat in tracemalloc.take_snapshot().compare_to(before, "lineno"):
+            if stat.size_diff:
+                frame = stat.traceback[0]
+                growth[f"{frame.filename}:{frame.lineno}"] += stat.size_diff
+
+    def _path(self, report: Path, suffix: str) -> Path:
+        return report.with_name(PROFILE_FILENAME_TEMPLATE.format(stem=report.stem, suffix=suffix))
+
+    def save(self, report: Path) -> List[Path]:
+        """
+        Останавливает профилирование и пишет артефакты рядом с отчётом.
+
+        Returns:
+            List[Path]: Записанные файлы: "<отчёт> profile.json" (время и
+            пики памяти этапов), .pstats по этапам, "... memory.txt",
+            "... stacks.txt".
+        """
+        self.close()
+        paths = []
+        summary: Dict[str, Any] = {
+            "modes": self.modes,
+            "total_seconds": round(time.perf_counter() - self._started, 3),
+            "stages": {
+                name: {"seconds": round(timing["seconds"], 3), "calls": timing["calls"]}
+                for name, timing in self.timings.items()
+            },
+        }
+        for name, peak in self._memory_peaks.items():
+            summary["stages"][name]["memory_peak_mb"] = round(peak / 2 ** 20, 2)
+
+        for name, profile in self._profiles.items():
+            path = self._path(report, f" {name}.pstats")
+            profile.dump_stats(str(path))
+            paths.append(path)
+
+        if self._memory:
+            path = self._path(report, " memory.txt")
+            with path.open('w', encoding='utf-8') as f:
+                for name, growth in self._memory.items():
+                    f.write(f"== {name}: пик {self._memory_peaks[name] / 2 ** 20:.1f} МБ ==\n")
+                    for line, size in growth.most_common(PROFILE_TOP_ALLOCATIONS):
+                        f.write(f"{size / 1024:>12.1f} КБ  {line}\n")
+                    f.write("\n")
+            paths.append(path)
+
+        if self._sampler:
+            path = self._path(report, " stacks.txt")
+            with path.open('w', encoding='utf-8') as f:
+                for stack, count in self._sampler.counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            summary["samples"] = self._sampler.samples
+            paths.append(path)
+
+        path = self._path(report, ".json")
+        path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+        paths.insert(0, path)
+
+        return paths
+
+    def close(self) -> None:
+        """Останавливает сэмплер и tracemalloc (без записи артефактов)."""
+        if self._sampler:
+            self._sampler.stop()
+        if self._began_tracing:
+            tracemalloc.stop()
+            self._began_tracing = False